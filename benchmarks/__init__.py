@@ -0,0 +1 @@
+"""Performance benchmarks of flynt, see ``benchmarks/run.py``."""
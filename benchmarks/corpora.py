@@ -0,0 +1,142 @@
+"""Synthetic, reproducible sources for the benchmarks.
+
+Every generator is deterministic, so timings of different flynt versions are
+measured on exactly the same code.
+"""
+
+import ast
+import json
+import os
+import random
+from typing import Any, Dict, List
+
+SEED = 1234
+
+
+def _statement(rng: random.Random, idx: int) -> str:
+    """One line of code, mixing all kinds of candidates and plain code."""
+    var = f"v{idx}"
+    return rng.choice(
+        [
+            f"msg = 'item %s of %d' % ({var}, n)",
+            f"msg = '{{}} and {{:>8}}'.format({var}, total)",
+            f"msg = 'key: {{key}}, value: {{value!r}}'.format(key=k, value={var})",
+            f"path = prefix + '/' + {var} + '.py'",
+            f"line = ', '.join([{var}, 'sep', str(n)])",
+            f"{var} = compute({var}, n) + 1",
+            f"if {var} is None:\n    {var} = []",
+            f"# plain comment {idx}",
+        ]
+    )
+
+
+def module(n_lines: int, seed: int = SEED) -> str:
+    """A module with roughly ``n_lines`` lines of mixed code."""
+    rng = random.Random(seed)  # noqa: S311
+    lines = ["import os", ""]
+    for idx in range(n_lines):
+        if idx % 40 == 0:
+            lines.append(f"\n\ndef function_{idx}(n, k, total, prefix):")
+        lines.append("    " + _statement(rng, idx).replace("\n", "\n    "))
+    return "\n".join(lines) + "\n"
+
+
+def generated(n_lines: int) -> str:
+    """A large generated module (a table of constants) with a single candidate."""
+    lines = [
+        f"ENTRY_{idx} = {{'key': {idx}, 'value': 'v{idx}'}}" for idx in range(n_lines)
+    ]
+    lines[n_lines // 2] = "ENTRY_NAME = 'entry %s' % ENTRY_0"
+    return "\n".join(lines) + "\n"
+
+
+def long_line(n_candidates: int) -> str:
+    """A single line containing many candidates, as in generated or minified code."""
+    items = ", ".join(f"'é%s' % v{i}" for i in range(n_candidates))
+    return f"table = [{items}]\n"
+
+
+def concat_chain(n_terms: int) -> str:
+    """A single long string concatenation, as produced by SQL/HTML builders."""
+    terms = " + ".join(f"'<td>' + c{i}" for i in range(n_terms // 2))
+    return f"html = {terms}\n"
+
+
+def addition_chain(n_terms: int, literals: bool = True) -> ast.Module:
+    """AST of ``html = c0 + '<td>' + c2 + ...``, or of ``c0 + c1 + ...``.
+
+    Built directly, as ``ast.parse`` can't handle that deep nesting.
+    """
+    loc: Dict[str, Any] = {
+        "lineno": 1,
+        "col_offset": 0,
+        "end_lineno": 1,
+        "end_col_offset": 0,
+    }
+    chain: ast.expr = ast.Name(id="c0", ctx=ast.Load(), **loc)
+    for i in range(1, n_terms):
+        term: ast.expr = ast.Name(id=f"c{i}", ctx=ast.Load(), **loc)
+        if literals and i % 2:
+            term = ast.Constant(value="<td>", **loc)
+        chain = ast.BinOp(left=chain, op=ast.Add(), right=term, **loc)
+    target = ast.Name(id="html", ctx=ast.Store(), **loc)
+    return ast.Module(body=[ast.Assign([target], chain, **loc)], type_ignores=[])
+
+
+def multiline_calls(n_calls: int) -> str:
+    """Many ``.format`` calls spanning multiple lines."""
+    call = "text = '{} - {}: {}'.format(\n    first,\n    second,\n    third,\n)\n"
+    return call * n_calls
+
+
+def nested_format_calls(n_calls: int) -> str:
+    """``.format`` calls with large nested argument expressions."""
+    call = (
+        "text = '{} {:>10} {key}'.format(\n"
+        "    compute(a[i], {'x': [b.c(d) for d in range(10)], 'y': (e, f, g)}),\n"
+        "    sum(x * y + z for x, y, z in zip(p, q, r) if x > 0),\n"
+        "    key=mapping.get(name, default)[start:stop],\n"
+        ")\n"
+    )
+    return call * n_calls
+
+
+def notebook(n_cells: int, seed: int = SEED) -> str:
+    """A notebook with code cells, markdown cells and an embedded image output."""
+    rng = random.Random(seed)  # noqa: S311
+    cells: List[Dict[str, Any]] = []
+    for idx in range(n_cells):
+        if idx % 5 == 4:
+            cells.append({"cell_type": "markdown", "metadata": {}, "source": ["# x"]})
+            continue
+        source = [_statement(rng, idx * 10 + i) + "\n" for i in range(5)]
+        cells.append(
+            {
+                "cell_type": "code",
+                "execution_count": idx,
+                "metadata": {},
+                "outputs": [
+                    {
+                        "output_type": "display_data",
+                        "data": {"image/png": "iVBORw0KGgo" * 2000},
+                        "metadata": {},
+                    }
+                ],
+                "source": source,
+            }
+        )
+    nb = {"cells": cells, "metadata": {}, "nbformat": 4, "nbformat_minor": 5}
+    return json.dumps(nb, indent=1)
+
+
+def write_tree(root: str, n_files: int, n_lines: int) -> List[str]:
+    """Write a package of ``n_files`` modules below ``root``, return their paths."""
+    paths = []
+    for idx in range(n_files):
+        folder = os.path.join(root, f"pkg{idx // 50}")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"mod{idx}.py")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(module(n_lines, seed=SEED + idx))
+        paths.append(path)
+    return paths
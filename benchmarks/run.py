@@ -0,0 +1,286 @@
+"""Time flynt's hot paths on synthetic corpora.
+
+Run from the repository root::
+
+    python -m benchmarks.run                      # all benchmarks, table to stdout
+    python -m benchmarks.run -o results.json      # also save machine-readable results
+    python -m benchmarks.run -k finder            # only benchmarks matching "finder"
+    python -m benchmarks.run --compare old.json   # flag regressions against old results
+
+Results contain the per-call time (min, median, mean) of each benchmark together
+with the flynt and python versions, so results of releases can be compared.
+"""
+
+import argparse
+import ast
+import atexit
+import contextlib
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+from typing import Callable, Dict, List, Optional
+
+from benchmarks import corpora
+from flynt import __version__
+from flynt.api import _fstringify_file, fstringify, fstringify_code
+from flynt.candidates.ast_call_candidates import call_candidates
+from flynt.candidates.ast_percent_candidates import percent_candidates
+from flynt.candidates.collect import collect_candidates
+from flynt.code_editor import fstringify_code_by_line
+from flynt.diff import unified_diff
+from flynt.state import State
+from flynt.static_join.candidates import join_candidates
+from flynt.string_concat.candidates import concat_candidates
+from flynt.string_concat.transformer import transform_concat
+from flynt.transform.transform import transform_chunk
+
+Setup = Callable[[], Callable[[], object]]
+
+BENCHMARKS: Dict[str, Setup] = {}
+
+
+def benchmark(name: str) -> Callable[[Setup], Setup]:
+    """Register a setup function, which prepares inputs and returns the timed call."""
+
+    def register(setup: Setup) -> Setup:
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+def temp_dir() -> str:
+    path = tempfile.mkdtemp(prefix="flynt-bench-")
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return path
+
+
+def all_transforms() -> State:
+    return State(transform_concat=True, transform_join=True, quiet=True)
+
+
+MEDIUM = corpora.module(2_000)
+HUGE = corpora.module(20_000)
+
+
+@benchmark("fstringify_code.medium")
+def setup_fstringify_code_medium():
+    return lambda: fstringify_code(MEDIUM, all_transforms())
+
+
+@benchmark("fstringify_code.huge")
+def setup_fstringify_code_huge():
+    return lambda: fstringify_code(HUGE, all_transforms())
+
+
+@benchmark("fstringify_code.long_line")
+def setup_fstringify_code_long_line():
+    code = corpora.long_line(3_000)
+    return lambda: fstringify_code(code, State(len_limit=None))
+
+
+@benchmark("fstringify_code.concat_chain")
+def setup_fstringify_code_concat_chain():
+    code = corpora.concat_chain(500)
+    return lambda: fstringify_code(code, State(transform_concat=True))
+
+
+@benchmark("fstringify_code.multiline_calls")
+def setup_fstringify_code_multiline_calls():
+    code = corpora.multiline_calls(1_000)
+    return lambda: fstringify_code(code, State(len_limit=None))
+
+
+@benchmark("fstringify_code.nested_format_calls")
+def setup_fstringify_code_nested_format_calls():
+    code = corpora.nested_format_calls(2_000)
+    return lambda: fstringify_code(code, State(len_limit=None))
+
+
+@benchmark("finder.percent")
+def setup_finder_percent():
+    return lambda: percent_candidates(MEDIUM, State())
+
+
+@benchmark("finder.call")
+def setup_finder_call():
+    return lambda: call_candidates(MEDIUM, State())
+
+
+@benchmark("finder.concat")
+def setup_finder_concat():
+    return lambda: concat_candidates(MEDIUM, State())
+
+
+@benchmark("finder.join")
+def setup_finder_join():
+    return lambda: join_candidates(MEDIUM, State())
+
+
+@benchmark("finder.concat_chain_10k")
+def setup_finder_concat_chain_10k():
+    # a new tree every time, as results for its nodes are remembered
+    return lambda: collect_candidates(
+        corpora.addition_chain(10_000, literals=False), ["concat"]
+    )
+
+
+@benchmark("finder.collect_all")
+def setup_finder_collect_all():
+    tree = ast.parse(MEDIUM)
+    return lambda: collect_candidates(tree, ["percent", "call", "concat", "join"])
+
+
+@benchmark("code_editor.edit")
+def setup_code_editor_edit():
+    return lambda: fstringify_code_by_line(MEDIUM, State())
+
+
+@benchmark("transform_concat.chain_10k")
+def setup_transform_concat_chain_10k():
+    return lambda: transform_concat(corpora.addition_chain(10_000).body[0].value)  # type: ignore[attr-defined]
+
+
+@benchmark("transform_chunk")
+def setup_transform_chunk():
+    code = "'{a} {b!r:>10} {0} {1:.2f} {c[0]}'.format(x, y + 1, a=f(1), b=b, c=c)"
+    node = ast.parse(code).body[0].value  # type: ignore[attr-defined]
+    return lambda: transform_chunk(node, State())
+
+
+@benchmark("transform_chunk.nested")
+def setup_transform_chunk_nested():
+    code = corpora.nested_format_calls(1).split("=", 1)[1]
+    node = ast.parse(code.strip()).body[0].value  # type: ignore[attr-defined]
+    return lambda: transform_chunk(node, State(len_limit=None))
+
+
+@benchmark("diff.generated")
+def setup_diff_generated():
+    code = corpora.generated(50_000)
+    result = fstringify_code(code, State())
+    assert result is not None
+    a, b = code.split("\n"), result.content.split("\n")
+    return lambda: "\n".join(unified_diff(a, b, result.edits, fromfile="generated.py"))
+
+
+@benchmark("fstringify.directory")
+def setup_fstringify_directory():
+    root = temp_dir()
+    corpora.write_tree(root, n_files=300, n_lines=100)
+    return lambda: _quietly(fstringify, [root], State(quiet=True, dry_run=True))
+
+
+@benchmark("fstringify.directory_jobs4")
+def setup_fstringify_directory_jobs4():
+    root = temp_dir()
+    corpora.write_tree(root, n_files=300, n_lines=100)
+    state = State(quiet=True, dry_run=True, jobs=4)
+    return lambda: _quietly(fstringify, [root], state)
+
+
+@benchmark("notebook")
+def setup_notebook():
+    root = temp_dir()
+    path = os.path.join(root, "nb.ipynb")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(corpora.notebook(200))
+    state = State(process_notebooks=True, dry_run=True)
+    return lambda: _quietly(_fstringify_file, path, state)
+
+
+def _quietly(func: Callable, *args, **kwargs) -> object:
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return func(*args, **kwargs)
+
+
+def measure(func: Callable[[], object], min_time: float, repeat: int) -> Dict:
+    """Per-call times of ``func`` over ``repeat`` rounds of at least ``min_time``."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    times = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def run(pattern: Optional[str], min_time: float, repeat: int) -> Dict:
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if pattern and pattern not in name:
+            continue
+        func = setup()
+        results[name] = measure(func, min_time, repeat)
+        print(f"{name:<36} {results[name]['min'] * 1000:10.3f} ms", flush=True)
+    return {
+        "flynt_version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "benchmarks": results,
+    }
+
+
+def compare(old: Dict, new: Dict, threshold: float) -> List[str]:
+    """Print a comparison, return names of benchmarks slower by over ``threshold``."""
+    print(f"\nCompared to flynt {old['flynt_version']} (python {old['python']}):")
+    regressions = []
+    for name, result in new["benchmarks"].items():
+        if name not in old["benchmarks"]:
+            continue
+        ratio = result["min"] / old["benchmarks"][name]["min"]
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<36} {ratio:8.2f}x{flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", dest="pattern", help="only run matching benchmarks")
+    parser.add_argument("-o", "--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="slowdown reported as regression (default: 0.1, i.e. 10%%)",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.2,
+        help="minimum duration of one round, in seconds",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.CRITICAL)
+
+    results = run(args.pattern, args.min_time, args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        if compare(old, results, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,6 +4,12 @@ Learn more about f-strings at https://www.python.org/dev/peps/pep-0498/"""
 
 __version__ = "1.0.6"
 
-from flynt.cli import main
+
+def main():
+    # imported lazily, so that the daemon client (flynt.daemon) starts quickly
+    from flynt.cli import main as cli_main
+
+    return cli_main()
+
 
 __all__ = ["main", "__version__"]
@@ -1,25 +1,92 @@
 import ast
+import bisect
 import codecs
+import collections
+import contextlib
 import dataclasses
-import json
+import fnmatch
+import functools
+import io
+import itertools
 import logging
+import mmap
 import os
+import re
 import sys
+import tarfile
 import time
-from difflib import unified_diff
-from typing import Collection, Iterable, List, Optional, Tuple
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import (
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
+from flynt import archives, dedup, notebook, profiling, writer
+from flynt.cache import cache_for
+from flynt.candidates.collect import (
+    TRIGGERS,
+    Buffer,
+    CandidatePool,
+    may_have_candidates,
+)
 from flynt.code_editor import (
     fstringify_code_by_line,
     fstringify_concats,
     fstringify_static_joins,
 )
-from flynt.state import State
+from flynt.diff import unified_diff as edits_diff
+from flynt.edits import Edit, apply_edits, compose
+from flynt.output import output_for
+from flynt.state import STATISTICS, State
+from flynt.utils.comments import header_skips_file, skips_file
+from flynt.utils.git import GitError, LineRanges, changed_lines, repo_root
+from flynt.utils.ignore import IgnoreRules
+from flynt.verification import Divergence, drop_faulty_edits, find_divergence
 
 log = logging.getLogger(__name__)
 
 blacklist = {".tox", "venv", "site-packages", ".eggs"}
 
+# directories that are never searched for source files
+skipped_dirs = {
+    ".git",
+    ".hg",
+    ".svn",
+    ".mypy_cache",
+    ".pytest_cache",
+    ".ruff_cache",
+    ".nox",
+    "__pycache__",
+    "node_modules",
+}
+
+# files handed to a worker process at once
+WORKER_BATCH_SIZE = 8
+
+# files of this size (in bytes) or larger are memory-mapped to be searched
+MMAP_SIZE = 1 << 20
+
+T = TypeVar("T")
+
+# statistics counting the edits of each kind
+_EDIT_COUNTERS = {
+    "percent": "percent_transforms",
+    "format": "call_transforms",
+    "concat": "concat_changes",
+    "join": "join_changes",
+}
+
 
 @dataclasses.dataclass(frozen=True)
 class FstringifyResult:
@@ -27,63 +94,169 @@ class FstringifyResult:
     original_length: int
     new_length: int
     content: str
+    # replacements made, in positions of the original code
+    edits: Tuple[Edit, ...] = ()
+
+
+def _exclusion_matcher(excluded: Collection[str]) -> Callable[[str], bool]:
+    """Return a predicate telling if a path (with ``/`` separators) is excluded.
+
+    Entries with glob wildcards are matched against the path or its tail,
+    other entries exclude paths containing them.
+    """
+    excluded = {e.replace("\\", "/") for e in excluded}
+    globs = [e for e in excluded if any(c in e for c in "*?[")]
+    substrings = [e for e in excluded if e not in globs]
+
+    def is_excluded(path: str) -> bool:
+        if any(b in path for b in substrings):
+            return True
+        return any(
+            fnmatch.fnmatchcase(path, g) or fnmatch.fnmatchcase(path, f"*/{g}")
+            for g in globs
+        )
+
+    return is_excluded
 
 
-def _find_source_files(path: str, include_ipynb: bool) -> Iterable[Tuple[str, str]]:
-    """Yield ``(folder, filename)`` pairs for all source files under ``path``."""
+def _find_source_files(
+    path: str,
+    include_ipynb: bool,
+    is_excluded: Callable[[str], bool] = lambda _: False,
+    use_ignore_files: bool = False,
+) -> Iterable[Tuple[str, str]]:
+    """Yield ``(folder, filename)`` pairs for all source files under ``path``.
+
+    Directories that are excluded, ignored by ``.gitignore``/``.ignore`` files
+    (with ``use_ignore_files``) or listed in ``skipped_dirs`` are not entered.
+    """
     if not os.path.isdir(path):
         yield os.path.split(path)
         return
 
-    for srcpath, _, fnames in os.walk(path):
-        for fname in fnames:
-            if fname.endswith(".py") or (include_ipynb and fname.endswith(".ipynb")):
-                yield srcpath, fname
+    rules = IgnoreRules.for_directory(path) if use_ignore_files else IgnoreRules()
+    stack = [(path, rules)]
+    while stack:
+        folder, rules = stack.pop()
+        try:
+            entries = sorted(os.scandir(folder), key=lambda e: e.name)
+        except OSError:
+            log.warning(f"Can't list directory {folder}", exc_info=True)
+            continue
+
+        subdirs = []
+        for entry in entries:
+            entry_path = entry.path.replace("\\", "/")
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            if is_dir:
+                if (
+                    entry.name in skipped_dirs
+                    or entry.is_symlink()
+                    or is_excluded(entry_path)
+                    or rules.is_ignored(entry.path, is_dir=True)
+                ):
+                    continue
+                subdirs.append(entry.path)
+            elif (
+                entry.name.endswith(".py")
+                or (include_ipynb and entry.name.endswith(".ipynb"))
+            ) and not (
+                is_excluded(entry_path) or rules.is_ignored(entry.path, is_dir=False)
+            ):
+                yield folder, entry.name
+
+        stack.extend((d, rules.descend(d)) for d in reversed(subdirs))
 
 
 def _fstringify_notebook(filename: str, state: State) -> Optional[FstringifyResult]:
-    """Apply fstringify transformations to all code cells in a notebook."""
+    """Apply fstringify transformations to all code cells in a notebook.
+
+    The code cells are converted as one module, see flynt.notebook. Cells that
+    can't be parsed are left out of it.
+    """
     try:
         with open(filename, encoding="utf-8") as f:
-            nb = json.load(f)
+            raw = f.read()
+        cells = notebook.code_cells(raw)
     except Exception:
         log.error(f"Exception while reading {filename}", exc_info=True)
         return None
 
-    original_dump = json.dumps(nb, ensure_ascii=False, indent=1)
-    changes = 0
+    included = [cell for cell in cells if not skips_file(cell.source)]
+    tree: Optional[ast.Module] = None
+    while True:
+        sources = [cell.source for cell in included]
+        module, first_lines = notebook.join_cells(sources)
+        try:
+            with profiling.phase("parse"):
+                parsed = ast.parse(module)
+        except SyntaxError as e:
+            bad = {_cell_at(first_lines, e.lineno or 1)}
+        except RecursionError:
+            log.exception(f"Can't parse the code cells of {filename}.")
+            break
+        else:
+            # a statement can't be split between cells
+            bad = {
+                _cell_at(first_lines, node.lineno)
+                for node in parsed.body
+                if _cell_at(first_lines, node.lineno)
+                != _cell_at(first_lines, node.end_lineno or node.lineno)
+            }
+            if not bad:
+                tree = parsed
+                break
+        log.debug(f"Leaving out code cells {bad} of {filename}, they can't be parsed.")
+        included = [cell for idx, cell in enumerate(included) if idx not in bad]
 
-    for idx, cell in enumerate(nb.get("cells", [])):
-        if cell.get("cell_type") != "code":
-            continue
-        source = "".join(cell.get("source", []))
-        result = fstringify_code(source, state, filename=f"{filename}[{idx}]")
-        if not result:
-            continue
-        changes += result.n_changes
-        if result.content != source:
-            cell["source"] = result.content.splitlines(keepends=True)
+    changes = 0
+    new_sources, new_raw = sources, raw
+    edits: List[Edit] = []
+    if tree is not None:
+        line_ranges = None
+        if state.changed_lines is not None:
+            line_ranges = state.changed_lines.get(filename.replace("\\", "/"))
+            if line_ranges is not None:
+                line_ranges = notebook.module_line_ranges(
+                    raw, included, first_lines, line_ranges
+                )
+        result = _fstringify_code(
+            module, state, f"{filename}[cells]", tree, line_ranges
+        )
+        if result and result.n_changes:
+            changes = result.n_changes
+            new_sources = notebook.split_module(sources, first_lines, result.edits)
+            new_raw = notebook.replace_sources(raw, included, new_sources)
+            edits = notebook.source_edits(raw, included, new_sources)
 
-    new_dump = json.dumps(nb, ensure_ascii=False, indent=1)
     if state.dry_run and changes:
-        diff = unified_diff(
-            original_dump.split("\n"), new_dump.split("\n"), fromfile=filename
-        )
-        print("\n".join(diff))
+        if state.output_format == "text":
+            diff = edits_diff(
+                raw.split("\n"), new_raw.split("\n"), edits, fromfile=filename
+            )
+            print("\n".join(diff))
     elif state.stdout:
-        print(new_dump)
+        print(new_raw)
     elif changes:
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(new_dump)
+        writer.write(filename, new_raw.encode("utf-8"))
 
     return FstringifyResult(
         n_changes=changes,
-        original_length=len(original_dump),
-        new_length=len(new_dump),
-        content=new_dump,
+        original_length=len(raw),
+        new_length=len(new_raw),
+        content=new_raw,
+        edits=tuple(edits),
     )
 
 
+def _cell_at(first_lines: List[int], line: int) -> int:
+    """Index of the cell with ``line`` of the module joined from cells."""
+    return max(bisect.bisect_right(first_lines, line) - 1, 0)
+
+
 def _fstringify_file(
     filename: str,
     state: State,
@@ -91,73 +264,241 @@ def _fstringify_file(
     """
     F-stringify a file, write changes, and return a change result.
     """
-    if filename.endswith(".ipynb"):
-        if not state.process_notebooks:
-            return None
-        return _fstringify_notebook(filename, state)
+    with profiling.processing(state.profile, filename):
+        if filename.endswith(".ipynb"):
+            if not state.process_notebooks:
+                return None
+            return _fstringify_notebook(filename, state)
+        return _fstringify_source_file(filename, state)
 
-    encoding, bom = encoding_by_bom(filename)
 
-    with open(filename, encoding=encoding, newline="") as f:
-        try:
-            contents = f.read()
-        except UnicodeDecodeError:
-            log.error(f"Exception while reading {filename}", exc_info=True)
-            return None
+def _fstringify_source_file(
+    filename: str,
+    state: State,
+) -> Optional[FstringifyResult]:
+    with contextlib.ExitStack() as stack:
+        with profiling.phase("read"):
+            f = stack.enter_context(open(filename, "rb"))
+            raw: Buffer
+            if os.fstat(f.fileno()).st_size >= MMAP_SIZE:
+                raw = stack.enter_context(
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                )
+            else:
+                raw = f.read()
+            encoding, bom = detect_encoding(raw)
+            # e.g. UTF-16 is not searched for ASCII bytes
+            searchable = _is_ascii_compatible(encoding)
+            if searchable and not state.stdout and header_skips_file(raw, len(bom)):
+                log.debug(f"Skipping {filename}, marked with flynt: skip-file.")
+                # the file is left as it is without being decoded, so its
+                # length is counted in bytes, and the content isn't given
+                length = len(raw) - len(bom)
+                return FstringifyResult(
+                    n_changes=0,
+                    original_length=length,
+                    new_length=length,
+                    content="",
+                )
+            # results for changed lines only depend on the path, too
+            key = dedup.key(raw) if state.changed_lines is None else None
 
-    result = fstringify_code(
-        contents=contents,
-        state=state,
-        filename=filename,
-    )
+        with profiling.phase("prefilter"):
+            prefiltered = searchable and not may_have_candidates(raw, state)
+
+        with profiling.phase("decode"):
+            try:
+                # newlines are kept as they are, and written back so
+                with memoryview(raw) as view, view[len(bom) :] as body:
+                    contents = str(body, encoding)
+            except UnicodeDecodeError:
+                log.error(f"Exception while reading {filename}", exc_info=True)
+                return None
+
+    cache = cache_for(state)
+    result: Optional[FstringifyResult] = None
+    statistics: Dict[str, int] = {}
+    entry = dedup.get(key)
+    if entry is not None:
+        # a file with the same contents was converted before in this run,
+        # count its expressions again so the report covers every copy
+        result, statistics = entry
+        state.duplicate_files += 1
+        for name, count in statistics.items():
+            setattr(state, name, getattr(state, name) + count)
+    elif prefiltered or (cache is not None and cache.is_clean(contents)):
+        if prefiltered:
+            state.prefiltered_files += 1
+        result = FstringifyResult(
+            n_changes=0,
+            original_length=len(contents),
+            new_length=len(contents),
+            content=contents,
+        )
+    else:
+        before = {name: getattr(state, name) for name in STATISTICS}
+        result = fstringify_code(
+            contents=contents,
+            state=state,
+            filename=filename,
+        )
+        statistics = {
+            name: getattr(state, name) - count
+            for name, count in before.items()
+            if getattr(state, name) != count
+        }
+        if cache is not None and result is not None and result.content == contents:
+            cache.mark_clean(contents)
 
     if result is None:
         return None
+    dedup.put(key, result, statistics)
 
     new_code = result.content
     if state.dry_run and result.n_changes:
-        diff = unified_diff(
-            contents.split("\n"),
-            new_code.split("\n"),
-            fromfile=filename,
-        )
-        print("\n".join(diff))
+        _print_diff(filename, contents, result, state)
     elif state.stdout:
         print(new_code)
     elif result.n_changes:
-        with open(filename, "wb") as outf:
-            if bom is not None:
-                outf.write(bom)
-            outf.write(new_code.encode(encoding))
+        with profiling.phase("write"):
+            writer.write(filename, bom + new_code.encode(encoding))
     return result
 
 
+def _print_diff(
+    filename: str, contents: str, result: FstringifyResult, state: State
+) -> None:
+    if state.output_format == "text":
+        diff = edits_diff(
+            contents.split("\n"),
+            result.content.split("\n"),
+            result.edits,
+            fromfile=filename,
+        )
+        print("\n".join(diff))
+
+
+def _fstringify_archive(
+    path: str, state: State
+) -> Iterator[Tuple[str, Optional[FstringifyResult]]]:
+    """Convert the ``.py`` members of an archive, yield ``(name, result)`` pairs.
+
+    Members are named by the path of the archive followed by their path in it.
+    With ``state.archive_output``, a copy of the archive with the converted
+    members is written to that directory if any changed; otherwise the changes
+    are only reported.
+    """
+    # members in conversion, to write them back or show a diff
+    originals: Dict[str, Tuple[str, str, bytes]] = {}
+    replaced: Dict[str, bytes] = {}
+
+    def sources() -> Iterator[Tuple[str, str]]:
+        for member, raw in archives.read_sources(path):
+            name = f"{path}/{member}"
+            encoding, bom = detect_encoding(raw)
+            try:
+                contents = raw[len(bom) :].decode(encoding)
+            except UnicodeDecodeError:
+                log.error(f"Exception while reading {name}", exc_info=True)
+                continue
+            originals[name] = (contents, encoding, bom)
+            yield name, contents
+
+    try:
+        for name, result in fstringify_sources(sources(), state):
+            contents, encoding, bom = originals.pop(name)
+            if result is not None and result.n_changes:
+                if state.dry_run:
+                    _print_diff(name, contents, result, state)
+                elif state.stdout:
+                    print(result.content)
+                replaced[name[len(path) + 1 :]] = bom + result.content.encode(encoding)
+            yield name, result
+    except (OSError, tarfile.TarError, zipfile.BadZipFile):
+        log.error(f"Exception while reading {path}", exc_info=True)
+        yield path, None
+        return
+
+    if not replaced or state.dry_run or state.stdout:
+        return
+    if state.archive_output is None:
+        print(
+            f"Changes to {path} were not written, "
+            "use --archive-output to write converted archives.",
+            file=sys.stderr,
+        )
+        return
+    target = os.path.join(state.archive_output, os.path.basename(path))
+    with profiling.phase("write"):
+        archives.write_archive(path, target, replaced)
+
+
 def fstringify_code(
     contents: str,
     state: State,
     filename: str = "<code>",
 ) -> Optional[FstringifyResult]:
     """transform given string, assuming it's python code."""
-    try:
-        ast_before = ast.parse(contents)
-    except SyntaxError:
-        log.exception(f"Can't parse {filename} as a python file.")
-        return None
+    with profiling.processing(state.profile, filename):
+        return _fstringify_code(contents, state, filename)
+
+
+def _fstringify_code(
+    contents: str,
+    state: State,
+    filename: str,
+    tree: Optional[ast.Module] = None,
+    line_ranges: Optional[LineRanges] = None,
+) -> Optional[FstringifyResult]:
+    if skips_file(contents):
+        log.debug(f"Skipping {filename}, marked with flynt: skip-file.")
+        return FstringifyResult(
+            n_changes=0,
+            original_length=len(contents),
+            new_length=len(contents),
+            content=contents,
+        )
+
+    if tree is not None:
+        ast_before = tree
+    else:
+        try:
+            with profiling.phase("parse"):
+                ast_before = ast.parse(contents)
+        except (SyntaxError, RecursionError):
+            log.exception(f"Can't parse {filename} as a python file.")
+            return None
+
+    if line_ranges is None and state.changed_lines is not None:
+        line_ranges = state.changed_lines.get(filename.replace("\\", "/"))
 
     try:
         new_code = contents
         changes = 0
+        edits: List[Edit] = []
+        pool = CandidatePool(ast_before, contents, state, line_ranges)
         if state.transform_percent or state.transform_format:
-            new_code, changes = fstringify_code_by_line(
-                contents,
-                state=state,
-            )
-        if state.transform_concat:
-            try:
-                new_code, concat_changes = fstringify_concats(
-                    new_code,
+            with profiling.phase("transform", kind="fstring"):
+                new_code, changes = fstringify_code_by_line(
+                    contents,
                     state=state,
+                    candidates=pool.take(contents, "percent", "call"),
+                    edits=edits,
                 )
+        if state.transform_concat:
+            if state.verification != "per-candidate":
+                new_code, edits, changes = _check_stage(
+                    pool, contents, new_code, edits, changes, state, filename
+                )
+            concat_edits: List[Edit] = []
+            try:
+                with profiling.phase("transform", kind="concat"):
+                    new_code, concat_changes = fstringify_concats(
+                        new_code,
+                        state=state,
+                        candidates=pool.take(new_code, "concat"),
+                        edits=concat_edits,
+                    )
             except Exception as exc:
                 log.error(
                     "Transforming concatenation of literal strings failed", exc_info=exc
@@ -165,12 +506,21 @@ def fstringify_code(
             else:
                 changes += concat_changes
                 state.concat_changes += concat_changes
+                edits = compose(contents, edits, concat_edits)
         if state.transform_join:
-            try:
-                new_code, join_changes = fstringify_static_joins(
-                    new_code,
-                    state=state,
+            if state.verification != "per-candidate":
+                new_code, edits, changes = _check_stage(
+                    pool, contents, new_code, edits, changes, state, filename
                 )
+            join_edits: List[Edit] = []
+            try:
+                with profiling.phase("transform", kind="join"):
+                    new_code, join_changes = fstringify_static_joins(
+                        new_code,
+                        state=state,
+                        candidates=pool.take(new_code, "join"),
+                        edits=join_edits,
+                    )
             except Exception as exc:
                 log.error(
                     "Transforming concatenation of literal strings failed", exc_info=exc
@@ -178,6 +528,7 @@ def fstringify_code(
             else:
                 changes += join_changes
                 state.join_changes += join_changes
+                edits = compose(contents, edits, join_edits)
 
     except Exception as e:
         msg = str(e) or e.__class__.__name__
@@ -187,66 +538,392 @@ def fstringify_code(
         )
         return None
 
-    result = FstringifyResult(
+    if new_code != contents:
+        with profiling.phase("verify"):
+            problem = _verify(pool, ast_before, new_code, state, contents, edits)
+            while isinstance(problem, Divergence) and problem.edit in edits:
+                # the strict check told which edit is wrong, drop just that one
+                log.info(f"Code changed in conversion of {filename}, {problem}.")
+                new_code, edits, changes = _drop_edits(
+                    contents, edits, [problem.edit], changes, state, filename
+                )
+                problem = _verify(pool, ast_before, new_code, state, contents, edits)
+            if problem is not None and state.verification != "per-candidate":
+                log.info(
+                    f"{problem} in conversion of {filename}, finding faulty edits."
+                )
+                new_code, edits, changes = _drop_faulty_edits(
+                    contents,
+                    edits,
+                    changes,
+                    state,
+                    filename,
+                    lambda code: _verify(pool, ast_before, code, state) is None,
+                )
+                problem = None
+        if problem is not None:
+            log.error(
+                f"Faulty result during conversion on {filename}: {problem} - skipping."
+            )
+            return None
+
+    return FstringifyResult(
         n_changes=changes,
         original_length=len(contents),
         new_length=len(new_code),
         content=new_code,
+        edits=tuple(edits),
     )
 
-    if result.content == contents:
-        return result
 
+def _verify(
+    pool: CandidatePool,
+    ast_before: ast.Module,
+    code: str,
+    state: State,
+    contents: str = "",
+    edits: Sequence[Edit] = (),
+) -> Union[str, Divergence, None]:
+    """Return what is wrong with rewritten ``code``, if anything.
+
+    ``code`` is the result of applying ``edits`` to ``contents``; with the
+    strict verification, they tell which edit changed the code.
+    """
     try:
-        ast_after = ast.parse(new_code)
-    except SyntaxError:
+        ast_after = pool.parse(code)
+    except SyntaxError as e:
+        return f"syntax error ({e})"
+    if not len(ast_before.body) == len(ast_after.body):
+        return "statement count has changed, which is not intended"
+    if state.verification == "strict":
+        return find_divergence(contents, ast_before, ast_after, edits)
+    return None
+
+
+def _drop_faulty_edits(
+    contents: str,
+    edits: List[Edit],
+    changes: int,
+    state: State,
+    filename: str,
+    is_valid: Callable[[str], bool],
+) -> Tuple[str, List[Edit], int]:
+    """Drop the edits making the rewritten code invalid, keeping the others."""
+    kept, dropped = drop_faulty_edits(contents, edits, is_valid)
+    return _drop_edits(contents, kept, dropped, changes, state, filename)
+
+
+def _drop_edits(
+    contents: str,
+    edits: List[Edit],
+    dropped: Sequence[Edit],
+    changes: int,
+    state: State,
+    filename: str,
+) -> Tuple[str, List[Edit], int]:
+    """Apply ``edits`` except ``dropped`` ones to ``contents``, updating counts."""
+    kept = [edit for edit in edits if edit not in dropped]
+    for edit in dropped:
         log.warning(
-            f"Faulty result during conversion on {filename} - skipping.",
-            exc_info=True,
+            f"Faulty conversion on {filename}:{edit.start_line} "
+            f"of `{edit.original}` to `{edit.replacement}` - skipping it."
         )
+        state.invalid_conversions += 1
+        counter = _EDIT_COUNTERS[edit.kind]
+        setattr(state, counter, getattr(state, counter) - 1)
+    return apply_edits(contents, kept), kept, changes - len(dropped)
+
+
+def _check_stage(
+    pool: CandidatePool,
+    contents: str,
+    new_code: str,
+    edits: List[Edit],
+    changes: int,
+    state: State,
+    filename: str,
+) -> Tuple[str, List[Edit], int]:
+    """Make sure the code passed on to the next transform stage parses."""
+
+    def parses(code: str) -> bool:
+        try:
+            pool.parse(code)
+        except SyntaxError:
+            return False
+        return True
+
+    if new_code == contents or parses(new_code):
+        return new_code, edits, changes
+    with profiling.phase("verify"):
+        return _drop_faulty_edits(contents, edits, changes, state, filename, parses)
+
+
+def _fstringify_files_in_worker(
+    filenames: List[str],
+    state: State,
+) -> List[Tuple[Optional[FstringifyResult], State, str, List[dedup.Shared]]]:
+    """Run ``_fstringify_file`` on a batch of files in a worker process.
+
+    Statistics are collected into a fresh state, printed output is captured and
+    results to share are recorded, so that the parent process can merge, emit
+    and share them in input order.
+    """
+    results = []
+    try:
+        with writer.writing(state):
+            for filename in filenames:
+                worker_state = state.fresh()
+                output = io.StringIO()
+                with contextlib.redirect_stdout(output), dedup.recording() as shared:
+                    result = _fstringify_file(filename, worker_state)
+                results.append((result, worker_state, output.getvalue(), shared))
+    except writer.WriteError as e:
+        print(e, file=sys.stderr)
+        unwritten = set(e.paths)
+        for idx, filename in enumerate(filenames):
+            if filename in unwritten:
+                _, worker_state, captured, shared = results[idx]
+                worker_state.unwritten_files += 1
+                results[idx] = (None, worker_state, captured, shared)
+    return results
+
+
+def _fstringify_sources_in_worker(
+    sources: List[Tuple[str, str]],
+    state: State,
+) -> List[Tuple[str, Optional[FstringifyResult], State]]:
+    """Run ``fstringify_code`` on a batch of named sources in a worker process."""
+    results = []
+    for name, source in sources:
+        worker_state = state.fresh()
+        result = fstringify_code(source, worker_state, filename=name)
+        results.append((name, result, worker_state))
+    return results
+
+
+def _batched(iterable: Iterable[T], n: int) -> Iterator[List[T]]:
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, n)):
+        yield batch
+
+
+def _process_pool(jobs: int) -> Optional[ProcessPoolExecutor]:
+    try:
+        return ProcessPoolExecutor(max_workers=jobs)
+    except (ImportError, NotImplementedError, OSError):
+        # multiprocessing is not available on some platforms (e.g. AWS Lambda)
+        log.warning("Can't start worker processes, processing files serially.")
         return None
 
-    if not len(ast_before.body) == len(ast_after.body):
-        log.error(
-            f"Faulty result during conversion on {filename}: "
-            f"statement count has changed, which is not intended - skipping.",
+
+def _iter_fstringified_files(
+    files: Iterable[str],
+    state: State,
+) -> Iterator[Tuple[str, Optional[FstringifyResult]]]:
+    """Yield ``(path, result)`` pairs in the order of ``files``.
+
+    With ``state.jobs`` other than 1 the files are processed in batches by a
+    pool of worker processes (``jobs <= 0`` means one per CPU); their statistics
+    are merged back into ``state``. Files are handed out while ``files`` is
+    still being produced, keeping a few batches per worker in flight. Copies of
+    files are processed here instead, with the shared results, see flynt.dedup.
+    """
+    jobs = state.jobs if state.jobs > 0 else (os.cpu_count() or 1)
+    batches = _batched(files, WORKER_BATCH_SIZE)
+    first_batches = list(itertools.islice(batches, 2))
+    batches = itertools.chain(first_batches, batches)
+
+    executor = None
+    # a single batch is not worth starting worker processes
+    if jobs > 1 and len(first_batches) > 1:
+        executor = _process_pool(jobs)
+
+    if executor is None:
+        for path in itertools.chain.from_iterable(batches):
+            yield path, _fstringify_file(path, state)
+        return
+
+    # keys of the files in conversion by workers, see flynt.dedup
+    in_conversion: Set[bytes] = set()
+
+    def submit(
+        batch: List[str],
+    ) -> Tuple[List[Tuple[str, Optional[bytes], bool]], Future]:
+        items = []
+        for path in batch:
+            key = _content_key(path, state)
+            # copies reuse the result in this process when their turn comes
+            copy = key is not None and (key in in_conversion or dedup.seen(key))
+            if key is not None and not copy:
+                in_conversion.add(key)
+            items.append((path, key, copy))
+        paths = [path for path, _, copy in items if not copy]
+        return items, executor.submit(_fstringify_files_in_worker, paths, state)
+
+    with executor:
+        pending = collections.deque(
+            submit(batch) for batch in itertools.islice(batches, jobs * 2)
         )
+        while pending:
+            items, future = pending.popleft()
+            pending.extend(submit(batch) for batch in itertools.islice(batches, 1))
+            results = iter(future.result())
+            for path, key, copy in items:
+                if copy:
+                    yield path, _fstringify_file(path, state)
+                    continue
+                result, worker_state, output, shared = next(results)
+                state.merge(worker_state)
+                dedup.share(shared)
+                if key is not None:
+                    in_conversion.discard(key)
+                sys.stdout.write(output)
+                yield path, result
+
+
+def _content_key(path: str, state: State) -> Optional[bytes]:
+    """The key ``path`` may share its result by, if results are shared."""
+    if (
+        path.endswith(".ipynb")
+        or state.changed_lines is not None
+        or not dedup.sharing()
+    ):
         return None
-    return result
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < MMAP_SIZE:
+                return dedup.key(f.read())
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as raw:
+                return dedup.key(raw)
+    except OSError:
+        # reported when the file is processed
+        return None
+
+
+def fstringify_sources(
+    sources: Iterable[Tuple[str, str]],
+    state: Optional[State] = None,
+) -> Iterator[Tuple[str, Optional[FstringifyResult]]]:
+    """Convert many in-memory sources, given as ``(name, source)`` pairs.
+
+    Yields ``(name, result)`` pairs lazily; ``result`` is None for sources that
+    could not be converted, and lists the applied edits otherwise. Nothing is
+    read from or written to disk, and ``state`` is shared by all sources.
+
+    With ``state.jobs`` other than 1, batches of sources are converted by
+    worker processes and results are yielded as soon as they are ready,
+    which is not necessarily in the order of ``sources``.
+    """
+    if state is None:
+        state = State()
+    jobs = state.jobs if state.jobs > 0 else (os.cpu_count() or 1)
+    executor = _process_pool(jobs) if jobs > 1 else None
+
+    if executor is None:
+        for name, source in sources:
+            yield name, fstringify_code(source, state, filename=name)
+        return
+
+    batches = _batched(sources, WORKER_BATCH_SIZE)
+    with executor:
+        pending = {
+            executor.submit(_fstringify_sources_in_worker, batch, state)
+            for batch in itertools.islice(batches, jobs * 2)
+        }
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for batch in itertools.islice(batches, len(done)):
+                pending.add(
+                    executor.submit(_fstringify_sources_in_worker, batch, state)
+                )
+            for future in done:
+                for name, result, worker_state in future.result():
+                    state.merge(worker_state)
+                    yield name, result
 
 
 def fstringify_files(
-    files: List[str],
+    files: Iterable[str],
     state: State,
 ) -> int:
     """apply transforms to sequence of files, keep shared stats."""
+    found_files = 0
     changed_files = 0
     total_charcount_original = 0
     total_charcount_new = 0
     total_expressions = 0
     start_time = time.time()
-    for path in files:
-        result = _fstringify_file(
-            path,
-            state,
-        )
-        if result:
-            if result.n_changes:
-                changed_files += 1
-                total_expressions += result.n_changes
-            total_charcount_original += result.original_length
-            total_charcount_new += result.new_length
-            status = "modified" if result.n_changes else "no change"
-        else:
-            status = "failed"
-        log.info(f"fstringifying {path}...{status}")
+    out = output_for(state.output_format, sys.stdout)
+    if out is not None:
+        out.start()
+    archive_paths: List[str] = []
+
+    def not_archive(path: str) -> bool:
+        if archives.is_archive(path):
+            archive_paths.append(path)
+            return False
+        return True
+
+    results = itertools.chain(
+        _iter_fstringified_files(filter(not_archive, files), state),
+        # archives found among files, once those are done
+        itertools.chain.from_iterable(
+            _fstringify_archive(path, state) for path in archive_paths
+        ),
+    )
+    # counts of the changed files, undone for those that can't be written
+    changed: Dict[str, Tuple[int, int, int]] = {}
+    try:
+        with writer.writing(state), dedup.deduplicating():
+            for path, result in results:
+                found_files += 1
+                if result:
+                    if result.n_changes:
+                        changed_files += 1
+                        total_expressions += result.n_changes
+                        changed[path] = (
+                            result.n_changes,
+                            result.original_length,
+                            result.new_length,
+                        )
+                    total_charcount_original += result.original_length
+                    total_charcount_new += result.new_length
+                    status = "modified" if result.n_changes else "no change"
+                else:
+                    status = "failed"
+                log.info(f"fstringifying {path}...{status}")
+                if out is not None:
+                    out.file(path, status, result.edits if result else ())
+    except writer.WriteError as e:
+        print(e, file=sys.stderr)
+        for path in e.paths:
+            state.unwritten_files += 1
+            if path in changed:
+                n_changes, original_length, new_length = changed.pop(path)
+                changed_files -= 1
+                total_expressions -= n_changes
+                total_charcount_original -= original_length
+                total_charcount_new -= new_length
     total_time = time.time() - start_time
 
+    if out is not None:
+        out.finish(
+            {
+                "files": found_files,
+                "changed_files": changed_files,
+                "expressions": total_expressions,
+                "original_length": total_charcount_original,
+                "new_length": total_charcount_new,
+                "time": total_time,
+                **{name: getattr(state, name) for name in STATISTICS},
+            }
+        )
+
     if not state.quiet:
         if state.report:
             _print_report(
                 state,
-                len(files),
+                found_files,
                 changed_files,
                 total_charcount_new,
                 total_charcount_original,
@@ -254,7 +931,11 @@ def fstringify_files(
                 total_time,
             )
         else:
-            _print_summary(len(files), changed_files, total_time)
+            _print_summary(found_files, changed_files, total_time)
+        if state.profile is not None:
+            state.profile.print_summary()
+    if state.profile is not None and state.profile_output:
+        state.profile.dump(state.profile_output)
 
     return changed_files
 
@@ -272,6 +953,16 @@ def _print_report(
     print(f"\nExecution time:                            {total_time:.3f}s")
     print(f"Files checked:                             {found_files}")
     print(f"Files modified:                            {changed_files}")
+    if state.prefiltered_files:
+        print(f"Files skipped without parsing:             {state.prefiltered_files}")
+    if state.unwritten_files:
+        print(f"Files that could not be written:           {state.unwritten_files}")
+    if state.duplicate_files:
+        dedup_ratio = state.duplicate_files / found_files
+        print(
+            f"Duplicate files (converted once):          {state.duplicate_files} "
+            f"({dedup_ratio:.1%})"
+        )
     if changed_files:
         cc_reduction = total_cc_original - total_cc_new
         cc_percent_reduction = cc_reduction / total_cc_original
@@ -340,13 +1031,19 @@ def fstringify(
     excluded_files_or_paths: Optional[Collection[str]] = None,
 ) -> int:
     """determine if a directory or a single file was passed, and f-stringify it."""
-    files = _resolve_files(files_or_paths, excluded_files_or_paths, state)
+    files: Iterable[str] = _iter_source_files(
+        files_or_paths, excluded_files_or_paths, state
+    )
+    if state.diff_base is not None or state.staged:
+        files = _changed_files(files, files_or_paths, state)
 
     status = fstringify_files(
         files,
         state=state,
     )
 
+    if state.unwritten_files:
+        return 1
     if fail_on_changes:
         return status
     return 0
@@ -358,46 +1055,158 @@ def _resolve_files(
     state: State,
 ) -> List[str]:
     """Resolve relative paths and directory names into a list of absolute paths to source files."""
-    files = []
+    return list(_iter_source_files(files_or_paths, excluded_files_or_paths, state))
+
+
+def _iter_source_files(
+    files_or_paths: List[str],
+    excluded_files_or_paths: Optional[Collection[str]],
+    state: State,
+) -> Iterator[str]:
+    """Like ``_resolve_files``, but yield paths while directories are traversed."""
     _blacklist = blacklist.copy()
     if excluded_files_or_paths is not None:
         _blacklist.update(set(excluded_files_or_paths))
+    is_excluded = _exclusion_matcher(_blacklist)
 
+    abs_paths = []
     for file_or_path in files_or_paths:
         abs_path = os.path.abspath(file_or_path)
 
         if not os.path.exists(abs_path):
             print(f"`{file_or_path}` not found")
             sys.exit(1)
+        abs_paths.append(abs_path)
 
+    for abs_path in abs_paths:
         if os.path.isdir(abs_path):
             for folder, filename in _find_source_files(
-                abs_path, state.process_notebooks
+                abs_path,
+                state.process_notebooks,
+                is_excluded,
+                state.use_ignore_files,
             ):
-                files.append(os.path.join(folder, filename))
-        else:
-            if abs_path.endswith(".py") or (
-                state.process_notebooks and abs_path.endswith(".ipynb")
-            ):
-                files.append(abs_path)
+                yield os.path.join(folder, filename).replace("\\", "/")
+        elif (
+            abs_path.endswith(".py")
+            or (state.process_notebooks and abs_path.endswith(".ipynb"))
+            or archives.is_archive(abs_path)
+        ):
+            abs_path = abs_path.replace("\\", "/")
+            if not is_excluded(abs_path):
+                yield abs_path
+
+
+def _changed_files(
+    files: Iterable[str],
+    files_or_paths: List[str],
+    state: State,
+) -> List[str]:
+    """Keep only files changed according to git, see ``State.diff_base``.
+
+    With ``state.changed_lines_only``, also record the changed lines of each file.
+    """
+    changed: Dict[str, Optional[LineRanges]] = {}
+    roots = set()
+    try:
+        for file_or_path in files_or_paths:
+            root = repo_root(os.path.abspath(file_or_path))
+            if root not in roots:
+                roots.add(root)
+                changed.update(
+                    changed_lines(root, base=state.diff_base, staged=state.staged)
+                )
+    except GitError as e:
+        print(f"Can't find changed files: {e}")
+        sys.exit(1)
+
+    changed_files = []
+    lines = {}
+    for f in files:
+        real_path = os.path.realpath(f)
+        if real_path in changed:
+            changed_files.append(f)
+            lines[f] = changed[real_path]
+    if state.changed_lines_only:
+        state.changed_lines = lines
+    return changed_files
+
+
+# the BOMs of UTF-32 go first, as BOM_UTF32_LE starts with BOM_UTF16_LE
+_BOMS = (
+    ("utf-8", codecs.BOM_UTF8),
+    ("utf-32-le", codecs.BOM_UTF32_LE),
+    ("utf-32-be", codecs.BOM_UTF32_BE),
+    ("utf-16-le", codecs.BOM_UTF16_LE),
+    ("utf-16-be", codecs.BOM_UTF16_BE),
+)
+
+# PEP 263 encoding declaration
+_coding_cookie = re.compile(rb"^[ \t\f]*#.*?coding[:=][ \t]*([-\w.]+)")
 
-    files = [f.replace("\\", "/") for f in files]
-    _blacklist = {f.replace("\\", "/") for f in _blacklist}
-    files = [f for f in files if all(b not in f for b in _blacklist)]
-    return files
+
+def detect_encoding(raw: Buffer, default: str = "utf-8") -> Tuple[str, bytes]:
+    """Return the encoding of the source in ``raw`` and its byte order mark.
+
+    The encoding is told by a BOM, by a coding cookie in one of the first two
+    lines, or else is ``default``. The BOM (empty if there is none) is not
+    covered by the returned encoding: the rest of ``raw`` is decoded with it,
+    and the BOM is written in front of the encoded result.
+    """
+    for encoding, bom in _BOMS:
+        if raw[: len(bom)] == bom:
+            return encoding, bom
+
+    start = 0
+    for _ in range(2):
+        end = raw.find(b"\n", start)
+        line = raw[start : len(raw) if end == -1 else end]
+        match = _coding_cookie.match(line)
+        if match:
+            try:
+                encoding = codecs.lookup(match.group(1).decode("ascii")).name
+                # codecs like hex or zlib are found, but don't decode to text
+                "".encode(encoding)
+            except LookupError:
+                log.warning(f"Unknown encoding {match.group(1)!r}, using {default}.")
+                return default, b""
+            return encoding, b""
+        # the cookie may be on the second line only below a comment
+        if end == -1 or not (line.strip() == b"" or line.lstrip().startswith(b"#")):
+            break
+        start = end + 1
+    return default, b""
+
+
+# codecs that decode the BOM along with the source, as encoding_by_bom tells
+_BOM_CODECS = {
+    "utf-8": "utf-8-sig",
+    "utf-32-le": "utf-32",
+    "utf-32-be": "utf-32",
+    "utf-16-le": "utf-16",
+    "utf-16-be": "utf-16",
+}
 
 
 def encoding_by_bom(path: str, default: str = "utf-8") -> Tuple[str, Optional[bytes]]:
-    """Adapted from https://stackoverflow.com/questions/13590749/reading-unicode-file-data-with-bom-chars-in-python/24370596#24370596"""
+    """Return the encoding telling from the BOM of the file at ``path``, and the BOM.
+
+    The encoding decodes the BOM, too; without a BOM, ``(default, None)`` is
+    returned. See ``detect_encoding``, which also looks at coding cookies.
+    """
     with open(path, "rb") as f:
-        raw = f.read(4)  # will read less if the file is smaller
-    # BOM_UTF32_LE's start is equal to BOM_UTF16_LE so need to try the former first
-    for enc, boms in (
-        ("utf-8-sig", (codecs.BOM_UTF8,)),
-        ("utf-32", (codecs.BOM_UTF32_LE, codecs.BOM_UTF32_BE)),
-        ("utf-16", (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)),
-    ):
-        for bom in boms:
-            if raw.startswith(bom):
-                return enc, bom
-    return default, None
+        raw = f.read(4)
+    encoding, bom = detect_encoding(raw, default)
+    if not bom:
+        return default, None
+    return _BOM_CODECS[encoding], bom
+
+
+@functools.lru_cache(maxsize=None)
+def _is_ascii_compatible(encoding: str) -> bool:
+    """Whether the triggers of the prefilter are encoded as in ASCII."""
+    triggers = b"".join(TRIGGERS.values())
+    try:
+        return triggers.decode("ascii").encode(encoding) == triggers
+    except (LookupError, UnicodeError):
+        return False
@@ -0,0 +1,108 @@
+"""Python sources inside archives: wheels, zip files and sdists (``.tar.gz``).
+
+Members are read one after the other from the archive, without extracting it.
+A rewritten archive is written as a copy with some members replaced; the
+hashes in the ``RECORD`` of a wheel are updated for them.
+"""
+
+import base64
+import csv
+import hashlib
+import io
+import os
+import stat
+import tarfile
+import tempfile
+import zipfile
+from typing import BinaryIO, Dict, Iterator, Tuple
+
+SUFFIXES = (".whl", ".zip", ".tar.gz", ".tgz")
+
+
+def is_archive(path: str) -> bool:
+    return path.endswith(SUFFIXES)
+
+
+def _is_zip(path: str) -> bool:
+    return path.endswith((".whl", ".zip"))
+
+
+def read_sources(path: str) -> Iterator[Tuple[str, bytes]]:
+    """Yield the name and contents of each ``.py`` member of the archive."""
+    if _is_zip(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and info.filename.endswith(".py"):
+                    yield info.filename, archive.read(info)
+        return
+    with tarfile.open(path, "r|*") as tar:
+        for member in tar:
+            if member.isfile() and member.name.endswith(".py"):
+                f = tar.extractfile(member)
+                if f is not None:
+                    yield member.name, f.read()
+
+
+def _record_hash(data: bytes) -> str:
+    digest = base64.urlsafe_b64encode(hashlib.sha256(data).digest())
+    return "sha256=" + digest.rstrip(b"=").decode("ascii")
+
+
+def _updated_record(record: bytes, replaced: Dict[str, bytes]) -> bytes:
+    """The ``RECORD`` of a wheel with the hashes and sizes of ``replaced``."""
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    for row in csv.reader(io.StringIO(record.decode("utf-8"))):
+        if row and row[0] in replaced:
+            data = replaced[row[0]]
+            row[1:3] = [_record_hash(data), str(len(data))]
+        writer.writerow(row)
+    return out.getvalue().encode("utf-8")
+
+
+def _copy_zip(path: str, target: BinaryIO, replaced: Dict[str, bytes]) -> None:
+    with zipfile.ZipFile(path) as src, zipfile.ZipFile(target, "w") as dst:
+        for info in src.infolist():
+            data = replaced.get(info.filename)
+            if data is None:
+                data = src.read(info)
+                if path.endswith(".whl") and info.filename.endswith(
+                    ".dist-info/RECORD"
+                ):
+                    data = _updated_record(data, replaced)
+            dst.writestr(info, data)
+
+
+def _copy_tar(path: str, target: BinaryIO, replaced: Dict[str, bytes]) -> None:
+    dst = tarfile.open(fileobj=target, mode="w|gz", format=tarfile.PAX_FORMAT)
+    with tarfile.open(path, "r|*") as src, dst:
+        for member in src:
+            data = replaced.get(member.name)
+            if data is not None and member.isfile():
+                member.size = len(data)
+                dst.addfile(member, io.BytesIO(data))
+            elif member.isfile():
+                dst.addfile(member, src.extractfile(member))
+            else:
+                dst.addfile(member)
+
+
+def write_archive(path: str, target_path: str, replaced: Dict[str, bytes]) -> None:
+    """Write a copy of the archive at ``path`` with members ``replaced``.
+
+    The copy replaces ``target_path`` at once when complete, which may also be
+    ``path`` itself. It gets the permissions of the archive at ``path``.
+    """
+    directory = os.path.dirname(target_path) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as target:
+            if _is_zip(path):
+                _copy_zip(path, target, replaced)
+            else:
+                _copy_tar(path, target, replaced)
+        os.chmod(temp_path, stat.S_IMODE(os.stat(path).st_mode))
+        os.replace(temp_path, target_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
@@ -0,0 +1,159 @@
+"""On-disk cache of sources that are known to need no changes.
+
+Inspired by black's cache. An entry is an empty file named after the sha256 of a
+source; entries live in a directory specific to the flynt version and to the
+options that influence conversion results, so changing either starts afresh.
+
+Entries are created atomically, which makes it safe for parallel workers to
+share a cache directory. Every cache directory is split into 256 shards, and a
+shard exceeding its share of ``max_entries`` drops its least recently used
+entries.
+
+Long-running processes (see ``flynt.daemon``) additionally remember clean
+sources in memory, sparing the file system lookups.
+"""
+
+import hashlib
+import logging
+import os
+import sys
+from typing import Dict, Optional, Set
+
+from flynt import __version__
+from flynt.state import State
+
+log = logging.getLogger(__name__)
+
+MAX_ENTRIES = 2**16
+N_SHARDS = 256
+
+# Options of State that change the result of a conversion.
+RESULT_OPTIONS = (
+    "aggressive",
+    "multiline",
+    "len_limit",
+    "transform_percent",
+    "transform_format",
+    "transform_concat",
+    "transform_join",
+    "verification",
+)
+
+# keys of clean sources per cache directory, if kept in memory
+_memory: Optional[Dict[str, Set[str]]] = None
+
+
+def keep_in_memory() -> None:
+    """Remember clean sources in memory for the rest of this process."""
+    global _memory
+    if _memory is None:
+        _memory = {}
+
+
+def user_cache_dir() -> str:
+    """Return the default cache directory, which can be set by FLYNT_CACHE_DIR."""
+    if "FLYNT_CACHE_DIR" in os.environ:
+        return os.environ["FLYNT_CACHE_DIR"]
+    if sys.platform == "win32":
+        root = os.environ.get("LOCALAPPDATA", os.path.expanduser("~/AppData/Local"))
+    elif sys.platform == "darwin":
+        root = os.path.expanduser("~/Library/Caches")
+    else:
+        root = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    return os.path.join(root, "flynt")
+
+
+def options_fingerprint(state: State) -> str:
+    """Return a short digest of flynt version and options affecting results."""
+    options = [__version__] + [repr(getattr(state, o)) for o in RESULT_OPTIONS]
+    return hashlib.sha256("|".join(options).encode()).hexdigest()[:16]
+
+
+class Cache:
+    def __init__(
+        self,
+        cache_dir: str,
+        state: State,
+        max_entries: int = MAX_ENTRIES,
+    ) -> None:
+        self.directory = os.path.join(cache_dir, options_fingerprint(state))
+        self.max_entries = max_entries
+        self.max_shard_entries = max(1, max_entries // N_SHARDS)
+        self.memory: Optional[Set[str]] = None
+        if _memory is not None:
+            self.memory = _memory.setdefault(self.directory, set())
+
+    @staticmethod
+    def key(contents: str) -> str:
+        return hashlib.sha256(contents.encode("utf-8", "surrogatepass")).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key[2:])
+
+    def _remember(self, key: str) -> None:
+        if self.memory is None:
+            return
+        if len(self.memory) >= self.max_entries:
+            self.memory.clear()
+        self.memory.add(key)
+
+    def is_clean(self, contents: str) -> bool:
+        """Was ``contents`` previously found to need no changes?"""
+        key = self.key(contents)
+        if self.memory is not None and key in self.memory:
+            return True
+        path = self._entry_path(key)
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            return False
+        self._remember(key)
+        return True
+
+    def mark_clean(self, contents: str) -> None:
+        """Record that ``contents`` needs no changes."""
+        key = self.key(contents)
+        self._remember(key)
+        path = self._entry_path(key)
+        shard = os.path.dirname(path)
+        try:
+            os.makedirs(shard, exist_ok=True)
+            with open(path, "x"):
+                pass
+        except FileExistsError:
+            return
+        except OSError:
+            log.debug("Can't write cache entry %s", path, exc_info=True)
+            return
+        self._evict(shard)
+
+    def _evict(self, shard: str) -> None:
+        """Remove the least recently used entries of an overfull shard."""
+        try:
+            entries = list(os.scandir(shard))
+        except OSError:
+            return
+        if len(entries) <= self.max_shard_entries:
+            return
+
+        def last_used(entry: os.DirEntry) -> float:
+            try:
+                return entry.stat().st_mtime
+            except OSError:
+                return 0.0
+
+        entries.sort(key=last_used)
+        for entry in entries[: len(entries) - self.max_shard_entries]:
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                # already removed by another worker
+                pass
+
+
+def cache_for(state: State) -> Optional[Cache]:
+    """Return the cache configured in ``state``, if any."""
+    if state.cache_dir is None or state.changed_lines is not None:
+        # results limited to changed lines don't tell about the whole file
+        return None
+    return Cache(state.cache_dir, state)
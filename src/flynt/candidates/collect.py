@@ -0,0 +1,149 @@
+"""Find candidates for all enabled transforms in a single walk over one AST.
+
+Each finder (``PercentFmtFinder``, ``CallFmtFinder``, ``ConcatHound``,
+``JoinHound``) stops descending once it found a candidate, independently of the
+others. The walk below keeps track of which finders are still active for each
+subtree, so the candidates and their order are the same as if every finder had
+visited the tree on its own.
+"""
+
+import ast
+import mmap
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Type, Union
+
+from flynt import profiling
+from flynt.candidates.ast_call_candidates import is_call_format
+from flynt.candidates.ast_chunk import AstChunk
+from flynt.candidates.ast_percent_candidates import is_percent_format
+from flynt.state import State
+from flynt.static_join.utils import get_static_join_bits
+from flynt.string_concat.candidates import is_string_concat
+from flynt.utils.git import LineRanges, intersects, remap_line_ranges
+
+Buffer = Union[bytes, bytearray, mmap.mmap]
+
+FINDERS: Dict[str, Tuple[Type[ast.AST], Callable[..., bool]]] = {
+    "percent": (ast.BinOp, is_percent_format),
+    "call": (ast.Call, is_call_format),
+    "concat": (ast.BinOp, is_string_concat),
+    "join": (ast.Call, lambda node: get_static_join_bits(node) is not None),
+}
+
+
+def enabled_finders(state: State) -> List[str]:
+    """Names of the finders needed for transforms enabled in ``state``."""
+    kinds = []
+    if state.transform_percent or state.transform_format:
+        kinds += ["percent", "call"]
+    if state.transform_concat:
+        kinds.append("concat")
+    if state.transform_join:
+        kinds.append("join")
+    return kinds
+
+
+# bytes without which the source has no candidates for a finder
+TRIGGERS: Dict[str, bytes] = {
+    "percent": b"%",
+    "call": b"format",
+    "concat": b"+",
+    "join": b"join",
+}
+
+
+def may_have_candidates(raw: Buffer, state: State) -> bool:
+    """Whether the raw (ASCII-compatible) source may have candidates at all.
+
+    A plain search for the trigger of each enabled finder, much faster than
+    parsing. ``raw`` may be any bytes-like object, e.g. a memory map.
+    """
+    return any(raw.find(TRIGGERS[kind]) != -1 for kind in enabled_finders(state))
+
+
+def collect_candidates(
+    tree: ast.AST,
+    kinds: Sequence[str],
+) -> Dict[str, List[AstChunk]]:
+    """Walk ``tree`` once and return candidates found by each of ``kinds``."""
+    found: Dict[str, List[AstChunk]] = {kind: [] for kind in kinds}
+    stack: List[Tuple[ast.AST, Tuple[str, ...]]] = [(tree, tuple(kinds))]
+    while stack:
+        node, active = stack.pop()
+        still_active = []
+        for kind in active:
+            node_type, predicate = FINDERS[kind]
+            if isinstance(node, node_type) and predicate(node):
+                found[kind].append(AstChunk(node))  # type: ignore[arg-type]
+            else:
+                still_active.append(kind)
+        if still_active:
+            children = list(ast.iter_child_nodes(node))
+            stack.extend((child, tuple(still_active)) for child in reversed(children))
+    return found
+
+
+class CandidatePool:
+    """Candidates for the transform stages applied to one module.
+
+    All finders run on the tree of the original code at once. A stage takes its
+    candidates for the code it is about to edit; only if an earlier stage has
+    changed that code, it is parsed again, for the finders not used yet.
+
+    If ``line_ranges`` (1-based, inclusive) are given, only candidates touching
+    them are used. The ranges follow the lines as stages edit the code.
+    """
+
+    def __init__(
+        self,
+        tree: ast.AST,
+        code: str,
+        state: State,
+        line_ranges: Optional[LineRanges] = None,
+    ) -> None:
+        self.tree = tree
+        self.code = code
+        self.state = state
+        self.line_ranges = line_ranges
+        with profiling.phase("candidates"):
+            self.found = collect_candidates(tree, enabled_finders(state))
+
+    def _update(self, code: str) -> None:
+        """Parse ``code`` and find remaining candidates in it, if it has changed."""
+        if code == self.code:
+            return
+        tree = ast.parse(code)
+        if self.line_ranges is not None:
+            self.line_ranges = remap_line_ranges(self.code, code, self.line_ranges)
+        self.tree = tree
+        self.code = code
+        if self.found:
+            with profiling.phase("candidates"):
+                self.found = collect_candidates(tree, list(self.found))
+
+    def take(self, code: str, *kinds: str) -> List[AstChunk]:
+        """Return candidates of ``kinds`` in ``code``, in source order."""
+        with profiling.phase("parse"):
+            self._update(code)
+
+        chunks = []
+        for kind in kinds:
+            found = self.found.pop(kind)
+            if self.line_ranges is not None:
+                ranges = self.line_ranges
+                found = [
+                    c
+                    for c in found
+                    if intersects(c.start_line + 1, c.end_line + 1, ranges)
+                ]
+            counter = f"{kind}_candidates"
+            setattr(self.state, counter, getattr(self.state, counter) + len(found))
+            chunks.extend(found)
+        if len(kinds) > 1:
+            chunks.sort(key=lambda c: (c.start_line, c.start_idx))
+        return chunks
+
+    def parse(self, code: str) -> ast.Module:
+        """Return the AST of ``code``, reusing the last parse if possible."""
+        self._update(code)
+        assert isinstance(self.tree, ast.Module)
+        return self.tree
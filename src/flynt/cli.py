@@ -9,6 +9,9 @@ from typing import List, Optional
 
 from flynt import __version__
 from flynt.api import fstringify, fstringify_code
+from flynt.cache import user_cache_dir
+from flynt.output import FORMATS
+from flynt.profiling import Profile
 from flynt.state import State
 from flynt.utils.pyproject_finder import find_pyproject_toml, parse_pyproject_toml
 
@@ -143,12 +146,33 @@ def run_flynt_cli(arglist: Optional[List[str]] = None) -> int:
         ),
     )
 
+    parser.add_argument(
+        "--verify",
+        action="store",
+        choices=("per-candidate", "per-file", "strict"),
+        default="per-candidate",
+        metavar="STRATEGY",
+        help="How to check converted code: 'per-candidate' parses every "
+        "converted expression and the resulting file (default), 'per-file' "
+        "only parses the file and drops faulty conversions if it fails, "
+        "'strict' also checks that the file's AST is unchanged except for "
+        "converted expressions.",
+    )
+
     parser.add_argument(
         "-e",
         "--exclude",
         action="store",
         nargs="+",
-        help="ignore files with given strings in it's absolute path.",
+        help="ignore files with given strings in it's absolute path, "
+        "or matching given glob patterns (e.g. '*_pb2.py').",
+    )
+
+    parser.add_argument(
+        "--no-ignore-files",
+        action="store_true",
+        default=False,
+        help="Also process files ignored by .gitignore or .ignore files.",
     )
 
     parser.add_argument(
@@ -159,6 +183,56 @@ def run_flynt_cli(arglist: Optional[List[str]] = None) -> int:
         help="Also search and transform Jupyter notebooks (.ipynb files). Warning: feature in alpha and was not thoroughly tested.",
     )
 
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        action="store",
+        type=int,
+        default=1,
+        help="Number of worker processes to use (0 means one per CPU). "
+        "Default value is 1, i.e. files are processed sequentially.",
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        default=False,
+        help="Don't skip files that previous runs found to need no changes.",
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        action="store",
+        default=None,
+        help="Directory of the cache of unchanged files. "
+        "Defaults to FLYNT_CACHE_DIR or a flynt directory in the user cache dir.",
+    )
+
+    parser.add_argument(
+        "--diff-base",
+        action="store",
+        default=None,
+        metavar="REF",
+        help="Only process files changed relative to the given git revision "
+        "(including uncommitted and untracked files).",
+    )
+
+    parser.add_argument(
+        "--staged",
+        action="store_true",
+        default=False,
+        help="Only process files with changes staged in git "
+        "(relative to --diff-base, or HEAD).",
+    )
+
+    parser.add_argument(
+        "--changed-lines-only",
+        action="store_true",
+        default=False,
+        help="With --diff-base or --staged, only convert expressions "
+        "on lines changed according to git.",
+    )
+
     parser.add_argument(
         "src",
         action="store",
@@ -175,15 +249,58 @@ def run_flynt_cli(arglist: Optional[List[str]] = None) -> int:
         default=False,
         help="Print the current version number and exit.",
     )
+    parser.add_argument(
+        "--fsync",
+        action="store_true",
+        default=False,
+        help="Sync changed files to disk, all at once at the end of the run "
+        "(or of a batch of a worker process). Until then, the files are "
+        "left unchanged.",
+    )
+    parser.add_argument(
+        "--archive-output",
+        action="store",
+        default=None,
+        metavar="DIR",
+        help="Write archives (.whl, .zip, .tar.gz) given as src to DIR, with "
+        "their .py files converted. Without it, archives are converted in "
+        "memory only and left unchanged.",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="text",
+        dest="output_format",
+        help="Output format. With json, jsonl or sarif, a record of each file "
+        "and of each of its edits (position, kind of transform, original and "
+        "replacement) is written to stdout as the run goes, followed by the "
+        "statistics of the run, instead of the text output.",
+    )
     parser.add_argument(
         "--report",
         action="store_true",
         default=False,
         help="Show detailed conversion report",
     )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=False,
+        help="Show time spent per phase of processing and the slowest files.",
+    )
+    parser.add_argument(
+        "--profile-output",
+        action="store",
+        default=None,
+        metavar="FILE",
+        help="Write the time spent per phase and the slowest files as JSON "
+        "to FILE (implies --profile).",
+    )
     args = parser.parse_args(arglist)
     if args.stdout and args.verbose:
         parser.error("--stdout should not be used with -v/--verbose")
+    if args.stdout and args.output_format != "text":
+        parser.error("--stdout should not be used with --format")
 
     if args.version:
         print(__version__)
@@ -257,7 +374,7 @@ def run_flynt_cli(arglist: Optional[List[str]] = None) -> int:
         print(salutation)
     if args.verbose:
         print(f"Using following options: {args}")
-    if args.dry_run:
+    if args.dry_run and state.output_format == "text":
         print("Running flynt in dry-run mode. No files will be changed.")
     return fstringify(
         args.src,
@@ -274,11 +391,23 @@ def state_from_args(args) -> State:
         stdout=args.stdout,
         len_limit=args.line_length,
         multiline=(not args.no_multiline),
-        quiet=args.quiet or args.stdout,
+        quiet=args.quiet or args.stdout or args.output_format != "text",
         transform_concat=args.transform_concats,
         transform_format=args.transform_format,
         transform_join=args.transform_joins,
         transform_percent=args.transform_percent,
         report=args.report,
         process_notebooks=args.notebook,
+        use_ignore_files=not args.no_ignore_files,
+        jobs=args.jobs,
+        cache_dir=None if args.no_cache else (args.cache_dir or user_cache_dir()),
+        diff_base=args.diff_base,
+        staged=args.staged,
+        changed_lines_only=args.changed_lines_only,
+        verification=args.verify,
+        fsync=args.fsync,
+        archive_output=args.archive_output,
+        output_format=args.output_format,
+        profile=Profile() if args.profile or args.profile_output else None,
+        profile_output=args.profile_output,
     )
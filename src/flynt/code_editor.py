@@ -1,13 +1,15 @@
+import ast
+import dataclasses
 import logging
 import re
 import string
 import sys
-from functools import lru_cache
-from typing import Callable, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
 from flynt.candidates.ast_call_candidates import call_candidates
 from flynt.candidates.ast_chunk import AstChunk
 from flynt.candidates.ast_percent_candidates import percent_candidates
+from flynt.edits import Edit
 from flynt.exceptions import FlyntException
 from flynt.state import State
 from flynt.static_join.candidates import join_candidates
@@ -15,6 +17,7 @@ from flynt.static_join.transformer import transform_join
 from flynt.string_concat.candidates import concat_candidates
 from flynt.string_concat.transformer import transform_concat
 from flynt.transform.transform import transform_chunk
+from flynt.utils.comments import CommentIndex
 from flynt.utils.format import QuoteTypes as qt
 from flynt.utils.format import get_quote_type, get_string_prefix
 from flynt.utils.utils import (
@@ -23,9 +26,6 @@ from flynt.utils.utils import (
     unicode_escape_map,
 )
 
-noqa_regex = re.compile("#[ ]*noqa.*flynt")
-flynt_skip_regex = re.compile(r"#\s*flynt:\s*skip")
-
 log = logging.getLogger(__name__)
 
 
@@ -52,6 +52,7 @@ class CodeEditor:
         candidates_iter_factory: Callable,
         transform_func: Callable,
         state: State,
+        kind: Optional[str] = None,
     ) -> None:
         if len_limit is None:
             len_limit = sys.maxsize
@@ -61,10 +62,16 @@ class CodeEditor:
         self.transform_func = transform_func
         self.state = state
         self.src_lines = code.split("\n")
-        self._src_lines_bytes = [line.encode("utf-8") for line in self.src_lines]
+        self.comments = CommentIndex(self.src_lines)
+        # byte offset -> char index, only for lines with non-ASCII characters
+        self._char_offsets: Dict[int, List[int]] = {}
+        self._chunk_code: Dict[AstChunk, str] = {}
 
         self.results: List[str] = []
         self.count_expressions = 0
+        # kind of the edits made, by default told apart by the candidate's node
+        self.kind = kind
+        self.edits: List[Edit] = []
 
         self.last_line = 0
         self.last_idx = 0
@@ -72,8 +79,14 @@ class CodeEditor:
         self.output: Optional[str] = None
 
     def _byte_to_char_idx(self, line_no: int, byte_idx: int) -> int:
-        line_bytes = self._src_lines_bytes[line_no]
-        return len(line_bytes[:byte_idx].decode("utf-8"))
+        """Convert a UTF-8 byte offset (as found in the AST) to a char index."""
+        line = self.src_lines[line_no]
+        if line.isascii():
+            return byte_idx
+        offsets = self._char_offsets.get(line_no)
+        if offsets is None:
+            offsets = self._char_offsets[line_no] = _utf8_char_offsets(line)
+        return offsets[byte_idx]
 
     def edit(self) -> Tuple[str, int]:
         """Apply edits to the original code."""
@@ -108,11 +121,14 @@ class CodeEditor:
             result.append(self.src_lines[end_line][:e])
         return "\n".join(result)
 
-    @lru_cache(None)
-    def code_in_chunk(self, chunk: AstChunk):
-        return self.code_between(
-            chunk.start_line, chunk.start_idx, chunk.end_line, chunk.end_idx
-        )
+    def code_in_chunk(self, chunk: AstChunk) -> str:
+        # cached per editor, so that it doesn't outlive the processed file
+        code = self._chunk_code.get(chunk)
+        if code is None:
+            code = self._chunk_code[chunk] = self.code_between(
+                chunk.start_line, chunk.start_idx, chunk.end_line, chunk.end_idx
+            )
+        return code
 
     def fill_up_to(self, chunk: AstChunk) -> None:
         start_line, start_idx, _ = (
@@ -145,8 +161,16 @@ class CodeEditor:
         Transformation function is free to decide to refuse conversion,
         e.g. in edge cases that are not supported."""
 
+        # skip lines with # noqa comment or # flynt: skip
+        if self.comments.skipped(chunk.start_line, chunk.end_line):
+            return
+
         # if a chunk has a comment in it, we should abort.
-        if contains_comment(self.code_in_chunk(chunk)):
+        start = self._byte_to_char_idx(chunk.start_line, chunk.start_idx)
+        end = self._byte_to_char_idx(chunk.end_line, chunk.end_idx)
+        if self.comments.may_have_comment(
+            chunk.start_line, start, chunk.end_line, end
+        ) and contains_comment(self.code_in_chunk(chunk)):
             return
 
         snippet = self.code_in_chunk(chunk)
@@ -161,11 +185,6 @@ class CodeEditor:
             prefix = ""
             is_raw = False
 
-        # skip lines with # noqa comment or # flynt: skip
-        for line in self.src_lines[chunk.start_line : chunk.end_line + 1]:
-            if noqa_regex.findall(line) or flynt_skip_regex.findall(line):
-                return
-
         # try/except only needed for python 3.9 due to quote issues
         try:
             quote_type = get_quote_type(snippet)
@@ -250,6 +269,7 @@ class CodeEditor:
         self.count_expressions += 1
         self.last_line += contract_lines
         self.last_idx = self._byte_to_char_idx(chunk.end_line, chunk.end_idx)
+        self.record_edit(chunk, converted)
 
         # remove redundant parenthesis
         if len(self.results) < 2 or not self.results[-2]:
@@ -271,6 +291,29 @@ class CodeEditor:
 
             self.results[-2] = self.results[-2][:-1]
             self.last_idx += 1
+            edit = self.edits[-1]
+            self.edits[-1] = dataclasses.replace(
+                edit,
+                start_col=edit.start_col - 1,
+                end_col=edit.end_col + 1,
+                original=f"({edit.original})",
+            )
+
+    def record_edit(self, chunk: AstChunk, converted: str) -> None:
+        kind = self.kind
+        if kind is None:
+            kind = "percent" if isinstance(chunk.node, ast.BinOp) else "format"
+        self.edits.append(
+            Edit(
+                kind,
+                chunk.start_line + 1,
+                self._byte_to_char_idx(chunk.start_line, chunk.start_idx),
+                chunk.end_line + 1,
+                self._byte_to_char_idx(chunk.end_line, chunk.end_idx),
+                self.code_in_chunk(chunk),
+                converted,
+            )
+        )
 
     def add_rest(self) -> None:
         self.results.append(self.src_lines[self.last_line][self.last_idx :] + "\n")
@@ -281,13 +324,35 @@ class CodeEditor:
             self.last_line += 1
 
 
+def _utf8_char_offsets(line: str) -> List[int]:
+    """For each byte offset into the UTF-8 encoded ``line``, the char index."""
+    offsets = []
+    for idx, char in enumerate(line):
+        code_point = ord(char)
+        if code_point < 0x80:
+            offsets.append(idx)
+        elif code_point < 0x800:
+            offsets += (idx, idx)
+        elif code_point < 0x10000:
+            offsets += (idx, idx, idx)
+        else:
+            offsets += (idx, idx, idx, idx)
+    offsets.append(len(line))
+    return offsets
+
+
 def fstring_candidates(code, state):
     chunks = percent_candidates(code, state) + call_candidates(code, state)
     chunks.sort(key=lambda c: (c.start_line, c.start_idx))
     return chunks
 
 
-def fstringify_code_by_line(code: str, state: State) -> Tuple[str, int]:
+def fstringify_code_by_line(
+    code: str,
+    state: State,
+    candidates: Optional[List[AstChunk]] = None,
+    edits: Optional[List[Edit]] = None,
+) -> Tuple[str, int]:
     """returns fstringified version of the code and amount of lines edited."""
 
     return _transform_code(
@@ -295,26 +360,44 @@ def fstringify_code_by_line(code: str, state: State) -> Tuple[str, int]:
         fstring_candidates,
         transform_chunk,
         state,
+        candidates,
+        edits,
     )
 
 
-def fstringify_concats(code: str, state: State) -> Tuple[str, int]:
+def fstringify_concats(
+    code: str,
+    state: State,
+    candidates: Optional[List[AstChunk]] = None,
+    edits: Optional[List[Edit]] = None,
+) -> Tuple[str, int]:
     """replace string literal concatenations with f-string expressions."""
     return _transform_code(
         code,
         concat_candidates,
         transform_concat,
         state,
+        candidates,
+        edits,
+        kind="concat",
     )
 
 
-def fstringify_static_joins(code: str, state: State) -> Tuple[str, int]:
+def fstringify_static_joins(
+    code: str,
+    state: State,
+    candidates: Optional[List[AstChunk]] = None,
+    edits: Optional[List[Edit]] = None,
+) -> Tuple[str, int]:
     """replace joins on static content with f-string expressions."""
     return _transform_code(
         code,
         join_candidates,
         transform_join,
         state,
+        candidates,
+        edits,
+        kind="join",
     )
 
 
@@ -323,12 +406,27 @@ def _transform_code(
     candidates_iter_factory: Callable,
     transform_func: Callable,
     state: State,
+    candidates: Optional[List[AstChunk]] = None,
+    edits: Optional[List[Edit]] = None,
+    kind: Optional[str] = None,
 ) -> Tuple[str, int]:
-    """returns fstringified version of the code and amount of lines edited."""
-    return CodeEditor(
+    """returns fstringified version of the code and amount of lines edited.
+
+    If ``candidates`` were already found in the AST of ``code``, they are used
+    instead of parsing the code again with ``candidates_iter_factory``.
+    Records of the applied edits are appended to ``edits``, if given.
+    """
+    if candidates is not None:
+        candidates_iter_factory = lambda *_: candidates  # noqa: E731
+    editor = CodeEditor(
         code,
         state.len_limit,
         candidates_iter_factory,
         transform_func,
         state,
-    ).edit()
+        kind,
+    )
+    result = editor.edit()
+    if edits is not None:
+        edits.extend(editor.edits)
+    return result
@@ -0,0 +1,362 @@
+"""Run flynt in a long-lived background process, like blackd or dmypy.
+
+``flyntd`` starts a daemon that listens on a Unix socket (or, given an HTTP URL,
+on a local HTTP port). ``flyntc`` takes the same arguments as ``flynt`` and
+hands them to the daemon, which runs them in its working directory and sends
+back the output and exit code. If no daemon is running, ``flyntc`` runs flynt
+in-process. Because the daemon's modules are already imported and its caches
+are warm, small runs such as pre-commit hooks finish much faster.
+
+The daemon address is taken from ``FLYNT_DAEMON``. It is either the path of a
+Unix socket or an ``http://host:port`` URL. By default a socket in
+``XDG_RUNTIME_DIR`` is used, or else one in a directory of the temporary
+directory that only the user can access. The client only talks to sockets
+owned by the user.
+
+Only the standard library is imported at module level, and only what the
+client needs, so that it starts quickly. Everything else is imported on use.
+"""
+
+import io
+import json
+import os
+import socket
+import stat
+import sys
+from typing import Any, Dict, List, Optional
+
+from flynt import __version__
+
+Message = Dict[str, Any]
+
+# seconds to wait for the daemon to answer, conversion included
+TIMEOUT = 600.0
+
+
+def _temp_socket_dir() -> str:
+    import tempfile
+
+    return os.path.join(tempfile.gettempdir(), f"flynt-{os.getuid()}")
+
+
+def default_address() -> str:
+    if "FLYNT_DAEMON" in os.environ:
+        return os.environ["FLYNT_DAEMON"]
+    if not hasattr(socket, "AF_UNIX"):
+        return "http://127.0.0.1:7878"
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or _temp_socket_dir()
+    return os.path.join(runtime_dir, "flyntd.sock")
+
+
+def _private_dir(path: str) -> None:
+    """Create the directory ``path`` for this user only, or check that it is so."""
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if (
+        not stat.S_ISDIR(info.st_mode)
+        or info.st_uid != os.getuid()
+        or info.st_mode & 0o077
+    ):
+        raise SystemExit(f"{path} must be a directory only this user can access")
+
+
+def _token_path() -> str:
+    from flynt.cache import user_cache_dir
+
+    return os.path.join(user_cache_dir(), "daemon-token")
+
+
+def _read_token() -> str:
+    with open(_token_path(), encoding="ascii") as f:
+        return f.read().strip()
+
+
+def _http_host_port(address: str) -> tuple:
+    host, _, port = address[len("http://") :].rstrip("/").rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def send(request: Message, address: Optional[str] = None) -> Message:
+    """Send a request to the daemon and return its response.
+
+    Raises OSError if no daemon listens on ``address``.
+    """
+    address = address or default_address()
+    payload = json.dumps(request).encode("utf-8")
+    if address.startswith("http://"):
+        import http.client
+
+        host, port = _http_host_port(address)
+        connection = http.client.HTTPConnection(host, port, timeout=TIMEOUT)
+        try:
+            connection.request(
+                "POST",
+                "/",
+                payload,
+                {"Content-Type": "application/json", "X-Flynt-Token": _read_token()},
+            )
+            response = connection.getresponse()
+            body = response.read()
+        finally:
+            connection.close()
+        if response.status != 200:
+            raise OSError(f"flynt daemon answered with HTTP {response.status}")
+        return json.loads(body)
+
+    # anyone may create a socket in a shared directory, don't send code to it
+    info = os.lstat(address)
+    if not stat.S_ISSOCK(info.st_mode) or info.st_uid != os.getuid():
+        raise OSError(f"{address} is not a socket owned by this user")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(TIMEOUT)
+        sock.connect(address)
+        sock.sendall(payload + b"\n")
+        sock.shutdown(socket.SHUT_WR)
+        with sock.makefile("rb") as f:
+            body = f.read()
+    if not body:
+        raise OSError("flynt daemon closed the connection")
+    return json.loads(body)
+
+
+def run_client(argv: List[str], address: Optional[str] = None) -> int:
+    """Run flynt with ``argv`` in the daemon, or in this process if there is none."""
+    request: Message = {
+        "command": "run",
+        "version": __version__,
+        "argv": argv,
+        "cwd": os.getcwd(),
+    }
+    if "-" in argv:
+        request["stdin"] = sys.stdin.read()
+
+    try:
+        response: Optional[Message] = send(request, address)
+    except (OSError, ValueError):
+        response = None
+
+    if response is None or "returncode" not in response:
+        # no (compatible) daemon, do the work here
+        from flynt.cli import run_flynt_cli
+
+        if "stdin" in request:
+            sys.stdin = io.StringIO(request["stdin"])
+        return run_flynt_cli(argv)
+
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    return response["returncode"]
+
+
+def client_main():
+    return sys.exit(run_client(sys.argv[1:]))
+
+
+class Daemon:
+    """Executes requests of clients, one at a time."""
+
+    def __init__(self) -> None:
+        import threading
+
+        from flynt import cache
+
+        cache.keep_in_memory()
+        self.lock = threading.Lock()
+        self.server: Any = None
+
+    def handle(self, request: Message) -> Message:
+        command = request.get("command")
+        if command == "ping":
+            return {"version": __version__, "pid": os.getpid()}
+        if command == "stop":
+            import threading
+
+            threading.Thread(target=self.server.shutdown).start()
+            return {"stopping": True}
+        if command != "run":
+            return {"error": f"unknown command {command!r}"}
+        if request.get("version") != __version__:
+            return {"error": f"daemon runs flynt {__version__}"}
+        with self.lock:
+            return self.run(request["argv"], request["cwd"], request.get("stdin"))
+
+    def run(self, argv: List[str], cwd: str, stdin: Optional[str]) -> Message:
+        """Run the flynt CLI like a fresh process would, capturing its output."""
+        import contextlib
+        import logging
+        import traceback
+
+        from flynt.cli import run_flynt_cli
+        from flynt.utils.pyproject_finder import find_project_root
+
+        stdout, stderr = io.StringIO(), io.StringIO()
+        old_cwd, old_stdin = os.getcwd(), sys.stdin
+        root_logger = logging.getLogger()
+        old_handlers = root_logger.handlers[:]
+        try:
+            os.chdir(cwd)
+            sys.stdin = io.StringIO(stdin or "")
+            # the project root depends on the working directory
+            find_project_root.cache_clear()
+            # let the CLI configure logging to the captured stderr
+            root_logger.handlers.clear()
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                try:
+                    returncode = run_flynt_cli(argv)
+                except SystemExit as e:
+                    if isinstance(e.code, str):
+                        print(e.code, file=sys.stderr)
+                    returncode = (
+                        e.code if isinstance(e.code, int) else int(bool(e.code))
+                    )
+                except Exception:
+                    traceback.print_exc()
+                    returncode = 1
+        finally:
+            os.chdir(old_cwd)
+            sys.stdin = old_stdin
+            root_logger.handlers[:] = old_handlers
+            logging.getLogger("flynt").setLevel(logging.NOTSET)
+        return {
+            "returncode": returncode,
+            "stdout": stdout.getvalue(),
+            "stderr": stderr.getvalue(),
+        }
+
+    def serve_unix(self, path: str) -> None:
+        import socketserver
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                try:
+                    request = json.loads(self.rfile.readline())
+                except ValueError:
+                    return
+                self.wfile.write(json.dumps(daemon.handle(request)).encode("utf-8"))
+
+        if os.path.dirname(path) == _temp_socket_dir():
+            _private_dir(os.path.dirname(path))
+        if os.path.exists(path):
+            try:
+                send({"command": "ping"}, path)
+            except OSError:
+                os.unlink(path)  # left over by a daemon that was killed
+            else:
+                raise SystemExit(f"flynt daemon already running at {path}")
+
+        old_umask = os.umask(0o077)  # only this user may connect
+        try:
+            self.server = socketserver.UnixStreamServer(path, Handler)
+        finally:
+            os.umask(old_umask)
+        try:
+            with self.server:
+                self.server.serve_forever()
+        finally:
+            os.unlink(path)
+
+    def serve_http(self, host: str, port: int) -> None:
+        import http.server
+        import secrets
+
+        daemon = self
+        token = secrets.token_hex(16)
+        token_path = _token_path()
+        os.makedirs(os.path.dirname(token_path), exist_ok=True)
+        fd = os.open(token_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="ascii") as f:
+            f.write(token)
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                if not secrets.compare_digest(
+                    self.headers.get("X-Flynt-Token", ""), token
+                ):
+                    self.send_error(403)
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    request = json.loads(self.rfile.read(length))
+                except ValueError:
+                    self.send_error(400)
+                    return
+                body = json.dumps(daemon.handle(request)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        self.server = http.server.HTTPServer((host, port), Handler)
+        with self.server:
+            self.server.serve_forever()
+
+    def serve(self, address: str) -> None:
+        if address.startswith("http://"):
+            self.serve_http(*_http_host_port(address))
+        else:
+            self.serve_unix(address)
+
+
+def run_daemon(arglist: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="flyntd",
+        description=f"flynt daemon v.{__version__}. Run flynt through it with flyntc.",
+    )
+    parser.add_argument(
+        "--address",
+        default=None,
+        help="Unix socket path or http://host:port URL to listen on "
+        "(default: FLYNT_DAEMON, or a socket in XDG_RUNTIME_DIR or in a private "
+        "directory in the temporary directory).",
+    )
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument(
+        "--status",
+        action="store_true",
+        default=False,
+        help="Tell if a daemon is running and exit.",
+    )
+    action.add_argument(
+        "--stop",
+        action="store_true",
+        default=False,
+        help="Stop the running daemon and exit.",
+    )
+    args = parser.parse_args(arglist)
+    address = args.address or default_address()
+
+    if args.status or args.stop:
+        try:
+            response = send({"command": "stop" if args.stop else "ping"}, address)
+        except (OSError, ValueError):
+            print(f"No flynt daemon running at {address}")
+            return 1
+        if args.status:
+            print(f"flynt daemon {response['version']} running at {address}")
+        return 0
+
+    print(f"flynt daemon {__version__} listening at {address}", flush=True)
+    try:
+        Daemon().serve(address)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main():
+    return sys.exit(run_daemon())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Conversion results shared by files with the same contents within a run.
+
+Within ``deduplicating()``, which ``fstringify_files`` wraps around a run, the
+result for a file is remembered by the hash of its bytes, and files with the
+same bytes (copies of vendored modules, generated clients, ...) reuse it
+instead of being converted again. The statistics counted while converting are
+kept with the result, so that copies add to the report like converted files.
+The least recently used results are dropped beyond ``MAX_ENTRIES`` results or
+``MAX_CHARS`` characters of converted code.
+
+With worker processes, the results are kept by the parent process. Copies of
+contents that were converted before or are in conversion (see ``seen``) are
+kept back from the workers, and processed by the parent when their turn comes.
+Workers record the results they would share (see ``recording``), and the
+parent shares them in the order of the files, so the table, and the report,
+are the same as in a serial run.
+"""
+
+import collections
+import contextlib
+import hashlib
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from flynt.candidates.collect import Buffer
+
+MAX_ENTRIES = 2**16
+MAX_CHARS = 2**26
+
+_active: Optional[Union["Results", "Recorder"]] = None
+
+# a result and the statistics counted while converting it
+Entry = Tuple[Any, Dict[str, int]]
+# an entry with its key, as recorded by worker processes
+Shared = Tuple[bytes, Any, Dict[str, int]]
+
+
+class Results:
+    """Results by the hash of the converted bytes, least recently used first."""
+
+    def __init__(self) -> None:
+        self.pid = os.getpid()
+        self.entries: "collections.OrderedDict[bytes, Entry]" = (
+            collections.OrderedDict()
+        )
+        self.chars = 0
+
+    def get(self, key: bytes) -> Optional[Entry]:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: bytes, result: Any, statistics: Dict[str, int]) -> None:
+        if key in self.entries:
+            return
+        self.entries[key] = (result, statistics)
+        self.chars += len(result.content)
+        while len(self.entries) > MAX_ENTRIES or self.chars > MAX_CHARS:
+            _, (dropped, _) = self.entries.popitem(last=False)
+            self.chars -= len(dropped.content)
+
+
+class Recorder:
+    """Records the results a worker process would share, in order."""
+
+    def __init__(self) -> None:
+        self.pid = os.getpid()
+        self.shared: List[Shared] = []
+
+    def get(self, key: bytes) -> Optional[Entry]:
+        return None
+
+    def put(self, key: bytes, result: Any, statistics: Dict[str, int]) -> None:
+        self.shared.append((key, result, statistics))
+
+
+def _current() -> Optional[Union[Results, Recorder]]:
+    # a forked worker process inherits the table of its parent
+    if _active is None or _active.pid != os.getpid():
+        return None
+    return _active
+
+
+@contextlib.contextmanager
+def deduplicating() -> Iterator[None]:
+    """Share results between files until the end of the block."""
+    global _active
+    if _current() is not None:
+        yield
+        return
+    _active = Results()
+    try:
+        yield
+    finally:
+        _active = None
+
+
+@contextlib.contextmanager
+def recording() -> Iterator[List[Shared]]:
+    """Record the results shared in the block, to ``share`` them in the parent."""
+    global _active
+    previous, recorder = _active, Recorder()
+    _active = recorder
+    try:
+        yield recorder.shared
+    finally:
+        _active = previous
+
+
+def sharing() -> bool:
+    """Are results shared (or recorded) in this process?"""
+    return _current() is not None
+
+
+def key(raw: Buffer) -> Optional[bytes]:
+    """Key of the file contents ``raw``, or None if results aren't shared."""
+    if _current() is None:
+        return None
+    return hashlib.sha256(raw).digest()
+
+
+def get(key: Optional[bytes]) -> Optional[Entry]:
+    """The result and statistics for a file with the same contents, if any."""
+    active = _current()
+    if key is None or active is None:
+        return None
+    return active.get(key)
+
+
+def put(
+    key: Optional[bytes],
+    result: Any,
+    statistics: Optional[Dict[str, int]] = None,
+) -> None:
+    active = _current()
+    if key is not None and active is not None:
+        active.put(key, result, statistics or {})
+
+
+def seen(key: Optional[bytes]) -> bool:
+    """Is there a result for ``key``? Unlike ``get``, it isn't marked as used."""
+    active = _current()
+    return key is not None and isinstance(active, Results) and key in active.entries
+
+
+def share(shared: List[Shared]) -> None:
+    """Share the results recorded by ``recording`` in a worker process."""
+    for key, result, statistics in shared:
+        put(key, result, statistics)
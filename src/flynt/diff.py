@@ -0,0 +1,265 @@
+"""Unified diffs of converted code, built from the edits made.
+
+``difflib.unified_diff`` matches the lines of both versions of a file to find
+what changed, which takes long for large files. The edits already tell which
+lines changed, so only these are matched, with the same algorithm as
+``difflib.SequenceMatcher`` and the same treatment of popular lines, and the
+diff is formatted like ``difflib.unified_diff`` does. For a conversion, which
+leaves all other lines in place, the result is the same, unless a changed line
+also appears among the unchanged ones. ``difflib`` may match it with these, so
+it makes the diff of such files.
+"""
+
+import collections
+import difflib
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from flynt.edits import Edit, output_spans
+
+Opcode = Tuple[str, int, int, int, int]
+
+
+def _changed_blocks(
+    a: Sequence[str], b: Sequence[str], edits: Sequence[Edit], popular: Set[str]
+) -> Iterator[Tuple[int, int, int, int]]:
+    """0-based ranges ``(a1, a2, b1, b2)`` of lines changed by ``edits``.
+
+    ``SequenceMatcher`` only matches unchanged lines between blocks if one of
+    them is not popular, otherwise the blocks are matched as one. Matched
+    lines are extended with the equal lines at the ends of the blocks.
+    """
+    blocks: List[List[int]] = []
+    for edit, (start, end) in zip(edits, output_spans(edits)):
+        a1, a2 = edit.start_line - 1, edit.end_line
+        b1, b2 = start[0] - 1, end[0]
+        prev_a2 = blocks[-1][1] if blocks else 0
+        if not all(line in popular for line in a[prev_a2:a1]):
+            blocks.append([a1, a2, b1, b2])
+        elif blocks:
+            blocks[-1][1], blocks[-1][3] = a2, b2
+        else:
+            blocks.append([0, a2, 0, b2])
+    if blocks and all(line in popular for line in a[blocks[-1][1] :]):
+        blocks[-1][1], blocks[-1][3] = len(a), len(b)
+
+    for a1, a2, b1, b2 in blocks:
+        if a1 > 0:
+            while a1 < a2 and b1 < b2 and a[a1] == b[b1]:
+                a1, b1 = a1 + 1, b1 + 1
+        if a2 < len(a):
+            while a1 < a2 and b1 < b2 and a[a2 - 1] == b[b2 - 1]:
+                a2, b2 = a2 - 1, b2 - 1
+        if a1 < a2 or b1 < b2:
+            yield a1, a2, b1, b2
+
+
+def _popular(b: Sequence[str]) -> Set[str]:
+    """Lines that ``SequenceMatcher`` ignores in ``b`` as too frequent."""
+    if len(b) < 200:
+        return set()
+    ntest = len(b) // 100 + 1
+    return {line for line, count in collections.Counter(b).items() if count > ntest}
+
+
+def _matching_blocks(
+    a: Sequence[str], b: Sequence[str], popular: Set[str]
+) -> List[Tuple[int, int, int]]:
+    """Matching blocks ``(i, j, size)`` of ``a`` and ``b``, as difflib finds them.
+
+    ``SequenceMatcher`` doesn't let ``popular`` lines of a whole file start a
+    match between parts of it, but they are added at the ends of matches.
+    """
+    b2j: Dict[str, List[int]] = {}
+    for j, line in enumerate(b):
+        if line not in popular:
+            b2j.setdefault(line, []).append(j)
+
+    def longest(a_lo: int, a_hi: int, b_lo: int, b_hi: int) -> Tuple[int, int, int]:
+        besti, bestj, bestsize = a_lo, b_lo, 0
+        j2len: Dict[int, int] = {}
+        for i in range(a_lo, a_hi):
+            new_j2len = {}
+            for j in b2j.get(a[i], ()):
+                if j < b_lo:
+                    continue
+                if j >= b_hi:
+                    break
+                k = new_j2len[j] = j2len.get(j - 1, 0) + 1
+                if k > bestsize:
+                    besti, bestj, bestsize = i - k + 1, j - k + 1, k
+            j2len = new_j2len
+        while besti > a_lo and bestj > b_lo and a[besti - 1] == b[bestj - 1]:
+            besti, bestj, bestsize = besti - 1, bestj - 1, bestsize + 1
+        while (
+            besti + bestsize < a_hi
+            and bestj + bestsize < b_hi
+            and a[besti + bestsize] == b[bestj + bestsize]
+        ):
+            bestsize += 1
+        return besti, bestj, bestsize
+
+    blocks = []
+    queue = [(0, len(a), 0, len(b))]
+    while queue:
+        a_lo, a_hi, b_lo, b_hi = queue.pop()
+        i, j, k = match = longest(a_lo, a_hi, b_lo, b_hi)
+        if k:
+            blocks.append(match)
+            if a_lo < i and b_lo < j:
+                queue.append((a_lo, i, b_lo, j))
+            if i + k < a_hi and j + k < b_hi:
+                queue.append((i + k, a_hi, j + k, b_hi))
+    blocks.sort()
+
+    merged = []
+    i1 = j1 = k1 = 0
+    for i2, j2, k2 in blocks:
+        if i1 + k1 == i2 and j1 + k1 == j2:
+            k1 += k2
+            continue
+        if k1:
+            merged.append((i1, j1, k1))
+        i1, j1, k1 = i2, j2, k2
+    if k1:
+        merged.append((i1, j1, k1))
+    merged.append((len(a), len(b), 0))
+    return merged
+
+
+def _block_opcodes(
+    a: Sequence[str], b: Sequence[str], popular: Set[str]
+) -> Iterator[Opcode]:
+    """Opcodes of ``a`` and ``b``, as ``SequenceMatcher.get_opcodes`` gives them."""
+    i = j = 0
+    for ai, bj, size in _matching_blocks(a, b, popular):
+        if i < ai and j < bj:
+            yield "replace", i, ai, j, bj
+        elif i < ai:
+            yield "delete", i, ai, j, bj
+        elif j < bj:
+            yield "insert", i, ai, j, bj
+        i, j = ai + size, bj + size
+        if size:
+            yield "equal", ai, i, bj, j
+
+
+def _collide(
+    a: Sequence[str],
+    b: Sequence[str],
+    blocks: Sequence[Tuple[int, int, int, int]],
+    popular: Set[str],
+) -> bool:
+    """Is a line of a changed block on one side elsewhere on the other side?
+
+    ``SequenceMatcher`` may then match it with that line, instead of with a
+    line of the block.
+    """
+    counts_a, counts_b = collections.Counter(a), collections.Counter(b)
+    for a1, a2, b1, b2 in blocks:
+        in_a = collections.Counter(a[a1:a2])
+        in_b = collections.Counter(b[b1:b2])
+        for line in in_a:
+            if line not in popular and counts_b[line] != in_b[line]:
+                return True
+        for line in in_b:
+            if line not in popular and counts_a[line] != in_a[line]:
+                return True
+    return False
+
+
+def _opcodes(
+    a: Sequence[str], b: Sequence[str], edits: Sequence[Edit]
+) -> Optional[List[Opcode]]:
+    """Opcodes of ``a`` and ``b`` like ``SequenceMatcher`` gives them, if known.
+
+    None if a changed line collides with an unchanged one, see ``_collide``.
+    """
+    popular = _popular(b)
+    blocks = list(_changed_blocks(a, b, edits, popular))
+    if _collide(a, b, blocks, popular):
+        return None
+    codes: List[Opcode] = []
+    i = j = 0
+    for a1, a2, b1, b2 in blocks:
+        if i < a1:
+            codes.append(("equal", i, a1, j, b1))
+        for tag, i1, i2, j1, j2 in _block_opcodes(a[a1:a2], b[b1:b2], popular):
+            codes.append((tag, a1 + i1, a1 + i2, b1 + j1, b1 + j2))
+        i, j = a2, b2
+    if i < len(a):
+        codes.append(("equal", i, len(a), j, len(b)))
+    return codes
+
+
+def _grouped(codes: List[Opcode], n: int) -> Iterator[List[Opcode]]:
+    """Groups of ``codes`` with ``n`` lines of context, see ``SequenceMatcher``."""
+    if not codes:
+        codes = [("equal", 0, 1, 0, 1)]
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+
+    group: List[Opcode] = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == "equal" and i2 - i1 > 2 * n:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        yield group
+
+
+def _format_range(start: int, stop: int) -> str:
+    length = stop - start
+    if length == 1:
+        return f"{start + 1}"
+    if not length:
+        return f"{start},0"
+    return f"{start + 1},{length}"
+
+
+def unified_diff(
+    a: Sequence[str],
+    b: Sequence[str],
+    edits: Sequence[Edit],
+    fromfile: str = "",
+    tofile: str = "",
+    n: int = 3,
+    lineterm: str = "\n",
+) -> Iterator[str]:
+    """Like ``difflib.unified_diff(a, b, ...)``, for lines ``b`` made by ``edits``.
+
+    ``a`` and ``b`` are the lines of the source and of the converted code.
+    """
+    codes = _opcodes(a, b, edits)
+    if codes is None:
+        yield from difflib.unified_diff(a, b, fromfile, tofile, n=n, lineterm=lineterm)
+        return
+    started = False
+    for group in _grouped(codes, n):
+        if not started:
+            started = True
+            yield f"--- {fromfile}{lineterm}"
+            yield f"+++ {tofile}{lineterm}"
+
+        first, last = group[0], group[-1]
+        file1_range = _format_range(first[1], last[2])
+        file2_range = _format_range(first[3], last[4])
+        yield f"@@ -{file1_range} +{file2_range} @@{lineterm}"
+
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                for line in a[i1:i2]:
+                    yield " " + line
+                continue
+            if tag in {"replace", "delete"}:
+                for line in a[i1:i2]:
+                    yield "-" + line
+            if tag in {"replace", "insert"}:
+                for line in b[j1:j2]:
+                    yield "+" + line
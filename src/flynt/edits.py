@@ -0,0 +1,171 @@
+"""Records of the replacements made in a source, and how to combine them.
+
+Positions are given as 1-based line numbers (like ``ast`` line numbers) and
+0-based character (not byte) columns; the end position is exclusive.
+"""
+
+import dataclasses
+from typing import List, Optional, Sequence, Tuple
+
+Position = Tuple[int, int]
+
+
+@dataclasses.dataclass(frozen=True)
+class Edit:
+    kind: str  # "percent", "format", "concat" or "join" ("source" of a notebook cell)
+    start_line: int
+    start_col: int
+    end_line: int
+    end_col: int
+    original: str
+    replacement: str
+
+    @property
+    def start(self) -> Position:
+        return self.start_line, self.start_col
+
+    @property
+    def end(self) -> Position:
+        return self.end_line, self.end_col
+
+    def to_dict(self) -> dict:
+        return dataclasses.asdict(self)
+
+
+def _end_after(start: Position, text: str) -> Position:
+    """Position after ``text`` inserted at ``start``."""
+    lines = text.split("\n")
+    if len(lines) == 1:
+        return start[0], start[1] + len(text)
+    return start[0] + len(lines) - 1, len(lines[-1])
+
+
+def output_spans(edits: Sequence[Edit]) -> List[Tuple[Position, Position]]:
+    """Spans of the replacements of ``edits`` (sorted, not overlapping) in the result."""
+    spans = []
+    line_delta = 0
+    last_end_line = 0
+    col_delta = 0
+    for edit in edits:
+        col = edit.start_col + (col_delta if edit.start_line == last_end_line else 0)
+        start = (edit.start_line + line_delta, col)
+        end = _end_after(start, edit.replacement)
+        spans.append((start, end))
+        line_delta = end[0] - edit.end_line
+        last_end_line = edit.end_line
+        col_delta = end[1] - edit.end_col
+    return spans
+
+
+def _text_between(lines: Sequence[str], start: Position, end: Position) -> str:
+    (sl, sc), (el, ec) = start, end
+    if sl == el:
+        return lines[sl - 1][sc:ec]
+    return "\n".join([lines[sl - 1][sc:], *lines[sl : el - 1], lines[el - 1][:ec]])
+
+
+def compose(source: str, first: Sequence[Edit], second: Sequence[Edit]) -> List[Edit]:
+    """Combine edits of two consecutive transform stages.
+
+    ``first`` were applied to ``source``; ``second`` were applied to the result,
+    and are given in positions of that result. Returns edits that turn ``source``
+    into the final result directly. Edits of ``first`` that a later edit
+    replaced again, in full or in part, are merged into it.
+    """
+    if not second:
+        return list(first)
+    if not first:
+        return list(second)
+
+    spans = output_spans(first)
+    src_lines = source.split("\n")
+    out_lines = apply_edits(source, first).split("\n")
+
+    # edits of ``first`` before ``idx`` end before all positions mapped so far;
+    # positions are mapped in order, so the cursor only moves forward
+    idx = 0
+    line_delta = 0
+    last: Optional[int] = None
+
+    def to_source(pos: Position, is_end: bool) -> Tuple[Position, Position, int]:
+        """Map a position in the result back to ``source``.
+
+        Also returns the position in the result the mapped one corresponds to,
+        which differs if ``pos`` is inside a replacement, and the index of the
+        first edit of ``first`` after ``pos``.
+        """
+        nonlocal idx, line_delta, last
+        while idx < len(first):
+            out_start, out_end = spans[idx]
+            if pos < out_start or (is_end and pos == out_start):
+                break
+            if pos < out_end or (not is_end and pos == out_start):
+                # inside a replacement: expand to the whole replaced span
+                edit = first[idx]
+                if is_end:
+                    return edit.end, out_end, idx + 1
+                return edit.start, out_start, idx
+            last = idx
+            line_delta = out_end[0] - first[idx].end_line
+            idx += 1
+        if last is not None and pos[0] == spans[last][1][0]:
+            edit = first[last]
+            col = edit.end_col + pos[1] - spans[last][1][1]
+            return (edit.end_line, col), pos, idx
+        return (pos[0] - line_delta, pos[1]), pos, idx
+
+    result: List[Edit] = []
+    next_first = 0
+    # the last merged edit, whose replacement still lacks the text of the
+    # result from the end of the last edit of ``second`` to ``merged_out_end``
+    merged: Optional[Edit] = None
+    merged_out_end = second_end = (0, 0)
+
+    def finish(edit: Edit) -> Edit:
+        rest = _text_between(out_lines, second_end, merged_out_end)
+        return dataclasses.replace(edit, replacement=edit.replacement + rest)
+
+    for edit in second:
+        start, out_start, first_inside = to_source(edit.start, is_end=False)
+        end, out_end, first_after = to_source(edit.end, is_end=True)
+        if merged is not None and start < merged.end:
+            # inside the same replacement of ``first`` as the previous edit
+            start = merged.start
+            before = merged.replacement + _text_between(
+                out_lines, second_end, edit.start
+            )
+        else:
+            if merged is not None:
+                result.append(finish(merged))
+            result.extend(first[next_first:first_inside])
+            before = _text_between(out_lines, out_start, edit.start)
+        next_first = max(next_first, first_after)
+        merged = dataclasses.replace(
+            edit,
+            start_line=start[0],
+            start_col=start[1],
+            end_line=end[0],
+            end_col=end[1],
+            original=_text_between(src_lines, start, end),
+            replacement=before + edit.replacement,
+        )
+        merged_out_end, second_end = out_end, edit.end
+    if merged is not None:
+        result.append(finish(merged))
+    result.extend(first[next_first:])
+    return result
+
+
+def apply_edits(source: str, edits: Sequence[Edit]) -> str:
+    """Apply sorted, non-overlapping ``edits`` given in positions of ``source``."""
+    offsets = [0]
+    for line in source.split("\n"):
+        offsets.append(offsets[-1] + len(line) + 1)
+    parts = []
+    pos = 0
+    for edit in edits:
+        start = offsets[edit.start_line - 1] + edit.start_col
+        parts += [source[pos:start], edit.replacement]
+        pos = offsets[edit.end_line - 1] + edit.end_col
+    parts.append(source[pos:])
+    return "".join(parts)
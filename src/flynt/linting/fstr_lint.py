@@ -1,7 +1,9 @@
 import ast
+import copy
 from typing import List
 
 from flynt.candidates.ast_chunk import AstChunk
+from flynt.utils.copy_on_write import CopyOnWriteTransformer
 
 
 class FstringFinder(ast.NodeVisitor):
@@ -25,9 +27,10 @@ def fstr_candidates(code: str):
     yield from ch.victims
 
 
-class FstrInliner(ast.NodeTransformer):
+class FstrInliner(CopyOnWriteTransformer):
     def visit_JoinedStr(self, node: ast.JoinedStr) -> ast.AST:
         new_vals = []
+        inlined = False
         for v in node.values:
             if (
                 isinstance(v, ast.FormattedValue)
@@ -35,8 +38,11 @@ class FstrInliner(ast.NodeTransformer):
                 and v.format_spec is None
             ):
                 new_vals += v.value.values
+                inlined = True
             else:
                 new_vals.append(v)
 
-        node.values = new_vals
+        if inlined:
+            node = copy.copy(node)
+            node.values = new_vals
         return self.generic_visit(node)
@@ -0,0 +1,314 @@
+"""Code cells of Jupyter notebooks, read from and replaced in the raw JSON.
+
+Only the structure of the notebook down to the ``source`` of its cells is
+looked at; outputs, attachments and all other values are skipped, and kept
+as they are in the file when sources are replaced. Notebooks with large
+embedded images are thus neither decoded into objects nor re-encoded.
+
+The code cells are converted together, as one module. ``join_cells`` builds
+it, ``split_module`` maps the edits made to it back to the cells, and
+``module_line_ranges`` maps lines of the notebook to lines of the module.
+"""
+
+import dataclasses
+import json
+import re
+from json import JSONDecodeError
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from flynt.edits import Edit, apply_edits
+
+_whitespace = re.compile(r"[ \t\n\r]*")
+# the values other than strings, objects and arrays
+_literal = re.compile(
+    r"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?"
+    r"|true|false|null|NaN|Infinity|-Infinity"
+)
+
+
+@dataclasses.dataclass
+class CodeCell:
+    source: str
+    # span of the JSON value of the source in the notebook
+    start: int
+    end: int
+    # whitespace after `[`, between and before `]` of a source given as
+    # list of lines, to write a new list in the same layout
+    layout: Optional[Tuple[str, str, str]] = None
+
+
+def _skip(raw: str, pos: int) -> int:
+    return _whitespace.match(raw, pos).end()  # type: ignore[union-attr]
+
+
+def _expect(raw: str, pos: int, char: str) -> int:
+    if raw[pos : pos + 1] != char:
+        raise JSONDecodeError(f"Expecting {char!r}", raw, pos)
+    return pos + 1
+
+
+def _value(raw: str, pos: int) -> Tuple[object, int]:
+    end = _skip_value(raw, pos)
+    try:
+        return json.loads(raw[pos:end]), end
+    except JSONDecodeError as e:
+        raise JSONDecodeError(e.msg, raw, pos + e.pos) from None
+
+
+def _skip_value(raw: str, pos: int) -> int:
+    """Return the end of the value at ``pos``, without decoding strings."""
+    char = raw[pos : pos + 1]
+    if char == '"':
+        end = raw.find('"', pos + 1)
+        while end != -1:
+            # the quote ends the string unless escaped by a backslash
+            before = end - 1
+            while raw[before] == "\\":
+                before -= 1
+            if (end - before) % 2 == 1:
+                return end + 1
+            end = raw.find('"', end + 1)
+        raise JSONDecodeError("Unterminated string", raw, pos)
+    if char == "{":
+        return _object(raw, pos, lambda key, pos: _skip_value(raw, pos))
+    if char == "[":
+        return _array(raw, pos, lambda pos: _skip_value(raw, pos))
+    match = _literal.match(raw, pos)
+    if match is None:
+        raise JSONDecodeError("Expecting value", raw, pos)
+    return match.end()
+
+
+def _object(raw: str, pos: int, member: Callable[[str, int], int]) -> int:
+    """Scan the object at ``pos``, return its end.
+
+    ``member(key, pos)`` is called for each value, and returns its end.
+    """
+    pos = _skip(raw, _expect(raw, pos, "{"))
+    if raw[pos : pos + 1] == "}":
+        return pos + 1
+    while True:
+        _expect(raw, pos, '"')
+        key, pos = _value(raw, pos)
+        assert isinstance(key, str)
+        pos = _skip(raw, _expect(raw, _skip(raw, pos), ":"))
+        pos = _skip(raw, member(key, pos))
+        if raw[pos : pos + 1] == "}":
+            return pos + 1
+        pos = _skip(raw, _expect(raw, pos, ","))
+
+
+def _array(raw: str, pos: int, item: Callable[[int], int]) -> int:
+    """Scan the array at ``pos``, calling ``item(pos)`` for each value."""
+    pos = _skip(raw, _expect(raw, pos, "["))
+    if raw[pos : pos + 1] == "]":
+        return pos + 1
+    while True:
+        pos = _skip(raw, item(pos))
+        if raw[pos : pos + 1] == "]":
+            return pos + 1
+        pos = _skip(raw, _expect(raw, pos, ","))
+
+
+def _source(raw: str, pos: int) -> Tuple[CodeCell, int]:
+    value, end = _value(raw, pos)
+    if isinstance(value, str):
+        return CodeCell(value, pos, end), end
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise JSONDecodeError("Expecting a string or a list of strings", raw, pos)
+    inner = raw[pos + 1 : end - 1]
+    opening = inner[: len(inner) - len(inner.lstrip())]
+    closing = inner[len(inner.rstrip()) :]
+    if len(value) > 1:
+        _, after_first = _value(raw, _skip(raw, pos + 1))
+        comma = _skip(raw, after_first)
+        separator = raw[comma + 1 : _skip(raw, comma + 1)]
+    else:
+        separator = opening if "\n" in opening else " "
+    return CodeCell("".join(value), pos, end, (opening, separator, closing)), end
+
+
+def code_cells(raw: str) -> List[CodeCell]:
+    """The code cells of the notebook ``raw``, in order.
+
+    Raises ``json.JSONDecodeError`` if it isn't a valid notebook.
+    """
+    cells: List[CodeCell] = []
+
+    def cell(pos: int) -> int:
+        found: Dict[str, object] = {}
+
+        def member(key: str, pos: int) -> int:
+            if key == "cell_type":
+                found[key], pos = _value(raw, pos)
+            elif key == "source":
+                found[key], pos = _source(raw, pos)
+            else:
+                pos = _skip_value(raw, pos)
+            return pos
+
+        end = _object(raw, pos, member)
+        if found.get("cell_type") == "code" and "source" in found:
+            cells.append(found["source"])  # type: ignore[arg-type]
+        return end
+
+    def top_level(key: str, pos: int) -> int:
+        if key == "cells":
+            return _array(raw, pos, cell)
+        return _skip_value(raw, pos)
+
+    end = _skip(raw, _object(raw, _skip(raw, 0), top_level))
+    if end != len(raw):
+        raise JSONDecodeError("Extra data", raw, end)
+    return cells
+
+
+def _dump_source(cell: CodeCell, source: str) -> str:
+    if cell.layout is None:
+        return json.dumps(source, ensure_ascii=False)
+    lines = source.splitlines(keepends=True)
+    if not lines:
+        return "[]"
+    opening, separator, closing = cell.layout
+    items = f",{separator}".join(json.dumps(line, ensure_ascii=False) for line in lines)
+    return f"[{opening}{items}{closing}]"
+
+
+def source_edits(
+    raw: str, cells: Sequence[CodeCell], sources: Sequence[str]
+) -> List[Edit]:
+    """Edits of ``raw`` replacing the source of each of ``cells`` by ``sources``."""
+    edits = []
+    line, line_start, pos = 1, 0, 0
+
+    def position(offset: int) -> Tuple[int, int]:
+        nonlocal line, line_start, pos
+        line += raw.count("\n", pos, offset)
+        newline = raw.rfind("\n", pos, offset)
+        if newline != -1:
+            line_start = newline + 1
+        pos = offset
+        return line, offset - line_start
+
+    for cell, source in zip(cells, sources):
+        if source == cell.source:
+            continue
+        start_line, start_col = position(cell.start)
+        end_line, end_col = position(cell.end)
+        edits.append(
+            Edit(
+                "source",
+                start_line,
+                start_col,
+                end_line,
+                end_col,
+                raw[cell.start : cell.end],
+                _dump_source(cell, source),
+            )
+        )
+    return edits
+
+
+def replace_sources(raw: str, cells: Sequence[CodeCell], sources: Sequence[str]) -> str:
+    """Return ``raw`` with the source of each of ``cells`` replaced by ``sources``."""
+    parts = []
+    pos = 0
+    for cell, source in zip(cells, sources):
+        if source == cell.source:
+            continue
+        parts += [raw[pos : cell.start], _dump_source(cell, source)]
+        pos = cell.end
+    parts.append(raw[pos:])
+    return "".join(parts)
+
+
+def join_cells(sources: Sequence[str]) -> Tuple[str, List[int]]:
+    """Join cell ``sources`` to a module, return it and the first line of each."""
+    parts = []
+    first_lines = []
+    line = 1
+    for source in sources:
+        if not source.endswith("\n"):
+            source += "\n"
+        first_lines.append(line)
+        parts.append(source)
+        line += source.count("\n")
+    return "".join(parts), first_lines
+
+
+def split_module(
+    sources: Sequence[str], first_lines: Sequence[int], edits: Sequence[Edit]
+) -> List[str]:
+    """Apply ``edits`` of the module joined from ``sources`` to the sources."""
+    by_cell: List[List[Edit]] = [[] for _ in sources]
+    idx = 0
+    for edit in edits:
+        while idx + 1 < len(first_lines) and first_lines[idx + 1] <= edit.start_line:
+            idx += 1
+        offset = first_lines[idx] - 1
+        by_cell[idx].append(
+            dataclasses.replace(
+                edit,
+                start_line=edit.start_line - offset,
+                end_line=edit.end_line - offset,
+            )
+        )
+    return [
+        apply_edits(source, cell_edits) if cell_edits else source
+        for source, cell_edits in zip(sources, by_cell)
+    ]
+
+
+def _item_lines(raw: str, cell: CodeCell, start_line: int) -> Optional[List[int]]:
+    """Lines of ``raw`` with each line of the source of ``cell``, if listed so."""
+    if cell.layout is None:
+        return None
+    items: List[str] = []
+    positions: List[int] = []
+
+    def item(pos: int) -> int:
+        value, end = _value(raw, pos)
+        items.append(value)  # type: ignore[arg-type]
+        positions.append(pos)
+        return end
+
+    _array(raw, cell.start, item)
+    if any("\n" in line[:-1] for line in items) or not all(
+        line.endswith("\n") for line in items[:-1]
+    ):
+        return None
+    return [start_line + raw.count("\n", cell.start, pos) for pos in positions]
+
+
+def module_line_ranges(
+    raw: str,
+    cells: Sequence[CodeCell],
+    first_lines: Sequence[int],
+    ranges: Sequence[Tuple[int, int]],
+) -> List[Tuple[int, int]]:
+    """Map line ranges of the notebook ``raw`` to the module joined from ``cells``.
+
+    Lines of a source given as a list of lines map to their lines in the
+    module. A cell with a source given otherwise counts as changed as a whole
+    if any of its lines changed.
+    """
+    result = []
+    line, pos = 1, 0
+    for cell, first_line in zip(cells, first_lines):
+        line += raw.count("\n", pos, cell.start)
+        pos = cell.start
+        end_line = line + raw.count("\n", cell.start, cell.end)
+        touched = [
+            (start, end) for start, end in ranges if start <= end_line and line <= end
+        ]
+        if not touched:
+            continue
+        item_lines = _item_lines(raw, cell, line)
+        if item_lines is None:
+            n_lines = cell.source.count("\n") + (not cell.source.endswith("\n"))
+            result.append((first_line, first_line + max(n_lines, 1) - 1))
+            continue
+        for idx, item_line in enumerate(item_lines):
+            if any(start <= item_line <= end for start, end in touched):
+                result.append((first_line + idx, first_line + idx))
+    return result
@@ -0,0 +1,183 @@
+"""Machine-readable output of a run over files, see ``--format``.
+
+Records are written as soon as a file is processed, so that memory use doesn't
+grow with the number of files or edits.
+
+``jsonl``
+    one JSON object per line: a ``file`` record for each file, followed by an
+    ``edit`` record for each of its edits, and a ``summary`` record at the end.
+``json``
+    a single JSON object with the list of files, each with its edits, and the
+    summary.
+``sarif``
+    a SARIF 2.1.0 log with a result, including a fix, for each edit. The
+    summary is given in the properties of the run.
+"""
+
+import abc
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Sequence, TextIO
+
+from flynt import __version__
+from flynt.edits import Edit
+
+FORMATS = ("text", "json", "jsonl", "sarif")
+
+Record = Dict[str, Any]
+
+_DESCRIPTIONS = {
+    "percent": "Old style (`%`) formatting can be an f-string.",
+    "format": "A `.format(...)` call can be an f-string.",
+    "concat": "A concatenation of strings can be an f-string.",
+    "join": "A static string join can be an f-string.",
+    "source": "A code cell of a notebook has expressions that can be f-strings.",
+}
+
+
+def _dumps(record: Record) -> str:
+    return json.dumps(record, ensure_ascii=False)
+
+
+def file_record(path: str, status: str, edits: Sequence[Edit]) -> Record:
+    return {"path": path, "status": status, "changes": len(edits)}
+
+
+def edit_record(path: str, edit: Edit) -> Record:
+    return {"path": path, **edit.to_dict()}
+
+
+class Output(abc.ABC):
+    """Writes the records of a run to ``stream``."""
+
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+
+    def start(self) -> None:
+        """Write what comes before the first file, if anything."""
+
+    @abc.abstractmethod
+    def file(self, path: str, status: str, edits: Sequence[Edit]) -> None:
+        """Write the records of a processed file and its ``edits``."""
+
+    @abc.abstractmethod
+    def finish(self, summary: Record) -> None:
+        """Write the ``summary`` of the run and end the output."""
+
+
+class JsonLinesOutput(Output):
+    def file(self, path: str, status: str, edits: Sequence[Edit]) -> None:
+        lines = [_dumps({"type": "file", **file_record(path, status, edits)})]
+        for edit in edits:
+            lines.append(_dumps({"type": "edit", **edit_record(path, edit)}))
+        self.stream.write("\n".join(lines) + "\n")
+
+    def finish(self, summary: Record) -> None:
+        self.stream.write(_dumps({"type": "summary", **summary}) + "\n")
+
+
+class JsonOutput(Output):
+    def __init__(self, stream: TextIO) -> None:
+        super().__init__(stream)
+        self.separator = "\n"
+
+    def start(self) -> None:
+        self.stream.write('{"files": [')
+
+    def file(self, path: str, status: str, edits: Sequence[Edit]) -> None:
+        record = file_record(path, status, edits)
+        record["edits"] = [edit.to_dict() for edit in edits]
+        self.stream.write(self.separator + _dumps(record))
+        self.separator = ",\n"
+
+    def finish(self, summary: Record) -> None:
+        self.stream.write(f'\n], "summary": {_dumps(summary)}}}\n')
+
+
+def _artifact_uri(path: str) -> str:
+    if os.path.isabs(path):
+        return Path(path).as_uri()
+    return Path(path).as_posix()
+
+
+class SarifOutput(Output):
+    def __init__(self, stream: TextIO) -> None:
+        super().__init__(stream)
+        self.separator = "\n"
+
+    def start(self) -> None:
+        driver = {
+            "name": "flynt",
+            "version": __version__,
+            "informationUri": "https://github.com/ikamensh/flynt",
+            "rules": [
+                {"id": kind, "shortDescription": {"text": text}}
+                for kind, text in _DESCRIPTIONS.items()
+            ],
+        }
+        # the results of the run are written one by one
+        self.stream.write(
+            '{"$schema": "https://json.schemastore.org/sarif-2.1.0.json", '
+            '"version": "2.1.0", '
+            f'"runs": [{{"tool": {_dumps({"driver": driver})}, '
+            '"columnKind": "unicodeCodePoints", "results": ['
+        )
+
+    def file(self, path: str, status: str, edits: Sequence[Edit]) -> None:
+        location = {"uri": _artifact_uri(path)}
+        for edit in edits:
+            region = {
+                "startLine": edit.start_line,
+                "startColumn": edit.start_col + 1,
+                "endLine": edit.end_line,
+                "endColumn": edit.end_col + 1,
+            }
+            result = {
+                "ruleId": edit.kind,
+                "level": "note",
+                "message": {"text": f"`{edit.original}` can be `{edit.replacement}`."},
+                "locations": [
+                    {
+                        "physicalLocation": {
+                            "artifactLocation": location,
+                            "region": region,
+                        }
+                    }
+                ],
+                "fixes": [
+                    {
+                        "description": {"text": "Convert to an f-string."},
+                        "artifactChanges": [
+                            {
+                                "artifactLocation": location,
+                                "replacements": [
+                                    {
+                                        "deletedRegion": region,
+                                        "insertedContent": {"text": edit.replacement},
+                                    }
+                                ],
+                            }
+                        ],
+                    }
+                ],
+            }
+            self.stream.write(self.separator + _dumps(result))
+            self.separator = ",\n"
+
+    def finish(self, summary: Record) -> None:
+        self.stream.write(f'\n], "properties": {_dumps(summary)}}}]}}\n')
+
+
+_OUTPUTS: Dict[str, Callable[[TextIO], Output]] = {
+    "json": JsonOutput,
+    "jsonl": JsonLinesOutput,
+    "sarif": SarifOutput,
+}
+
+
+def output_for(output_format: str, stream: TextIO) -> Optional[Output]:
+    """Return the output for ``output_format``, or None for the text output."""
+    if output_format == "text":
+        return None
+    return _OUTPUTS[output_format](stream)
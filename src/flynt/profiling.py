@@ -0,0 +1,135 @@
+"""Wall time spent in the phases of converting files, see ``--profile``.
+
+Phases are timed exclusively: while a nested phase runs (e.g. unparsing during a
+transform), the enclosing one is paused, so the phase times add up to the total.
+Transform stages are additionally timed per kind, including nested phases.
+
+Instrumented code calls ``phase(name)``, which does nothing unless a profile is
+active, i.e. a file is being processed with ``State.profile`` set.
+"""
+
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import ContextManager, Dict, Iterator, List, Optional, Tuple
+
+PHASES = (
+    "read",
+    "prefilter",
+    "decode",
+    "parse",
+    "candidates",
+    "transform",
+    "unparse",
+    "verify",
+    "write",
+)
+
+_active: Optional["Profile"] = None
+_inactive = nullcontext()
+
+
+class Profile:
+    def __init__(self) -> None:
+        self.phases: Dict[str, float] = defaultdict(float)
+        self.kinds: Dict[str, float] = defaultdict(float)
+        self.files: Dict[str, Dict[str, float]] = {}
+        self._file: Optional[Dict[str, float]] = None
+        # phase being timed, with time it (re)started
+        self._stack: List[Tuple[str, float]] = []
+
+    def _add(self, now: float) -> None:
+        current, started = self._stack[-1]
+        self.phases[current] += now - started
+        if self._file is not None:
+            self._file[current] = self._file.get(current, 0.0) + now - started
+
+    def push(self, name: str) -> None:
+        now = time.perf_counter()
+        if self._stack:
+            self._add(now)
+        self._stack.append((name, now))
+
+    def pop(self) -> None:
+        now = time.perf_counter()
+        self._add(now)
+        self._stack.pop()
+        if self._stack:
+            self._stack[-1] = (self._stack[-1][0], now)
+
+    def merge(self, other: "Profile") -> None:
+        for name, seconds in other.phases.items():
+            self.phases[name] += seconds
+        for kind, seconds in other.kinds.items():
+            self.kinds[kind] += seconds
+        self.files.update(other.files)
+
+    def slowest_files(self, n: int) -> List[Tuple[str, float]]:
+        totals = [(name, sum(phases.values())) for name, phases in self.files.items()]
+        return sorted(totals, key=lambda item: item[1], reverse=True)[:n]
+
+    def as_dict(self, top_n: int = 20) -> dict:
+        return {
+            "total": sum(self.phases.values()),
+            "phases": dict(self.phases),
+            "transform_kinds": dict(self.kinds),
+            "files": len(self.files),
+            "slowest_files": [
+                {"file": name, "total": total, "phases": self.files[name]}
+                for name, total in self.slowest_files(top_n)
+            ],
+        }
+
+    def dump(self, path: str, top_n: int = 20) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(top_n), f, indent=2)
+
+    def print_summary(self, top_n: int = 10) -> None:
+        total = sum(self.phases.values()) or 1.0
+        print("\nTime per phase:")
+        for name in PHASES:
+            seconds = self.phases.get(name, 0.0)
+            print(f"  {name:<12} {seconds:10.3f}s ({seconds / total:.1%})")
+        if self.kinds:
+            print("Time per transform:")
+            for kind, seconds in self.kinds.items():
+                print(f"  {kind:<12} {seconds:10.3f}s")
+        print("Slowest files:")
+        for name, seconds in self.slowest_files(top_n):
+            print(f"  {seconds:10.3f}s  {name}")
+
+
+@contextmanager
+def _timed(profile: Profile, name: str, kind: Optional[str]) -> Iterator[None]:
+    started = time.perf_counter()
+    profile.push(name)
+    try:
+        yield
+    finally:
+        profile.pop()
+        if kind is not None:
+            profile.kinds[kind] += time.perf_counter() - started
+
+
+def phase(name: str, kind: Optional[str] = None) -> ContextManager[None]:
+    """Time the enclosed code as ``name`` (and transform ``kind``), if profiling."""
+    if _active is None:
+        return _inactive
+    return _timed(_active, name, kind)
+
+
+@contextmanager
+def processing(profile: Optional[Profile], filename: str) -> Iterator[None]:
+    """Activate ``profile`` for the phases of processing ``filename``."""
+    global _active
+    if profile is None or _active is not None:
+        yield
+        return
+    _active = profile
+    profile._file = profile.files.setdefault(filename, {})
+    try:
+        yield
+    finally:
+        profile._file = None
+        _active = None
@@ -1,7 +1,24 @@
 """This module contains global state of flynt application instance."""
 
 import dataclasses
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+
+from flynt.profiling import Profile
+
+STATISTICS = (
+    "percent_candidates",
+    "percent_transforms",
+    "call_candidates",
+    "call_transforms",
+    "invalid_conversions",
+    "concat_candidates",
+    "concat_changes",
+    "join_candidates",
+    "join_changes",
+    "prefiltered_files",
+    "duplicate_files",
+    "unwritten_files",
+)
 
 
 @dataclasses.dataclass
@@ -19,6 +36,27 @@ class State:
     transform_concat: bool = False
     transform_join: bool = False
     process_notebooks: bool = False
+    # skip files ignored by .gitignore/.ignore files while walking directories,
+    # turned on by the CLI
+    use_ignore_files: bool = False
+    jobs: int = 1
+    cache_dir: Optional[str] = None
+    diff_base: Optional[str] = None
+    staged: bool = False
+    changed_lines_only: bool = False
+    # how rewritten code is checked, one of flynt.verification.STRATEGIES
+    verification: str = "per-candidate"
+    # sync written files to disk at the end of the run, see flynt.writer
+    fsync: bool = False
+    # directory to write archives given as sources to, with converted members
+    archive_output: Optional[str] = None
+    # format of the output of a run over files, one of flynt.output.FORMATS
+    output_format: str = "text"
+    # files to changed line ranges, set when processing only changed lines
+    changed_lines: Optional[Dict[str, Optional[List[Tuple[int, int]]]]] = None
+    # time spent per phase is recorded if set, see flynt.profiling
+    profile: Optional[Profile] = None
+    profile_output: Optional[str] = None
 
     # -- Statistics
     percent_candidates: int = 0
@@ -35,6 +73,30 @@ class State:
     join_candidates: int = 0
     join_changes: int = 0
 
+    # files skipped without parsing, as they can't have candidates
+    prefiltered_files: int = 0
+    # files with the same contents as one converted before, see flynt.dedup
+    duplicate_files: int = 0
+    # converted files that couldn't be written back, see flynt.writer
+    unwritten_files: int = 0
+
     def __post_init__(self):
         if not self.multiline:
             self.len_limit = 0
+
+    def fresh(self) -> "State":
+        """Return a copy with the same options and zeroed statistics."""
+        state = dataclasses.replace(
+            self,
+            profile=None if self.profile is None else Profile(),
+        )
+        for name in STATISTICS:
+            setattr(state, name, 0)
+        return state
+
+    def merge(self, other: "State") -> None:
+        """Add statistics collected by ``other`` (e.g. in a worker) to this state."""
+        for name in STATISTICS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        if self.profile is not None and other.profile is not None:
+            self.profile.merge(other.profile)
@@ -1,18 +1,53 @@
 import ast
+import weakref
 from typing import Iterable, List
 
 from flynt.candidates.ast_chunk import AstChunk
 from flynt.state import State
 from flynt.utils.utils import is_str_literal
 
+# results of is_string_concat for additions, while their nodes exist
+_concat_additions: "weakref.WeakKeyDictionary[ast.AST, bool]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _is_addition(node: ast.AST) -> bool:
+    return isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add)
+
 
 def is_string_concat(node: ast.AST) -> bool:
-    """Returns True for nodes representing a string concatenation."""
+    """Returns True for nodes representing a string concatenation.
+
+    That is a string literal, or an addition with a string literal among its
+    terms. Results for additions are remembered, so that checking every level
+    of a long chain ``a + b + c + ...`` takes linear time in total.
+    """
     if is_str_literal(node):
         return True
-    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
-        return is_string_concat(node.left) or is_string_concat(node.right)
-    return False
+    if not _is_addition(node):
+        return False
+    known = _concat_additions.get(node)
+    if known is not None:
+        return known
+
+    # additions in the tree, parents before their operands
+    additions = []
+    stack = [node]
+    while stack:
+        addition = stack.pop()
+        additions.append(addition)
+        for operand in (addition.left, addition.right):  # type: ignore[attr-defined]
+            if _is_addition(operand) and operand not in _concat_additions:
+                stack.append(operand)
+    for addition in reversed(additions):
+        _concat_additions[addition] = any(
+            _concat_additions[operand]
+            if _is_addition(operand)
+            else is_str_literal(operand)
+            for operand in (addition.left, addition.right)  # type: ignore[attr-defined]
+        )
+    return _concat_additions[node]
 
 
 class ConcatHound(ast.NodeVisitor):
@@ -20,14 +55,20 @@ class ConcatHound(ast.NodeVisitor):
         super().__init__()
         self.victims: List[AstChunk] = []
 
-    def visit_BinOp(self, node: ast.BinOp) -> None:
+    def visit(self, node: ast.AST) -> None:
         """
         Finds all nodes that are string concatenations with a literal.
+
+        Iterative, as additions in generated code can be nested too deeply for
+        a recursive visit.
         """
-        if is_string_concat(node):
-            self.victims.append(AstChunk(node))
-        else:
-            self.generic_visit(node)
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, ast.BinOp) and is_string_concat(node):
+                self.victims.append(AstChunk(node))
+            else:
+                stack.extend(reversed(list(ast.iter_child_nodes(node))))
 
 
 def concat_candidates(code: str, state: State) -> Iterable[AstChunk]:
@@ -15,22 +15,19 @@ from flynt.utils.utils import (
 
 
 def unpack_binop(node: ast.BinOp) -> List[ast.AST]:
+    """Terms of a (possibly nested) addition, from left to right."""
     assert isinstance(node, ast.BinOp)
     if not isinstance(node.op, ast.Add):
         return [node]
 
     result: List[ast.AST] = []
-
-    if isinstance(node.left, ast.BinOp) and isinstance(node.left.op, ast.Add):
-        result.extend(unpack_binop(node.left))
-    else:
-        result.append(node.left)
-
-    if isinstance(node.right, ast.BinOp) and isinstance(node.right.op, ast.Add):
-        result.extend(unpack_binop(node.right))
-    else:
-        result.append(node.right)
-
+    stack: List[ast.AST] = [node]
+    while stack:
+        term = stack.pop()
+        if isinstance(term, ast.BinOp) and isinstance(term.op, ast.Add):
+            stack += [term.right, term.left]
+        else:
+            result.append(term)
     return result
 
 
@@ -9,10 +9,13 @@ from flynt.transform.percent_transformer import (
     is_percent_stringify,
     transform_binop,
 )
+from flynt.utils.copy_on_write import CopyOnWriteTransformer
 from flynt.utils.utils import get_str_value, is_str_constant
 
 
-class FstringifyTransformer(ast.NodeTransformer):
+class FstringifyTransformer(CopyOnWriteTransformer):
+    """Replaces formatting expressions with f-strings, without modifying the tree."""
+
     def __init__(
         self,
         state: State,
@@ -36,7 +39,7 @@ class FstringifyTransformer(ast.NodeTransformer):
                 node,
                 aggressive=self.state.aggressive >= 1,
             )
-            self.visit(result_node)
+            result_node = self.visit(result_node)
             self.counter += 1
             self.state.call_transforms += 1
             return result_node
@@ -93,7 +96,6 @@ def fstringify_node(
 ) -> Tuple[ast.AST, bool]:
     ft = FstringifyTransformer(state)
     result = ft.visit(node)
-    il = FstrInliner()
-    il.visit(result)
+    result = FstrInliner().visit(result)
 
     return result, ft.counter > 0
@@ -245,7 +245,7 @@ def transform_list(node: ast.BinOp, *, aggressive: int = 0) -> ast.JoinedStr:
     assert isinstance(node.right, ast.List)
 
     # convert the list to a tuple to use that code
-    node.right = ast.Tuple(elts=node.right.elts)
+    node = ast.BinOp(left=node.left, op=node.op, right=ast.Tuple(elts=node.right.elts))
     return transform_tuple(node, aggressive=aggressive)
 
 
@@ -268,7 +268,7 @@ def transform_generic(node: ast.BinOp, aggressive: int = 0) -> ast.JoinedStr:
         return transform_dict(node, aggressive=aggressive)
 
     # if it's just a name then pretend it's tuple to use that code
-    node.right = ast.Tuple(elts=[node.right])
+    node = ast.BinOp(left=node.left, op=node.op, right=ast.Tuple(elts=[node.right]))
     return transform_tuple(node, aggressive=aggressive)
 
 
@@ -1,8 +1,8 @@
 import ast
-import copy
 import logging
 from typing import Tuple
 
+from flynt import profiling
 from flynt.exceptions import ConversionRefused
 from flynt.state import State
 from flynt.transform.FstringifyTransformer import fstringify_node
@@ -28,10 +28,9 @@ def transform_chunk(
        Tuple: resulting code, boolean: was it changed?
     """
     try:
-        converted, changed = fstringify_node(
-            copy.deepcopy(tree),
-            state=state,
-        )
+        # the transformer doesn't modify ``tree``, which is shared with the
+        # rest of the module's AST, so no copy is needed
+        converted, changed = fstringify_node(tree, state=state)
         str_in_str = str_in_str_fn(converted)
         if changed:
             if str_in_str and quote_type == QuoteTypes.single:
@@ -48,9 +47,13 @@ def transform_chunk(
         state.invalid_conversions += 1
         return None, False  # type:ignore # ideally should return one optional str
     else:
+        if changed and state.verification == "per-file":
+            # the rewritten file is checked as a whole
+            return new_code, changed
         if changed:
             try:
-                ast.parse(new_code)
+                with profiling.phase("verify"):
+                    ast.parse(new_code)
             except SyntaxError:
                 log.error(
                     f"Failed to parse transformed code `{new_code}`",
@@ -0,0 +1,115 @@
+"""Line-indexed lookup of comments and skip directives in a source.
+
+Conversions are skipped on lines with ``# noqa: flynt`` or ``# flynt: skip``,
+between ``# flynt: off`` and ``# flynt: on``, and in files starting with a
+``# flynt: skip-file`` comment.
+"""
+
+import mmap
+import re
+from itertools import accumulate
+from typing import Dict, List, Union
+
+noqa_regex = re.compile("#[ ]*noqa.*flynt")
+flynt_skip_regex = re.compile(r"#\s*flynt:\s*skip")
+flynt_off_regex = re.compile(r"#\s*flynt:\s*off\b")
+flynt_on_regex = re.compile(r"#\s*flynt:\s*on\b")
+skip_file_regex = re.compile(r"#\s*flynt:\s*skip-file\b")
+skip_file_bytes_regex = re.compile(rb"#\s*flynt:\s*skip-file\b")
+
+
+def skips_file(code: str) -> bool:
+    """Whether the comments at the top of ``code`` contain ``# flynt: skip-file``.
+
+    Only looks up to the first line of code, so it takes no time to tell for
+    large files, which are not parsed then.
+    """
+    pos = 0
+    while pos < len(code):
+        end = code.find("\n", pos)
+        if end == -1:
+            end = len(code)
+        line = code[pos:end].strip()
+        if line and not line.startswith("#"):
+            return False
+        if skip_file_regex.search(line):
+            return True
+        pos = end + 1
+    return False
+
+
+def header_skips_file(raw: Union[bytes, bytearray, mmap.mmap], start: int = 0) -> bool:
+    """Like ``skips_file``, for the bytes of a source from ``start`` on.
+
+    For sources in an ASCII-compatible encoding; only the bytes of the comments
+    at the top are looked at, so the source doesn't need to be decoded.
+    """
+    pos = start
+    while pos < len(raw):
+        end = raw.find(b"\n", pos)
+        if end == -1:
+            end = len(raw)
+        line = raw[pos:end].strip()
+        if line and not line.startswith(b"#"):
+            return False
+        if skip_file_bytes_regex.search(line):
+            return True
+        pos = end + 1
+    return False
+
+
+class CommentIndex:
+    """Tells which parts of a source may have comments, or are skipped.
+
+    Built with one pass over the lines of the source: a comment needs a ``#``,
+    so only lines with a ``#`` are looked at more closely. Lines are 0-based,
+    columns are character indices. Lookups take constant time (plus the ``#``
+    on the first and last line), instead of tokenizing every candidate.
+    Skipped lines, by a directive on the line or in an ``off`` region, are
+    kept as prefix counts, so that any range of lines is checked at once.
+    """
+
+    def __init__(self, lines: List[str]) -> None:
+        # columns of the `#` characters, by line
+        self._hashes: Dict[int, List[int]] = {}
+        has_hash = [False] * len(lines)
+        is_skipped = [False] * len(lines)
+        off = False
+        for i, line in enumerate(lines):
+            if "#" not in line:
+                is_skipped[i] = off
+                continue
+            has_hash[i] = True
+            self._hashes[i] = [m.start() for m in re.finditer("#", line)]
+            if off:
+                off = not flynt_on_regex.search(line)
+            else:
+                off = bool(flynt_off_regex.search(line))
+            is_skipped[i] = bool(
+                off or noqa_regex.search(line) or flynt_skip_regex.search(line)
+            )
+        # number of such lines before each line
+        self._hash_lines_before = [0, *accumulate(has_hash)]
+        self._skipped_lines_before = [0, *accumulate(is_skipped)]
+
+    def skipped(self, start_line: int, end_line: int) -> bool:
+        """Whether conversions are skipped on any of the lines."""
+        skipped = self._skipped_lines_before
+        return skipped[end_line + 1] > skipped[start_line]
+
+    def may_have_comment(
+        self, start_line: int, start: int, end_line: int, end: int
+    ) -> bool:
+        """Whether there is a ``#`` between the two positions.
+
+        If so, it still may be part of a string rather than a comment.
+        """
+        if start_line == end_line:
+            cols = self._hashes.get(start_line, ())
+            return any(start <= col < end for col in cols)
+        hash_lines = self._hash_lines_before
+        if hash_lines[end_line] > hash_lines[start_line + 1]:
+            return True
+        return any(col >= start for col in self._hashes.get(start_line, ())) or any(
+            col < end for col in self._hashes.get(end_line, ())
+        )
@@ -0,0 +1,46 @@
+import ast
+import copy
+from typing import Any, List
+
+
+class CopyOnWriteTransformer(ast.NodeTransformer):
+    """A NodeTransformer which leaves the visited tree unchanged.
+
+    Instead of modifying nodes in place, a node whose children were replaced is
+    shallowly copied, so unchanged subtrees are shared between the input and
+    the result. Subclasses must use the return value of ``visit``, and must not
+    modify nodes they didn't create themselves.
+    """
+
+    def generic_visit(self, node: ast.AST) -> ast.AST:
+        changes = {}
+        for field, old_value in ast.iter_fields(node):
+            if isinstance(old_value, list):
+                new_values: List[Any] = []
+                changed = False
+                for value in old_value:
+                    if not isinstance(value, ast.AST):
+                        new_values.append(value)
+                        continue
+                    new_value = self.visit(value)
+                    if new_value is not value:
+                        changed = True
+                    if new_value is None:
+                        continue
+                    if isinstance(new_value, ast.AST):
+                        new_values.append(new_value)
+                    else:
+                        new_values.extend(new_value)
+                if changed:
+                    changes[field] = new_values
+            elif isinstance(old_value, ast.AST):
+                new_node = self.visit(old_value)
+                if new_node is not old_value:
+                    changes[field] = new_node
+
+        if not changes:
+            return node
+        node = copy.copy(node)
+        for field, value in changes.items():
+            setattr(node, field, value)
+        return node
@@ -0,0 +1,129 @@
+"""Find files and lines changed relative to a git revision, using the local git."""
+
+import difflib
+import os
+import re
+import subprocess
+from typing import Dict, List, Optional, Sequence, Tuple
+
+LineRanges = List[Tuple[int, int]]
+
+hunk_header_re = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+# escapes in names quoted by git, other than octal ones
+_escapes = {"a": 7, "b": 8, "t": 9, "n": 10, "v": 11, "f": 12, "r": 13}
+_escape_re = re.compile(rb"\\([0-7]{3}|.)", re.DOTALL)
+
+
+class GitError(Exception):
+    pass
+
+
+def _git(args: Sequence[str], cwd: str) -> str:
+    try:
+        proc = subprocess.run(  # noqa: S603
+            ["git", "-c", "core.quotePath=false", *args],  # noqa: S607
+            cwd=cwd,
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="surrogateescape",
+        )
+    except OSError as e:
+        raise GitError(f"can't run git: {e}") from e
+    if proc.returncode != 0:
+        raise GitError(proc.stderr.strip() or f"git {args[0]} failed")
+    return proc.stdout
+
+
+def repo_root(path: str) -> str:
+    """Return the top directory of the repository containing ``path``."""
+    cwd = path if os.path.isdir(path) else os.path.dirname(path) or "."
+    return _git(["rev-parse", "--show-toplevel"], cwd).strip()
+
+
+def _unescape(match: "re.Match[bytes]") -> bytes:
+    escape = match.group(1)
+    if len(escape) == 3:
+        return bytes([int(escape, 8)])
+    return bytes([_escapes.get(escape.decode("latin-1"), escape[0])])
+
+
+def _diff_name(line: str) -> str:
+    """The name in the ``+++`` header ``line`` of a diff, without its prefix."""
+    name = line[len("+++ ") :]
+    # git ends names containing spaces with a tab
+    if name.endswith("\t"):
+        name = name[:-1]
+    # and quotes names with special characters like C strings
+    if name.startswith('"') and name.endswith('"'):
+        quoted = name[1:-1].encode("utf-8", "surrogateescape")
+        name = _escape_re.sub(_unescape, quoted).decode("utf-8", "surrogateescape")
+    return name[len("b/") :]
+
+
+def changed_lines(
+    path: str,
+    base: Optional[str] = None,
+    staged: bool = False,
+) -> Dict[str, Optional[LineRanges]]:
+    """Map files changed in the repository containing ``path`` to changed lines.
+
+    Without ``staged``, the working tree is compared to ``base`` (default:
+    HEAD) and untracked files count as changed. With ``staged``, the index is
+    compared instead. Keys are real absolute paths; values are 1-based inclusive
+    line ranges in the current file, or None if the whole file is new.
+    """
+    root = repo_root(path)
+
+    args = ["diff", "-U0", "--no-color", "--no-ext-diff", "--no-renames"]
+    args += ["--src-prefix=a/", "--dst-prefix=b/", "--diff-filter=d"]
+    if staged:
+        args.append("--cached")
+    args.append(base or "HEAD")
+    args.append("--")
+
+    result: Dict[str, Optional[LineRanges]] = {}
+    ranges: LineRanges = []
+    for line in _git(args, root).splitlines():
+        if line.startswith("+++ "):
+            ranges = []
+            result[os.path.realpath(os.path.join(root, _diff_name(line)))] = ranges
+            continue
+        match = hunk_header_re.match(line)
+        if match:
+            start = int(match.group(1))
+            count = 1 if match.group(2) is None else int(match.group(2))
+            # a pure deletion is reported as happening after line `start`
+            ranges.append((max(start, 1), start + max(count, 1) - 1))
+
+    if not staged:
+        untracked = _git(["ls-files", "--others", "--exclude-standard", "-z"], root)
+        for name in untracked.split("\0"):
+            if name:
+                result[os.path.realpath(os.path.join(root, name))] = None
+    return result
+
+
+def intersects(start_line: int, end_line: int, ranges: LineRanges) -> bool:
+    """Does the 1-based inclusive range start_line..end_line touch ``ranges``?"""
+    return any(start <= end_line and start_line <= end for start, end in ranges)
+
+
+def remap_line_ranges(old: str, new: str, ranges: LineRanges) -> LineRanges:
+    """Translate line ranges of ``old`` code to the corresponding lines in ``new``.
+
+    Used after a transform stage edited the code, e.g. joined a multi-line
+    expression into one line, moving all following lines up.
+    """
+    old_lines = old.split("\n")
+    new_lines = new.split("\n")
+    blocks = difflib.SequenceMatcher(None, old_lines, new_lines).get_opcodes()
+
+    def moved(line: int) -> int:
+        idx = line - 1
+        for _, i1, i2, j1, j2 in blocks:
+            if i1 <= idx < i2:
+                return min(j1 + idx - i1, max(j2 - 1, j1)) + 1
+        return len(new_lines)
+
+    return [(moved(start), moved(end)) for start, end in ranges]
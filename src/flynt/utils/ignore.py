@@ -0,0 +1,129 @@
+"""Support for ``.gitignore`` and ``.ignore`` files while walking directories.
+
+Implements the commonly used subset of gitignore patterns: comments, negation
+with ``!``, directory-only patterns ending with ``/``, patterns anchored by a
+``/``, and the ``*``, ``?``, ``[...]`` and ``**`` wildcards.
+"""
+
+import os
+import re
+from typing import List, Pattern, Tuple
+
+IGNORE_FILES = (".gitignore", ".ignore")
+
+
+def translate(pattern: str) -> str:
+    """Translate a gitignore glob (without ``!`` and trailing ``/``) to a regex."""
+    i, n = 0, len(pattern)
+    res = []
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            res.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            res.append(".*")
+            i += 2
+            continue
+        if c == "*":
+            res.append("[^/]*")
+        elif c == "?":
+            res.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                res.append(re.escape(c))
+            else:
+                body = pattern[i + 1 : end]
+                if body[0] in "!^":
+                    body = "^" + body[1:]
+                res.append(f"[{body}]")
+                i = end
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            res.append(re.escape(pattern[i]))
+        else:
+            res.append(re.escape(c))
+        i += 1
+    return "".join(res)
+
+
+class IgnoreRule:
+    def __init__(self, line: str) -> None:
+        self.negated = line.startswith("!")
+        if self.negated:
+            line = line[1:]
+        self.dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        anchored = "/" in line
+        line = line.lstrip("/")
+        prefix = "" if anchored else "(?:.*/)?"
+        self.regex: Pattern[str] = re.compile(f"{prefix}{translate(line)}\\Z")
+
+    def matches(self, rel_path: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        return self.regex.match(rel_path) is not None
+
+
+def read_ignore_rules(directory: str) -> List[IgnoreRule]:
+    """Parse ignore files found directly in ``directory``."""
+    rules = []
+    for name in IGNORE_FILES:
+        try:
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except (OSError, UnicodeDecodeError):
+            continue
+        for line in lines:
+            if line.endswith(" ") and not line.endswith("\\ "):
+                line = line.rstrip(" ")
+            if not line or line.startswith("#"):
+                continue
+            rules.append(IgnoreRule(line))
+    return rules
+
+
+class IgnoreRules:
+    """Rules of ignore files found on the way from the top directory down."""
+
+    def __init__(self, scopes: Tuple[Tuple[str, List[IgnoreRule]], ...] = ()):
+        self.scopes = scopes
+
+    @classmethod
+    def for_directory(cls, directory: str) -> "IgnoreRules":
+        """Collect rules of ``directory`` and its parents up to the repository root."""
+        parents = []
+        current = os.path.abspath(directory)
+        while True:
+            parents.append(current)
+            if os.path.exists(os.path.join(current, ".git")):
+                break
+            parent = os.path.dirname(current)
+            if parent == current:
+                # not in a repository, only the directory's own files apply
+                parents = parents[:1]
+                break
+            current = parent
+
+        rules = cls()
+        for path in reversed(parents):
+            rules = rules.descend(path)
+        return rules
+
+    def descend(self, directory: str) -> "IgnoreRules":
+        """Rules applying within ``directory``, a subdirectory of the last scope."""
+        rules = read_ignore_rules(directory)
+        if not rules:
+            return self
+        return IgnoreRules((*self.scopes, (directory, rules)))
+
+    def is_ignored(self, path: str, is_dir: bool) -> bool:
+        ignored = False
+        for directory, rules in self.scopes:
+            rel_path = os.path.relpath(path, directory).replace(os.sep, "/")
+            for rule in rules:
+                if rule.matches(rel_path, is_dir):
+                    ignored = not rule.negated
+        return ignored
@@ -6,6 +6,7 @@ import string
 import tokenize
 from typing import Dict, List, Optional, Union
 
+from flynt import profiling
 from flynt.exceptions import ConversionRefused
 from flynt.linting.fstr_lint import FstrInliner
 from flynt.utils.format import QuoteTypes, get_quote_type, set_quote_type
@@ -15,7 +16,8 @@ stdlib_parse = string.Formatter().parse
 
 def ast_to_string(node: ast.AST) -> str:
     """Convert ``node`` back into source code."""
-    txt = ast.unparse(node).rstrip()
+    with profiling.phase("unparse"):
+        txt = ast.unparse(node).rstrip()
     # ``ast.unparse`` wraps ternary expressions in ``FormattedValue`` with
     # redundant parentheses, e.g. ``f"{(a if c else b)}"``.  Remove them to
     # match the style previously produced via ``astor``.
@@ -197,8 +199,7 @@ def ast_string_node(string: str) -> ast.Constant:
 def fixup_transformed(tree: ast.AST, quote_type: Optional[str] = None) -> str:
     """Given a transformed string / fstring ast node, transform it to a string."""
     # check_is_string_node(tree)
-    il = FstrInliner()
-    il.visit(tree)
+    tree = FstrInliner().visit(tree)
     try:
         new_code = ast_to_string(tree)
     except ValueError as exc:
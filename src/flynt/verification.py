@@ -0,0 +1,161 @@
+"""Checks of rewritten code, see ``State.verification``.
+
+``per-candidate``
+    every converted expression is parsed on its own, and the whole rewritten
+    file once more at the end.
+``per-file``
+    only the rewritten file is parsed. If it is faulty, the edits are bisected
+    to find and drop the faulty ones, keeping the rest.
+``strict``
+    both of the above, and the AST of the rewritten file must equal the
+    original one, except for converted expressions, see ``find_divergence``.
+"""
+
+import ast
+import dataclasses
+from typing import Callable, List, Optional, Sequence, Set, Tuple
+
+from flynt.edits import Edit, apply_edits
+
+STRATEGIES = ("per-candidate", "per-file", "strict")
+
+# nodes flynt replaces with f-strings (or string constants)
+_CONVERTED = (ast.BinOp, ast.Call)
+_CONVERSIONS = (ast.JoinedStr, ast.Constant)
+
+
+# names that conversions may introduce, e.g. int() around %d arguments
+_ADDED_NAMES = {"int"}
+
+
+@dataclasses.dataclass(frozen=True)
+class Divergence:
+    """Where the rewritten AST differs from the original one, and how."""
+
+    line: int
+    reason: str
+    # the edit which caused it, if it could be told
+    edit: Optional[Edit] = None
+
+    def __str__(self) -> str:
+        if self.edit is None:
+            return f"line {self.line}: {self.reason}"
+        return (
+            f"line {self.line}: {self.reason} "
+            f"in conversion of `{self.edit.original}` to `{self.edit.replacement}`"
+        )
+
+
+def _names(node: ast.AST) -> Set[str]:
+    return {n.id for n in ast.walk(node) if isinstance(n, ast.Name)}
+
+
+def _compare(before: ast.AST, after: ast.AST) -> Optional[Tuple[ast.AST, str]]:
+    """Find the first difference of the trees, except for allowed conversions.
+
+    An expression flynt converts (a ``BinOp`` or ``Call``) may be replaced by an
+    f-string or a string constant that uses no other variables. Returns the
+    innermost original node with a position, and the kind of difference.
+    Iterative, so that deeply nested code doesn't hit the recursion limit.
+    """
+    stack: List[Tuple[object, object, ast.AST]] = [(before, after, before)]
+    while stack:
+        old, new, located = stack.pop()
+        if isinstance(old, ast.AST) and hasattr(old, "lineno"):
+            located = old
+
+        if not (isinstance(old, ast.AST) and isinstance(new, ast.AST)):
+            if isinstance(old, ast.AST) or isinstance(new, ast.AST):
+                return located, "a node was added or removed"
+            if type(old) is not type(new) or old != new:
+                return located, f"{old!r} became {new!r}"
+            continue
+
+        if type(old) is not type(new):
+            if not (isinstance(old, _CONVERTED) and isinstance(new, _CONVERSIONS)):
+                return located, f"{type(old).__name__} became {type(new).__name__}"
+            added = _names(new) - _names(old) - _ADDED_NAMES
+            if added:
+                return located, f"conversion uses other names: {sorted(added)}"
+            continue
+
+        pairs: List[Tuple[object, object]] = []
+        for field in old._fields:
+            old_value = getattr(old, field, None)
+            new_value = getattr(new, field, None)
+            if isinstance(old_value, list) and isinstance(new_value, list):
+                if len(old_value) != len(new_value):
+                    return located, f"number of {field} changed"
+                pairs += zip(old_value, new_value)
+            else:
+                pairs.append((old_value, new_value))
+        stack += [(o, n, located) for o, n in reversed(pairs)]
+    return None
+
+
+def _edit_at(
+    source_lines: List[str],
+    node: ast.AST,
+    edits: Sequence[Edit],
+) -> Optional[Edit]:
+    """The edit of ``node``, or the only edit within it."""
+    line: int = node.lineno  # type: ignore[attr-defined]
+    col_offset: int = node.col_offset  # type: ignore[attr-defined]
+    end_line: int = getattr(node, "end_lineno", None) or line
+    col = len(source_lines[line - 1].encode()[:col_offset].decode())
+    for edit in edits:
+        if edit.start <= (line, col) < edit.end:
+            return edit
+    inside = [e for e in edits if e.start >= (line, col) and e.end_line <= end_line]
+    return inside[0] if len(inside) == 1 else None
+
+
+def find_divergence(
+    source: str,
+    before: ast.AST,
+    after: ast.AST,
+    edits: Sequence[Edit] = (),
+) -> Optional[Divergence]:
+    """Compare the ASTs of ``source`` and the result of applying ``edits`` to it.
+
+    Returns None if they are equal except for the converted expressions.
+    """
+    found = _compare(before, after)
+    if found is None:
+        return None
+    node, reason = found
+    line = getattr(node, "lineno", 1)
+    edit = None
+    if edits and hasattr(node, "lineno"):
+        edit = _edit_at(source.split("\n"), node, edits)
+    return Divergence(line, reason, edit)
+
+
+def drop_faulty_edits(
+    source: str,
+    edits: Sequence[Edit],
+    is_valid: Callable[[str], bool],
+) -> Tuple[List[Edit], List[Edit]]:
+    """Split ``edits`` into kept and dropped ones, by bisection.
+
+    Groups of edits are applied to ``source`` together with the edits kept so
+    far; a group making the code invalid is halved until the faulty edits are
+    isolated. With few faulty edits, this needs few checks.
+    """
+    kept: List[Edit] = []
+    dropped: List[Edit] = []
+
+    def sorted_edits(group: Sequence[Edit]) -> List[Edit]:
+        return sorted([*kept, *group], key=lambda e: e.start)
+
+    pending = [list(edits)]
+    while pending:
+        group = pending.pop()
+        if is_valid(apply_edits(source, sorted_edits(group))):
+            kept.extend(group)
+        elif len(group) == 1:
+            dropped.extend(group)
+        else:
+            middle = len(group) // 2
+            pending += [group[middle:], group[:middle]]
+    return sorted(kept, key=lambda e: e.start), dropped
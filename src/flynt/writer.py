@@ -0,0 +1,188 @@
+"""Writing converted files back to disk.
+
+A file is written to a temporary file next to it, which then replaces the
+original by an atomic rename, keeping its permissions. An interrupted run thus
+leaves every file either unchanged or completely converted, never truncated.
+
+Within ``writing(state)``, files are written by a separate thread, so that
+converting the next files doesn't wait for the disk. With ``State.fsync``,
+the temporary files are synced to disk together at the end, before being
+renamed into place, instead of not being synced at all. Files that can't be
+written don't stop the others; they are reported together at the end of the
+block, by a ``WriteError``.
+"""
+
+import contextlib
+import logging
+import os
+import queue
+import stat
+import tempfile
+import threading
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from flynt.state import State
+
+log = logging.getLogger(__name__)
+
+_active: Optional["Writer"] = None
+
+
+class WriteError(Exception):
+    """Some files couldn't be written; ``failures`` are their paths and errors."""
+
+    def __init__(self, failures: Sequence[Tuple[str, OSError]]) -> None:
+        self.failures = list(failures)
+        super().__init__(
+            "\n".join(f"Can't write {path}: {error}" for path, error in failures)
+        )
+
+    @property
+    def paths(self) -> List[str]:
+        return [path for path, _ in self.failures]
+
+
+def _write_temp(path: str, data: bytes) -> str:
+    """Write ``data`` to a new temporary file next to ``path``, return its path."""
+    directory, name = os.path.split(path)
+    fd, temp_path = tempfile.mkstemp(
+        dir=directory or ".", prefix=f".{name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        original = os.stat(path)
+        os.chmod(temp_path, stat.S_IMODE(original.st_mode))
+        if hasattr(os, "chown") and original.st_uid != os.getuid():
+            # only possible for root, which should not take over the file
+            with contextlib.suppress(OSError):
+                os.chown(temp_path, original.st_uid, original.st_gid)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return temp_path
+
+
+def _remove(path: str) -> None:
+    with contextlib.suppress(OSError):
+        os.unlink(path)
+
+
+def _fsync(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """Replace the contents of the file at ``path`` (or the one it links to)."""
+    path = os.path.realpath(path)
+    temp_path = _write_temp(path, data)
+    try:
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class Writer:
+    """Writes files in a background thread, see the module docstring."""
+
+    def __init__(self, fsync: bool = False) -> None:
+        self.fsync = fsync
+        self.pid = os.getpid()
+        self.queue: "queue.Queue[Optional[Tuple[str, bytes]]]" = queue.Queue()
+        # temporary files, their targets and the paths they were written for,
+        # to be synced and renamed at the end
+        self.pending: List[Tuple[str, str, str]] = []
+        self.failures: List[Tuple[str, OSError]] = []
+        self.thread = threading.Thread(target=self._run, name="flynt-writer")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def write(self, path: str, data: bytes) -> None:
+        self.queue.put((path, data))
+
+    def _run(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            path, data = item
+            try:
+                if self.fsync:
+                    target = os.path.realpath(path)
+                    self.pending.append((_write_temp(target, data), target, path))
+                else:
+                    write_atomic(path, data)
+            except OSError as e:
+                self._failed(path, e)
+
+    def _failed(self, path: str, error: OSError) -> None:
+        log.error(f"Can't write {path}", exc_info=error)
+        self.failures.append((path, error))
+
+    def close(self) -> List[Tuple[str, OSError]]:
+        """Wait until all files are written (and synced), return the failures."""
+        self.queue.put(None)
+        self.thread.join()
+        directories = set()
+        done = 0
+        try:
+            for idx, (temp_path, target, path) in enumerate(self.pending):
+                try:
+                    _fsync(temp_path)
+                    os.replace(temp_path, target)
+                    directories.add(os.path.dirname(target))
+                except OSError as e:
+                    _remove(temp_path)
+                    self._failed(path, e)
+                done = idx + 1
+        finally:
+            # don't leave temporary files behind, even if interrupted
+            for temp_path, _, _ in self.pending[done:]:
+                _remove(temp_path)
+            self.pending.clear()
+        if os.name == "posix":
+            # make the renames durable, too
+            for directory in directories:
+                _fsync(directory)
+        return self.failures
+
+
+@contextlib.contextmanager
+def writing(state: State) -> Iterator[None]:
+    """Write files in a background thread until the end of the block.
+
+    Raises ``WriteError`` at the end if some files couldn't be written.
+    """
+    global _active
+    if _current() is not None:
+        yield
+        return
+    _active = Writer(fsync=state.fsync)
+    try:
+        yield
+    finally:
+        writer, _active = _active, None
+        failures = writer.close()
+    if failures:
+        raise WriteError(failures)
+
+
+def _current() -> Optional[Writer]:
+    # a forked worker process inherits the writer, but not its thread
+    if _active is None or _active.pid != os.getpid():
+        return None
+    return _active
+
+
+def write(path: str, data: bytes) -> None:
+    """Write ``data`` to the file at ``path``, in the background if possible."""
+    active = _current()
+    if active is None:
+        write_atomic(path, data)
+    else:
+        active.write(path, data)
@@ -9,3 +9,13 @@ def state() -> State:
     Fixture for a default state object
     """
     return State()
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path_factory, monkeypatch) -> str:
+    """
+    Keep the cache of runs through the CLI out of the user's cache directory
+    """
+    path = str(tmp_path_factory.mktemp("flynt_cache"))
+    monkeypatch.setenv("FLYNT_CACHE_DIR", path)
+    return path
@@ -0,0 +1 @@
+log.notice(f"Search: finished in {vm.search_time_elapsed_ms:,} ms.")
\ No newline at end of file
@@ -0,0 +1,2 @@
+a, b, c = 1, 2, 3
+t1 = f"=== Images[{a}]: {b} === Rest: \"{c}\""
@@ -0,0 +1 @@
+a = f"my string {var}, but also {f} and {cada_bra}"
@@ -0,0 +1,6 @@
+var, f, cada_bra = 1, 2, 3
+
+a = ("my string {}, " # first part
+"{} and {}".format(var, f, cada_bra) )
+
+print(a)
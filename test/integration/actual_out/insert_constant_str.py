@@ -0,0 +1,7 @@
+def f():
+    return (
+        """
+        some text
+        lorem ipsum
+        """
+    )
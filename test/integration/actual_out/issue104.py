@@ -0,0 +1,3 @@
+s = "wot?"
+print(f"\x1b[1m{s}\x1b[0m")
+print(f"\x1b[2m{s}\x1b[0m")
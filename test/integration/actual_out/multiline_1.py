@@ -0,0 +1,3 @@
+var = 12345
+my_string = f"Hello {var}"
+var2 = "Some Value"
\ No newline at end of file
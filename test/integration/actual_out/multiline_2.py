@@ -0,0 +1,3 @@
+var, a, b = 12345, 4, "Beew"
+my_string = f"Hello {var} {a} {b}"  # Ok
+var2 = "Some Value"
\ No newline at end of file
@@ -0,0 +1,7 @@
+d = {"something": "what"}
+
+resp = f"""
+{d['something']}
+"""
+
+print(resp)
\ No newline at end of file
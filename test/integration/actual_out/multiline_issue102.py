@@ -0,0 +1 @@
+raise ValueError(f'Arithmetic on {self.__class__} objects with different sizes not permitted')
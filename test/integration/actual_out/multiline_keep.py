@@ -0,0 +1,9 @@
+length, quotes = 15, 20
+text = f"""
+# This is an example configuration
+# Hash lines are comments
+
+[flake8]
+max-line-length={length}
+inline-quotes="{quotes}"
+"""
\ No newline at end of file
@@ -0,0 +1,3 @@
+var, f, cada_bra, what = 1, 2, 3, 4
+a = f"my string {var}, but also {f} and {cada_bra}"
+b = f"my string {var}, but also {what} and {cada_bra}"
@@ -0,0 +1,3 @@
+""" This is a beautiful python module in that it is very simple."""
+
+a = 2 + 2 # result should be 4
\ No newline at end of file
@@ -0,0 +1 @@
+print('\40'.join(('a', 'b')))
@@ -0,0 +1,3 @@
+a = 2
+b = "wuga"
+print(f'{a:f} {b}')
@@ -0,0 +1 @@
+foo = f"{di1['key']},{di2['key']}"
@@ -0,0 +1,2 @@
+var = 5 # comment 1
+a = f"my string {var}" # comment 2
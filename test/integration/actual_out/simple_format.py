@@ -0,0 +1,2 @@
+var = 5
+a = f"my string {var:.2f}"
\ No newline at end of file
@@ -0,0 +1,3 @@
+var = 5
+a = f"{{}}my string {var:.2f}{{}}"
+print(a)
@@ -0,0 +1,4 @@
+f"echo '{self.FLUSH_CMD}'\t"
+f"echo '{self.FLUSH_CMD}'\\t"
+f"echo '{self.FLUSH_CMD}'\t"
+f"echo '{self.FLUSH_CMD}'\\t"
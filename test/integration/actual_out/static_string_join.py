@@ -0,0 +1,2 @@
+# Should not change unless explicitly requested
+foo = "x".join([1, 2, 3])
@@ -0,0 +1,3 @@
+mean_ser, mean_per = 1, 2
+scores = f"{'Crossvalidation':>50} \t {mean_ser:>6} \t {mean_per:>6}\n"
+print(scores)
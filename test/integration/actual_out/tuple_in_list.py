@@ -0,0 +1,3 @@
+latex_documents = [
+    (master_doc, f"Flask-{version}.tex", html_title, author, "manual")
+]
\ No newline at end of file
@@ -0,0 +1,4 @@
+x, y = 1, 2
+a = f'line 1 {x} line 2 {y}'
+
+b = f'line 1234567890 1234567890 1234567890 1234567890 {x} 1234567890 1234567890 1234567890 1234567890  {y}'
\ No newline at end of file
@@ -0,0 +1 @@
+print(f"Feels like: {data['main']['feels_like']}°F")
@@ -0,0 +1,3 @@
+CR = '\r'
+LF = '\n'
+writer.write(f"{CR}{LF}Goodbye{CR}{LF}")
@@ -0,0 +1,9 @@
+"""
+This module will be transformed... into something far greater.
+"""
+
+a = "Hello"
+
+msg = f"{a[0]} World"  # awesome comment, right?
+
+print(msg)
@@ -0,0 +1,2 @@
+res = "here\\there"
+
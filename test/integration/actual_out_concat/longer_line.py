@@ -0,0 +1,2 @@
+thing = '1'
+print(f"The line limit we set is 120 and this line is more than 87 characters long{thing}")
@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+"""
+This module will be transformed... into something far greater.
+"""
+
+x = 42
+thing = 1
+otherThing = '2'
+print(f"blah{thing}blah{otherThing}is {x:f}")
\ No newline at end of file
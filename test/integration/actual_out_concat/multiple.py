@@ -0,0 +1,12 @@
+"""
+This module will be transformed... into something far greater.
+"""
+
+a = "Hello"
+
+msg = f"{a} World"
+
+msg2 = f"Finally, {a} World"
+
+
+print(msg)
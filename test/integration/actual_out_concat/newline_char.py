@@ -0,0 +1 @@
+print( f"{dumps(data)}\n" )
\ No newline at end of file
@@ -0,0 +1,5 @@
+#!/usr/bin/env python3
+
+blah1 = 'a'
+blah2 = f"{blah1}b"
+print(blah2)
\ No newline at end of file
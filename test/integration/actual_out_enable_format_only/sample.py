@@ -0,0 +1,3 @@
+var = 5
+a = "Test: %s" % var
+b = f"my string {var:.2f}"
@@ -0,0 +1,3 @@
+var = 5
+a = f"Test: {var}"
+b = "my string {:.2f}".format(var)
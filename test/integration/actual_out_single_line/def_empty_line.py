@@ -0,0 +1,3 @@
+def write_row(self, xf, row, row_idx):
+
+    attrs = {'r': f'{row_idx}'}
\ No newline at end of file
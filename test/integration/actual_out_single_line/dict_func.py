@@ -0,0 +1,5 @@
+import datetime
+
+def a():
+    test = 'Test'
+    return f"{test} ({datetime.datetime.now():%B %d, %Y})"
\ No newline at end of file
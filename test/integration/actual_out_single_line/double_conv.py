@@ -0,0 +1 @@
+print(f"{Bar + 1}", f'{var:f}', f"{foo}")
\ No newline at end of file
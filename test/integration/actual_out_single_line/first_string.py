@@ -0,0 +1,2 @@
+a = f"my string {var}, but also {f} and {cada_bra}"
+b = f"my string {var}, but also {what} and {cada_bra}"
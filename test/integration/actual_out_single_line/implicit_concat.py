@@ -0,0 +1,2 @@
+a = "my string {}, but also " \
+    "{} and {}".format(var, f, cada_bra)
@@ -0,0 +1,6 @@
+var, f, cada_bra = 1, 2, 3
+
+a = ("my string {var}, " # first part
+"{f} and {var}".format(var=var, f=f) )
+
+print(a)
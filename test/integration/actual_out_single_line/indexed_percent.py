@@ -0,0 +1,4 @@
+def test_context_binding(app):
+    @app.route("/")
+    def index():
+        return f"Hello {flask.request.args[name]}!"
\ No newline at end of file
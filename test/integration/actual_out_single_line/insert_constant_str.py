@@ -0,0 +1,7 @@
+def f():
+    return (
+        """
+        some {}
+        lorem ipsum
+        """.format("text")
+    )
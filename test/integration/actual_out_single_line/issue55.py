@@ -0,0 +1,2 @@
+a = "aaa"
+x = f"a\xa0{a}"
@@ -0,0 +1,7 @@
+n = 5
+x = f"{n} hello, world"
+x = f"{n} non-str {True}"
+x = f"{n} with quote \"x\""
+
+x = "hello, world"
+x = "with quote \"x\""
@@ -0,0 +1,5 @@
+raise NoAppException(
+            'Detected multiple Flask applications in module "{}". Use '
+            '"FLASK_APP={}:name" to specify the correct '
+            'one.'.format(var1, var2)
+        )
\ No newline at end of file
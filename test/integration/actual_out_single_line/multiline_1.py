@@ -0,0 +1,5 @@
+var = 12345
+my_string = ("Hello %s"
+             %
+             var)
+var2 = "Some Value"
\ No newline at end of file
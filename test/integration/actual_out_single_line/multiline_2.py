@@ -0,0 +1,6 @@
+var, a, b = 12345, 4, "Beew"
+my_string = "Hello {} {} {}".format(var,
+                                     a,
+                                     b
+                                     )  # Ok
+var2 = "Some Value"
\ No newline at end of file
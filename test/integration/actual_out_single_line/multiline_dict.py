@@ -0,0 +1,7 @@
+d = {"something": "what"}
+
+resp = """
+%(something)s
+""" % d
+
+print(resp)
\ No newline at end of file
@@ -0,0 +1,2 @@
+raise ValueError('Arithmetic on %s objects with different '
+                 'sizes not permitted' % self.__class__)
@@ -0,0 +1,9 @@
+length, quotes = 15, 20
+text = """
+# This is an example configuration
+# Hash lines are comments
+
+[flake8]
+max-line-length={0}
+inline-quotes="{1}"
+""".format(length, quotes)
\ No newline at end of file
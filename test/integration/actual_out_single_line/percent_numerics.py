@@ -0,0 +1,2 @@
+a, b, c, d, e = tuple(range(5))
+print(f'{a:f} {b:f} {c:e} {d:g} {e}')
\ No newline at end of file
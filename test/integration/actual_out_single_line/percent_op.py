@@ -0,0 +1,3 @@
+d = 10
+a = f'{d ** 2}'
+print(a)
\ No newline at end of file
@@ -0,0 +1,4 @@
+a = 'abra'
+print(f'{a!r} {a} {a!a}')
+
+
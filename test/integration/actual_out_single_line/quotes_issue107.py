@@ -0,0 +1,4 @@
+foo = '%s,%s' % (
+    di1['key'],
+    di2['key']
+)
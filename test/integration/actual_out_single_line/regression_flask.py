@@ -0,0 +1,11 @@
+def log_exception(self, exc_info):
+    """Logs an exception.  This is called by :meth:`handle_exception`
+    if debugging is disabled and right before the handler is called.
+    The default implementation logs the exception as error on the
+    :attr:`logger`.
+
+    .. versionadded:: 0.8
+    """
+    self.logger.error(
+        f"Exception on {request.path} [{request.method}]", exc_info=exc_info
+    )
\ No newline at end of file
@@ -0,0 +1,6 @@
+"""
+This is an awesome source file that should under no conditions get ruined!
+"""
+
+var = 5
+a = f"my string {var}"
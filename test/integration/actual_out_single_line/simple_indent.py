@@ -0,0 +1,3 @@
+var = 5
+if var % 3 == 0:
+    a = f"my string {var}"
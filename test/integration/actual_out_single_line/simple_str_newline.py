@@ -0,0 +1,4 @@
+f"echo '{self.FLUSH_CMD}'\n"
+f"echo '{self.FLUSH_CMD}'\\n"
+f"echo '{self.FLUSH_CMD}'\n"
+f"echo '{self.FLUSH_CMD}'\\n"
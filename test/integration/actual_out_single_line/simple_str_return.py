@@ -0,0 +1,4 @@
+f"echo '{self.FLUSH_CMD}'\r"
+f"echo '{self.FLUSH_CMD}'\\r"
+f"echo '{self.FLUSH_CMD}'\r"
+f"echo '{self.FLUSH_CMD}'\\r"
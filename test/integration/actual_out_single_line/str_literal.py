@@ -0,0 +1,4 @@
+mean_ser, mean_per = 1, 2
+scores = "{:>50} \t {:>6} \t {:>6}\n".format("Crossvalidation",
+                                                  mean_ser, mean_per)
+print(scores)
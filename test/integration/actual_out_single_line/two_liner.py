@@ -0,0 +1,6 @@
+x, y = 1, 2
+a = ('line 1 {}'
+     ' line 2 {}'.format(x, y))
+
+b = ('line 1234567890 1234567890 1234567890 1234567890 {}'
+     ' 1234567890 1234567890 1234567890 1234567890  {}'.format(x, y))
\ No newline at end of file
@@ -1,12 +1,13 @@
+import codecs
 import os
 import json
 import shutil
 
 import pytest
 
-from flynt import api
+from flynt import api, writer
 from flynt.api import _fstringify_file, _resolve_files
-from flynt.state import State
+from flynt.state import STATISTICS, State
 
 # These "files" are byte-string constants instead of actual files to prevent e.g. Git or text editors from accidentally changing the encoding
 invalid_unicode = b"# This is not valid unicode: " + bytes([0xFF, 0xFF])
@@ -197,6 +198,126 @@ def test_bom(bom_file):
     assert result.n_changes
 
 
+def test_bom_written_once(bom_file):
+    _fstringify_file(bom_file, state=State(multiline=True, len_limit=1000))
+    with open(bom_file, "rb") as f:
+        raw = f.read()
+    assert raw.startswith(codecs.BOM_UTF8)
+    assert not raw[len(codecs.BOM_UTF8) :].startswith(codecs.BOM_UTF8)
+
+
+def test_encoding_by_bom(bom_file, tmp_path):
+    assert api.encoding_by_bom(bom_file) == ("utf-8-sig", codecs.BOM_UTF8)
+    (tmp_path / "a.py").write_bytes(codecs.BOM_UTF16_LE + "a = 1\n".encode("utf-16-le"))
+    assert api.encoding_by_bom(str(tmp_path / "a.py")) == (
+        "utf-16",
+        codecs.BOM_UTF16_LE,
+    )
+    (tmp_path / "b.py").write_bytes(b"a = 1\n")
+    assert api.encoding_by_bom(str(tmp_path / "b.py")) == ("utf-8", None)
+
+
+@pytest.mark.parametrize(
+    "raw, encoding, bom",
+    [
+        (b"a = 1\n", "utf-8", b""),
+        (codecs.BOM_UTF8 + b"a = 1\n", "utf-8", codecs.BOM_UTF8),
+        (
+            codecs.BOM_UTF16_LE + "a = 1\n".encode("utf-16-le"),
+            "utf-16-le",
+            codecs.BOM_UTF16_LE,
+        ),
+        (
+            codecs.BOM_UTF32_LE + "a = 1\n".encode("utf-32-le"),
+            "utf-32-le",
+            codecs.BOM_UTF32_LE,
+        ),
+        (b"# -*- coding: latin-1 -*-\n", "iso8859-1", b""),
+        (b"#!/usr/bin/env python\n# vim: set fileencoding=cp1252 :\n", "cp1252", b""),
+        (b"a = 1\n# coding: latin-1\n", "utf-8", b""),
+        (b"# coding: no-such-encoding\n", "utf-8", b""),
+        (b"# -*- coding: hex -*-\n", "utf-8", b""),
+    ],
+)
+def test_detect_encoding(raw, encoding, bom):
+    assert api.detect_encoding(raw) == (encoding, bom)
+
+
+def test_non_text_encoding_file(tmp_path):
+    hex_cookie = tmp_path / "a.py"
+    hex_cookie.write_bytes(b"# -*- coding: hex -*-\na = '%s' % b\n")
+    other = tmp_path / "b.py"
+    other.write_text("c = '%s' % d\n")
+
+    state = State(quiet=True)
+    assert api.fstringify_files([str(hex_cookie), str(other)], state) == 2
+    assert hex_cookie.read_bytes() == b"# -*- coding: hex -*-\na = f'{b}'\n"
+    assert other.read_text() == "c = f'{d}'\n"
+
+
+def test_encoding_written_back(tmp_path):
+    latin = tmp_path / "latin.py"
+    latin.write_bytes("# coding: latin-1\r\na = 'é%s' % b\r\n".encode("latin-1"))
+    utf16 = tmp_path / "utf16.py"
+    utf16.write_bytes(codecs.BOM_UTF16_LE + "a = 'é%s' % b\n".encode("utf-16-le"))
+
+    state = State()
+    assert _fstringify_file(str(latin), state).n_changes == 1
+    assert _fstringify_file(str(utf16), state).n_changes == 1
+    assert latin.read_bytes() == "# coding: latin-1\r\na = f'é{b}'\r\n".encode(
+        "latin-1"
+    )
+    assert utf16.read_bytes() == codecs.BOM_UTF16_LE + "a = f'é{b}'\n".encode(
+        "utf-16-le"
+    )
+
+
+@pytest.mark.parametrize("bom", [b"", codecs.BOM_UTF8])
+def test_skip_file_header(tmp_path, monkeypatch, bom):
+    def fail(*args, **kwargs):
+        raise AssertionError("skipped file was looked at beyond its header")
+
+    path = tmp_path / "skipped.py"
+    path.write_bytes(bom + b"# flynt: skip-file\na = '%s' % b\n")
+    monkeypatch.setattr(api.dedup, "key", fail)
+    monkeypatch.setattr(api, "may_have_candidates", fail)
+    result = _fstringify_file(str(path), State())
+    assert result.n_changes == 0
+    assert path.read_bytes() == bom + b"# flynt: skip-file\na = '%s' % b\n"
+
+
+def test_prefilter(tmp_path, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("prefiltered file was parsed")
+
+    path = tmp_path / "plain.py"
+    path.write_text("import os\n\nprint(os.sep, 1 + 2)\n")
+    monkeypatch.setattr(api, "fstringify_code", fail)
+    state = State()
+    result = _fstringify_file(str(path), state)
+    assert result.n_changes == 0
+    assert result.content == path.read_text()
+    assert state.prefiltered_files == 1
+
+    # concatenations may be candidates now
+    with pytest.raises(AssertionError):
+        _fstringify_file(str(path), State(transform_concat=True))
+
+
+def test_prefilter_memory_mapped(tmp_path, monkeypatch):
+    monkeypatch.setattr(api, "MMAP_SIZE", 10)
+    plain = tmp_path / "plain.py"
+    plain.write_text("print(1)\n" * 10)
+    formattable = tmp_path / "formattable.py"
+    formattable.write_text("a = '%s' % b\n" * 10)
+
+    state = State()
+    assert _fstringify_file(str(plain), state).n_changes == 0
+    assert _fstringify_file(str(formattable), state).n_changes == 10
+    assert formattable.read_text() == "a = f'{b}'\n" * 10
+    assert state.prefiltered_files == 1
+
+
 @pytest.fixture()
 def fake_folder_tree(tmpdir):
     folder = os.path.join(tmpdir, "fake_tree")
@@ -277,3 +398,304 @@ def test_notebook_conversion(tmp_path):
     with open(nb) as fh:
         data = json.load(fh)
     assert "f'{1}'" in "".join(data["cells"][0]["source"])
+
+
+def test_notebook_cells_converted_together(tmp_path):
+    """Code cells are converted together, skipping cells that don't parse."""
+    sources = [
+        "%matplotlib inline\nx = '{}'.format(1)\n",
+        "a = '%s' % b\n",
+        "c = (\n",
+        "'{}'.format(d))\n",
+        "for i in x:\n    print('{}'.format(i))",
+    ]
+    nb = tmp_path / "t.ipynb"
+    nb.write_text(
+        json.dumps(
+            {
+                "cells": [
+                    {"cell_type": "code", "source": source.splitlines(True)}
+                    for source in sources
+                ]
+            },
+            indent=1,
+        ),
+        encoding="utf-8",
+    )
+    result = _fstringify_file(str(nb), State(process_notebooks=True))
+    assert result and result.n_changes == 2
+
+    with open(nb) as fh:
+        data = json.load(fh)
+    assert ["".join(cell["source"]) for cell in data["cells"]] == [
+        sources[0],
+        "a = f'{b}'\n",
+        sources[2],
+        sources[3],
+        "for i in x:\n    print(f'{i}')",
+    ]
+
+
+def test_notebook_unchanged_not_serialized(tmp_path, monkeypatch):
+    nb = tmp_path / "t.ipynb"
+    nb.write_text('{"cells": [{"cell_type": "code", "source": ["x = 1"]}]}')
+    monkeypatch.setattr(json, "dumps", None)
+
+    result = _fstringify_file(str(nb), State(process_notebooks=True))
+    assert result and result.n_changes == 0
+    assert result.content == nb.read_text()
+
+
+@pytest.fixture()
+def sample_folder(tmp_path):
+    folder = os.path.dirname(__file__)
+    for name in (
+        "first_string.py",
+        "all_named.py",
+        "multiline_1.py",
+        "percent_dict.py",
+    ):
+        shutil.copy2(os.path.join(folder, "samples_in", name), tmp_path / name)
+    return tmp_path
+
+
+def test_fstringify_files_parallel_matches_serial(sample_folder, capsys, monkeypatch):
+    monkeypatch.setattr(api, "WORKER_BATCH_SIZE", 1)
+    files = sorted(str(p) for p in sample_folder.glob("*.py"))
+
+    serial_state = State(dry_run=True, report=True)
+    serial_changed = api.fstringify_files(files, serial_state)
+    serial_out = capsys.readouterr().out
+
+    parallel_state = State(dry_run=True, report=True, jobs=2)
+    parallel_changed = api.fstringify_files(files, parallel_state)
+    parallel_out = capsys.readouterr().out
+
+    assert parallel_changed == serial_changed
+    for name in STATISTICS:
+        assert getattr(parallel_state, name) == getattr(serial_state, name)
+
+    def strip_time(out):
+        return [line for line in out.splitlines() if "Execution time" not in line]
+
+    assert strip_time(parallel_out) == strip_time(serial_out)
+
+
+@pytest.mark.parametrize("fsync", [False, True])
+def test_fstringify_files_parallel_writes(
+    sample_folder, tmp_path_factory, monkeypatch, fsync
+):
+    serial_folder = tmp_path_factory.mktemp("serial")
+    for path in sample_folder.glob("*.py"):
+        shutil.copy2(path, serial_folder / path.name)
+    api.fstringify_files(
+        sorted(str(p) for p in serial_folder.glob("*.py")), State(quiet=True)
+    )
+
+    monkeypatch.setattr(api, "WORKER_BATCH_SIZE", 1)
+    state = State(quiet=True, jobs=2, fsync=fsync)
+    api.fstringify_files(sorted(str(p) for p in sample_folder.glob("*.py")), state)
+
+    for path in serial_folder.glob("*.py"):
+        assert (sample_folder / path.name).read_text() == path.read_text()
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_fstringify_unwritable_file(tmp_path, monkeypatch, capfd, jobs):
+    monkeypatch.setattr(api, "WORKER_BATCH_SIZE", 1)
+    paths = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"{name}.py"
+        path.write_text("a = '%s' % b\n")
+        paths.append(str(path))
+    unwritable = paths[1]
+    write_atomic = writer.write_atomic
+
+    def failing_write(path, data):
+        if path == unwritable:
+            raise PermissionError("denied")
+        write_atomic(path, data)
+
+    monkeypatch.setattr(writer, "write_atomic", failing_write)
+    state = State(jobs=jobs)
+    assert api.fstringify(paths, state, fail_on_changes=False) == 1
+
+    assert state.unwritten_files == 1
+    out, err = capfd.readouterr()
+    assert f"Can't write {unwritable}: denied" in err
+    assert "Modified 2 of 3 files" in out
+    assert [open(path).read() for path in paths] == [
+        "a = f'{b}'\n",
+        "a = '%s' % b\n",
+        "a = f'{b}'\n",
+    ]
+
+
+def _write_copies(folder, n_copies):
+    paths = []
+    for i in range(n_copies):
+        for name, code in [("a", "a = '%s' % b\n"), ("c", "c = 1\n")]:
+            path = folder / f"{name}{i}.py"
+            path.write_text(code)
+            paths.append(str(path))
+    return paths
+
+
+def test_fstringify_files_converts_copies_once(tmp_path, monkeypatch, capsys):
+    paths = _write_copies(tmp_path, 3)
+    converted = []
+    fstringify_code = api.fstringify_code
+    monkeypatch.setattr(
+        api,
+        "fstringify_code",
+        lambda contents, *args, **kwargs: (
+            converted.append(contents) or fstringify_code(contents, *args, **kwargs)
+        ),
+    )
+
+    state = State(report=True)
+    assert api.fstringify_files(paths, state) == 3
+
+    assert converted == ["a = '%s' % b\n"]
+    assert state.duplicate_files == 4
+    # the expressions of every copy are counted, as if converted one by one
+    reference = State()
+    api.fstringify_code("a = '%s' % b\n", reference)
+    assert state.percent_candidates == 3 * reference.percent_candidates
+    assert state.percent_transforms == 3 * reference.percent_transforms == 3
+    for i in range(3):
+        assert (tmp_path / f"a{i}.py").read_text() == "a = f'{b}'\n"
+    out, _ = capsys.readouterr()
+    assert "Duplicate files (converted once):          4 (66.7%)" in out
+    assert (
+        "Old style (`%`) expressions attempted:     "
+        f"3/{state.percent_candidates}" in out
+    )
+
+
+def test_fstringify_files_parallel_copies(tmp_path, monkeypatch):
+    monkeypatch.setattr(api, "WORKER_BATCH_SIZE", 2)
+    paths = _write_copies(tmp_path, 10)
+
+    state = State(quiet=True, jobs=2)
+    assert api.fstringify_files(paths, state) == 10
+
+    assert state.duplicate_files == 18
+    assert state.percent_transforms == 10
+    for i in range(10):
+        assert (tmp_path / f"a{i}.py").read_text() == "a = f'{b}'\n"
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_report_on_copies_independent_of_jobs(tmp_path, monkeypatch, capsys, jobs):
+    monkeypatch.setattr(api, "WORKER_BATCH_SIZE", 2)
+    paths = []
+    for i in range(40):
+        path = tmp_path / f"a{i}.py"
+        path.write_text("a = '%s' % b\n")
+        paths.append(str(path))
+
+    state = State(report=True, jobs=jobs)
+    assert api.fstringify_files(paths, state) == 40
+
+    out, _ = capsys.readouterr()
+    assert "Duplicate files (converted once):          39 (97.5%)" in out
+    assert state.percent_transforms == 40
+
+
+def test_copies_not_shared_outside_run(tmp_path):
+    paths = _write_copies(tmp_path, 2)
+    state = State()
+    for path in paths:
+        _fstringify_file(path, state)
+    assert state.duplicate_files == 0
+
+
+def _sample_sources():
+    folder = os.path.join(os.path.dirname(__file__), "samples_in")
+    for name in sorted(os.listdir(folder))[:20]:
+        with open(os.path.join(folder, name), encoding="utf-8") as f:
+            yield name, f.read()
+
+
+def test_fstringify_sources_is_lazy():
+    def sources():
+        yield "a.py", "a = '%s' % b\n"
+        raise AssertionError("consumed too early")
+
+    name, result = next(api.fstringify_sources(sources(), State()))
+    assert name == "a.py"
+    assert result.content == "a = f'{b}'\n"
+    assert result.edits[0].kind == "percent"
+
+
+def test_fstringify_sources_parallel_matches_serial(monkeypatch):
+    monkeypatch.setattr(api, "WORKER_BATCH_SIZE", 2)
+    serial_state = State()
+    serial = dict(api.fstringify_sources(_sample_sources(), serial_state))
+
+    parallel_state = State(jobs=2)
+    parallel = dict(api.fstringify_sources(_sample_sources(), parallel_state))
+
+    assert parallel == serial
+    for name in STATISTICS:
+        assert getattr(parallel_state, name) == getattr(serial_state, name)
+
+
+def test_state_merge():
+    state = State(transform_concat=True)
+    state.call_candidates = 2
+    worker_state = state.fresh()
+    assert worker_state.transform_concat
+    assert worker_state.call_candidates == 0
+
+    worker_state.call_candidates = 3
+    worker_state.invalid_conversions = 1
+    state.merge(worker_state)
+    assert state.call_candidates == 5
+    assert state.invalid_conversions == 1
+
+
+@pytest.fixture()
+def project_tree(tmp_path):
+    for name in (
+        "pkg/a.py",
+        "pkg/gen_pb2.py",
+        "pkg/sub/b.py",
+        "pkg/sub/keep.log.py",
+        "build/c.py",
+        "node_modules/d.py",
+        "notes.txt",
+    ):
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text("")
+    (tmp_path / ".gitignore").write_text("# comment\nbuild/\n*.log.py\n")
+    (tmp_path / "pkg" / ".ignore").write_text("!keep.log.py\n")
+    return tmp_path
+
+
+def _relative(files, root):
+    return sorted(os.path.relpath(f, root).replace("\\", "/") for f in files)
+
+
+def test_resolve_respects_ignore_files(project_tree):
+    files = _resolve_files([str(project_tree)], None, State(use_ignore_files=True))
+    assert _relative(files, project_tree) == [
+        "pkg/a.py",
+        "pkg/gen_pb2.py",
+        "pkg/sub/b.py",
+        "pkg/sub/keep.log.py",
+    ]
+
+
+def test_resolve_without_ignore_files(project_tree):
+    files = _resolve_files([str(project_tree)], None, State())
+    assert "build/c.py" in _relative(files, project_tree)
+    assert "node_modules/d.py" not in _relative(files, project_tree)
+
+
+def test_resolve_glob_exclude(project_tree):
+    files = _resolve_files(
+        [str(project_tree)], ["*_pb2.py", "pkg/sub"], State(use_ignore_files=True)
+    )
+    assert _relative(files, project_tree) == ["pkg/a.py"]
@@ -0,0 +1,122 @@
+import base64
+import csv
+import hashlib
+import io
+import json
+import os
+import stat
+import tarfile
+import zipfile
+
+import pytest
+
+from flynt.api import fstringify
+from flynt.cli import run_flynt_cli
+from flynt.state import State
+
+MODULE = b"name = 'world'\nprint('hello {}'.format(name))\n"
+CONVERTED = b"name = 'world'\nprint(f'hello {name}')\n"
+PLAIN = b"x = 1\n"
+
+
+def _hash(data: bytes) -> str:
+    digest = base64.urlsafe_b64encode(hashlib.sha256(data).digest())
+    return "sha256=" + digest.rstrip(b"=").decode()
+
+
+@pytest.fixture()
+def wheel(tmp_path):
+    path = tmp_path / "pkg-1.0-py3-none-any.whl"
+    record = (
+        f"pkg/mod.py,{_hash(MODULE)},{len(MODULE)}\n"
+        f"pkg/plain.py,{_hash(PLAIN)},{len(PLAIN)}\n"
+        "pkg-1.0.dist-info/RECORD,,\n"
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as whl:
+        whl.writestr("pkg/mod.py", MODULE)
+        whl.writestr("pkg/plain.py", PLAIN)
+        whl.writestr("pkg/data.txt", "'{}'.format(1)")
+        whl.writestr("pkg-1.0.dist-info/RECORD", record)
+    return path
+
+
+@pytest.fixture()
+def sdist(tmp_path):
+    path = tmp_path / "pkg-1.0.tar.gz"
+    with tarfile.open(path, "w:gz") as tar:
+        for name, data in [("pkg-1.0/pkg/mod.py", MODULE), ("pkg-1.0/README", b"hi")]:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o644
+            tar.addfile(info, io.BytesIO(data))
+    return path
+
+
+def test_archive_left_unchanged(wheel, capsys):
+    before = wheel.read_bytes()
+    assert fstringify([str(wheel)], state=State()) == 0
+    assert wheel.read_bytes() == before
+    out, err = capsys.readouterr()
+    assert "Modified 1 of 2 files" in out
+    assert f"Changes to {wheel} were not written" in err
+
+
+def test_wheel_rewritten(wheel, tmp_path):
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    wheel.chmod(0o640)
+    state = State(archive_output=str(out_dir), quiet=True)
+    fstringify([str(wheel)], state=state, fail_on_changes=True)
+
+    with zipfile.ZipFile(out_dir / wheel.name) as whl:
+        assert whl.namelist() == [
+            "pkg/mod.py",
+            "pkg/plain.py",
+            "pkg/data.txt",
+            "pkg-1.0.dist-info/RECORD",
+        ]
+        assert whl.read("pkg/mod.py") == CONVERTED
+        assert whl.read("pkg/plain.py") == PLAIN
+        assert whl.getinfo("pkg/mod.py").compress_type == zipfile.ZIP_DEFLATED
+        record = whl.read("pkg-1.0.dist-info/RECORD").decode()
+    rows = list(csv.reader(io.StringIO(record)))
+    assert rows[0] == ["pkg/mod.py", _hash(CONVERTED), str(len(CONVERTED))]
+    assert rows[1] == ["pkg/plain.py", _hash(PLAIN), str(len(PLAIN))]
+    assert stat.S_IMODE(os.stat(out_dir / wheel.name).st_mode) == 0o640
+    assert os.listdir(out_dir) == [wheel.name]
+
+
+def test_sdist_rewritten_in_place(sdist):
+    state = State(archive_output=str(sdist.parent), quiet=True)
+    fstringify([str(sdist)], state=state)
+
+    with tarfile.open(sdist) as tar:
+        assert tar.getnames() == ["pkg-1.0/pkg/mod.py", "pkg-1.0/README"]
+        assert tar.extractfile("pkg-1.0/pkg/mod.py").read() == CONVERTED
+        assert tar.getmember("pkg-1.0/pkg/mod.py").mode == 0o644
+
+
+def test_archive_dry_run(sdist, tmp_path, capsys):
+    state = State(dry_run=True, archive_output=str(tmp_path / "missing"))
+    fstringify([str(sdist)], state=state)
+    out, _ = capsys.readouterr()
+    assert f"--- {sdist}/pkg-1.0/pkg/mod.py" in out
+    assert "+print(f'hello {name}')" in out
+
+
+def test_archive_cli_jsonl(wheel, capsys):
+    assert run_flynt_cli(["--format", "jsonl", str(wheel)]) == 0
+    out, _ = capsys.readouterr()
+    records = [json.loads(line) for line in out.splitlines()]
+    files = [r for r in records if r["type"] == "file"]
+    assert [(r["path"], r["status"]) for r in files] == [
+        (f"{wheel}/pkg/mod.py", "modified"),
+        (f"{wheel}/pkg/plain.py", "no change"),
+    ]
+    assert records[-1]["changed_files"] == 1
+
+
+def test_broken_archive(tmp_path):
+    path = tmp_path / "broken.zip"
+    path.write_bytes(b"not a zip")
+    assert fstringify([str(path)], state=State()) == 0
@@ -1,4 +1,5 @@
 import io
+import json
 import os
 import sys
 
@@ -6,6 +7,7 @@ import pytest
 
 import flynt
 from flynt.cli import run_flynt_cli
+from flynt.edits import Edit, apply_edits
 
 
 def test_cli_no_args(capsys):
@@ -194,3 +196,117 @@ def test_cli_report_flag(capsys):
     out, err = capsys.readouterr()
     assert "Flynt run has finished. Stats:" in out
     assert err == ""
+
+
+@pytest.mark.parametrize("flags", [[], ["--no-ignore-files"]])
+def test_cli_ignore_files(tmp_path, flags):
+    (tmp_path / ".gitignore").write_text("build/\n")
+    (tmp_path / "build").mkdir()
+    (tmp_path / "build" / "a.py").write_text("a = '%s' % b\n")
+
+    assert run_flynt_cli(["--quiet", *flags, str(tmp_path)]) == 0
+    converted = (tmp_path / "build" / "a.py").read_text() == "a = f'{b}'\n"
+    assert converted == bool(flags)
+
+
+def test_cli_format_jsonl(capsys):
+    folder = os.path.dirname(__file__)
+    source_path = os.path.join(folder, "samples_in", "all_named.py")
+    with open(source_path) as file:
+        source = file.read()
+
+    return_code = run_flynt_cli(["--dry-run", "--format", "jsonl", source_path])
+    assert return_code == 0
+
+    out, err = capsys.readouterr()
+    records = [json.loads(line) for line in out.splitlines()]
+    assert [r["type"] for r in records] == ["file", "edit", "summary"]
+    file_record, edit_record, summary = records
+    assert file_record == {
+        "type": "file",
+        "path": source_path,
+        "status": "modified",
+        "changes": 1,
+    }
+    assert edit_record["path"] == source_path
+    assert edit_record["kind"] == "format"
+    assert edit_record["original"] in source
+    assert edit_record["replacement"].startswith("f")
+    assert summary["files"] == 1
+    assert summary["changed_files"] == 1
+    assert summary["call_transforms"] == 1
+    assert err == ""
+
+
+def test_cli_format_json(capsys):
+    folder = os.path.join(os.path.dirname(__file__), "samples_in")
+    paths = [os.path.join(folder, name) for name in ("all_named.py", "no_fstring_1.py")]
+
+    return_code = run_flynt_cli(["--dry-run", "--format", "json", *paths])
+    assert return_code == 0
+
+    out, _ = capsys.readouterr()
+    log = json.loads(out)
+    assert [f["path"] for f in log["files"]] == paths
+    assert [f["status"] for f in log["files"]] == ["modified", "no change"]
+    assert len(log["files"][0]["edits"]) == 1
+    assert log["files"][1]["edits"] == []
+    assert log["summary"]["files"] == 2
+
+
+def test_cli_format_sarif(capsys):
+    folder = os.path.dirname(__file__)
+    source_path = os.path.join(folder, "samples_in", "all_named.py")
+    with open(source_path) as file:
+        lines = file.read().split("\n")
+
+    return_code = run_flynt_cli(["--dry-run", "--format", "sarif", source_path])
+    assert return_code == 0
+
+    out, _ = capsys.readouterr()
+    log = json.loads(out)
+    assert log["version"] == "2.1.0"
+    (run,) = log["runs"]
+    assert run["tool"]["driver"]["name"] == "flynt"
+    (result,) = run["results"]
+    assert result["ruleId"] == "format"
+    region = result["locations"][0]["physicalLocation"]["region"]
+    (replacement,) = result["fixes"][0]["artifactChanges"][0]["replacements"]
+    assert replacement["deletedRegion"] == region
+    # columns are 1-based
+    assert region["startLine"] == region["endLine"]
+    line = lines[region["startLine"] - 1]
+    original = line[region["startColumn"] - 1 : region["endColumn"] - 1]
+    assert original.startswith(("'", '"'))
+    assert replacement["insertedContent"]["text"].startswith("f")
+    assert run["properties"]["files"] == 1
+
+
+def test_cli_format_notebook(tmp_path, capsys):
+    cells = [
+        {"cell_type": "code", "metadata": {}, "outputs": [], "source": source}
+        for source in (["a = 1\n", "b = '%s' % a"], "c = '{}'.format(a)")
+    ]
+    path = tmp_path / "t.ipynb"
+    raw = json.dumps({"cells": cells, "nbformat": 4}, indent=1)
+    path.write_text(raw)
+
+    return_code = run_flynt_cli(["--dry-run", "-nb", "--format", "json", str(path)])
+    assert return_code == 0
+
+    out, _ = capsys.readouterr()
+    (record,) = json.loads(out)["files"]
+    assert record["status"] == "modified"
+    assert record["changes"] == 2
+    edits = [Edit(**edit) for edit in record["edits"]]
+    assert {edit.kind for edit in edits} == {"source"}
+    converted = json.loads(apply_edits(raw, edits))
+    assert [cell["source"] for cell in converted["cells"]] == [
+        ["a = 1\n", "b = f'{a}'"],
+        "c = f'{a}'",
+    ]
+
+
+def test_cli_format_with_stdout():
+    with pytest.raises(SystemExit):
+        run_flynt_cli(["--stdout", "--format", "json", "file.py"])
@@ -0,0 +1,106 @@
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+from flynt import daemon
+from flynt.cli import run_flynt_cli
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(socket, "AF_UNIX"), reason="requires Unix sockets"
+)
+
+
+@pytest.fixture()
+def project(tmp_path, monkeypatch):
+    (tmp_path / "a.py").write_text("a = '%s' % b\n")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture()
+def address(tmp_path_factory):
+    # socket paths are limited to about 100 characters
+    path = os.path.join(str(tmp_path_factory.mktemp("d")), "flyntd.sock")
+    server = daemon.Daemon()
+    thread = threading.Thread(target=server.serve_unix, args=(path,))
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not os.path.exists(path):
+        if not thread.is_alive() or time.monotonic() > deadline:
+            pytest.fail("daemon didn't start listening")
+        time.sleep(0.01)
+    yield path
+    daemon.send({"command": "stop"}, path)
+    thread.join()
+    assert not os.path.exists(path)
+
+
+def test_client_matches_cli(project, address, capsys):
+    returncode = run_flynt_cli(["-q", "-d", "a.py"])
+    expected = capsys.readouterr().out
+
+    assert daemon.run_client(["-q", "-d", "a.py"], address) == returncode
+    assert capsys.readouterr().out == expected
+
+
+def test_client_rewrites_in_daemon(project, address, monkeypatch):
+    runs = []
+    run = daemon.Daemon.run
+    monkeypatch.setattr(
+        daemon.Daemon, "run", lambda self, *args: runs.append(args) or run(self, *args)
+    )
+    assert daemon.run_client(["a.py"], address) == 0
+    assert (project / "a.py").read_text() == "a = f'{b}'\n"
+    assert runs == [(["a.py"], str(project), None)]
+
+
+def test_client_reports_errors(project, address, capsys):
+    assert daemon.run_client(["missing.py"], address) == 1
+    assert "missing.py" in capsys.readouterr().out
+
+
+def test_client_without_daemon(project, tmp_path):
+    address = str(tmp_path / "none.sock")
+    assert daemon.run_client(["a.py"], address) == 0
+    assert (project / "a.py").read_text() == "a = f'{b}'\n"
+
+
+def test_status(address, capsys):
+    assert daemon.run_daemon(["--address", address, "--status"]) == 0
+    assert "running" in capsys.readouterr().out
+
+
+def test_default_address(monkeypatch, tmp_path):
+    monkeypatch.delenv("FLYNT_DAEMON", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    assert daemon.default_address() == str(tmp_path / "flyntd.sock")
+    monkeypatch.delenv("XDG_RUNTIME_DIR")
+    assert os.path.dirname(daemon.default_address()) == daemon._temp_socket_dir()
+
+
+def test_private_dir(tmp_path):
+    path = str(tmp_path / "private")
+    daemon._private_dir(path)
+    assert os.stat(path).st_mode & 0o777 == 0o700
+    daemon._private_dir(path)
+
+    os.chmod(path, 0o755)
+    with pytest.raises(SystemExit):
+        daemon._private_dir(path)
+
+
+def test_client_refuses_socket_of_other_user(project, address, monkeypatch):
+    runs = []
+    monkeypatch.setattr(daemon.Daemon, "run", lambda self, *args: runs.append(args))
+    owner = os.stat(address).st_uid
+    with monkeypatch.context() as other_user:
+        other_user.setattr(os, "getuid", lambda: owner + 1)
+        with pytest.raises(OSError, match="not a socket owned by this user"):
+            daemon.send({"command": "ping"}, address)
+        # the work is done in-process instead
+        assert daemon.run_client(["a.py"], address) == 0
+    assert runs == []
+    assert (project / "a.py").read_text() == "a = f'{b}'\n"
@@ -0,0 +1,150 @@
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from flynt.api import fstringify
+from flynt.state import State
+from flynt.utils.git import changed_lines, remap_line_ranges
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="requires git")
+
+committed = """a = '%s' % b
+c = '{}'.format(d)
+"""
+
+edited = """a = '%s' % b
+c = '{}'.format(d)
+e = '%s' % (
+    f
+)
+g = '%s' % h
+"""
+
+
+def git(repo, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.fixture()
+def repo(tmp_path):
+    git(tmp_path, "init", "-q")
+    (tmp_path / "old.py").write_text(committed)
+    (tmp_path / "edited.py").write_text(committed)
+    git(tmp_path, "add", ".")
+    git(tmp_path, "commit", "-q", "-m", "init")
+    (tmp_path / "edited.py").write_text(edited)
+    (tmp_path / "new.py").write_text(committed)
+    return tmp_path
+
+
+def test_changed_lines(repo):
+    changed = changed_lines(str(repo))
+    assert changed == {
+        os.path.realpath(repo / "edited.py"): [(3, 6)],
+        os.path.realpath(repo / "new.py"): None,
+    }
+
+
+def test_changed_lines_staged(repo):
+    git(repo, "add", "edited.py")
+    changed = changed_lines(str(repo), staged=True)
+    assert list(changed) == [os.path.realpath(repo / "edited.py")]
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "my file.py",
+        pytest.param(
+            'say "é"\t.py',
+            marks=pytest.mark.skipif(os.name == "nt", reason="not a Windows name"),
+        ),
+    ],
+)
+def test_changed_lines_special_names(repo, name):
+    (repo / name).write_text(committed)
+    git(repo, "add", name)
+    git(repo, "commit", "-q", "-m", "add")
+    (repo / name).write_text(edited)
+
+    changed = changed_lines(str(repo))
+    assert changed[os.path.realpath(repo / name)] == [(3, 6)]
+
+    fstringify([str(repo / name)], State(quiet=True, diff_base="HEAD"))
+    assert "f'{b}'" in (repo / name).read_text()
+
+
+def test_only_changed_files(repo):
+    fstringify([str(repo)], State(quiet=True, diff_base="HEAD"))
+    assert (repo / "old.py").read_text() == committed
+    assert (repo / "new.py").read_text() != committed
+    assert "f'{b}'" in (repo / "edited.py").read_text()
+
+
+def test_only_changed_lines(repo):
+    fstringify(
+        [str(repo)],
+        State(quiet=True, diff_base="HEAD", changed_lines_only=True),
+    )
+    assert (repo / "edited.py").read_text() == (
+        "a = '%s' % b\nc = '{}'.format(d)\ne = f'{f}'\ng = f'{h}'\n"
+    )
+
+
+def test_only_changed_lines_of_notebook(repo):
+    cells = [
+        {"cell_type": "code", "metadata": {}, "outputs": [], "source": source}
+        for source in (["a = '%s' % b\n", "c = '%s' % d"], ["e = '%s' % f"])
+    ]
+    path = repo / "notebook.ipynb"
+    path.write_text(json.dumps({"cells": cells, "nbformat": 4}, indent=1))
+    git(repo, "add", "notebook.ipynb")
+    git(repo, "commit", "-q", "-m", "notebook")
+    path.write_text(path.read_text().replace("c = '%s' % d", "c = '%s' % g"))
+
+    fstringify(
+        [str(repo)],
+        State(
+            quiet=True,
+            diff_base="HEAD",
+            changed_lines_only=True,
+            process_notebooks=True,
+        ),
+    )
+    sources = [cell["source"] for cell in json.loads(path.read_text())["cells"]]
+    assert sources == [["a = '%s' % b\n", "c = f'{g}'"], ["e = '%s' % f"]]
+
+
+def test_changed_files_in_several_repos(repo, tmp_path_factory):
+    other = tmp_path_factory.mktemp("other")
+    git(other, "init", "-q")
+    (other / "old.py").write_text(committed)
+    git(other, "add", ".")
+    git(other, "commit", "-q", "-m", "init")
+    (other / "new.py").write_text(committed)
+
+    fstringify(
+        [str(repo / "edited.py"), str(other)],
+        State(quiet=True, diff_base="HEAD"),
+    )
+    assert "f'{b}'" in (repo / "edited.py").read_text()
+    assert "f'{b}'" in (other / "new.py").read_text()
+    assert (other / "old.py").read_text() == committed
+
+
+def test_remap_line_ranges():
+    old = "a\nb = (\n 1\n)\nc\nd\n"
+    new = "a\nb = 1\nc\nd\n"
+    assert remap_line_ranges(old, new, [(1, 1), (3, 3), (5, 6)]) == [
+        (1, 1),
+        (2, 2),
+        (3, 4),
+    ]
@@ -0,0 +1,59 @@
+import os
+
+from flynt.api import _fstringify_file
+from flynt.cache import Cache, N_SHARDS, options_fingerprint
+from flynt.state import State
+
+
+def test_mark_and_check(tmp_path):
+    cache = Cache(str(tmp_path), State())
+    assert not cache.is_clean("a = 1\n")
+    cache.mark_clean("a = 1\n")
+    cache.mark_clean("a = 1\n")
+    assert cache.is_clean("a = 1\n")
+    assert not cache.is_clean("a = 2\n")
+
+
+def test_fingerprint_depends_on_result_options():
+    assert options_fingerprint(State()) == options_fingerprint(State(dry_run=True))
+    assert options_fingerprint(State()) != options_fingerprint(State(aggressive=1))
+    assert options_fingerprint(State()) != options_fingerprint(
+        State(transform_concat=True)
+    )
+    assert options_fingerprint(State()) != options_fingerprint(
+        State(verification="strict")
+    )
+
+
+def test_eviction_bounds_shard_size(tmp_path):
+    cache = Cache(str(tmp_path), State(), max_entries=2 * N_SHARDS)
+    sources = [f"a = {i}\n" for i in range(2000)]
+    for source in sources:
+        cache.mark_clean(source)
+    for shard in os.scandir(cache.directory):
+        assert len(os.listdir(shard.path)) <= 2
+
+
+def test_file_skipped_when_clean(tmp_path, monkeypatch):
+    path = tmp_path / "a.py"
+    path.write_text("a = 1\n")
+    state = State(cache_dir=str(tmp_path / "cache"))
+
+    assert _fstringify_file(str(path), state).n_changes == 0
+
+    def fail(*args, **kwargs):
+        raise AssertionError("cached file should not be converted")
+
+    monkeypatch.setattr("flynt.api.fstringify_code", fail)
+    result = _fstringify_file(str(path), state)
+    assert result.n_changes == 0
+    assert result.content == "a = 1\n"
+
+
+def test_changed_file_not_cached(tmp_path):
+    path = tmp_path / "a.py"
+    path.write_text("a = '%s' % b\n")
+    state = State(cache_dir=str(tmp_path / "cache"), dry_run=True)
+
+    assert _fstringify_file(str(path), state).n_changes == 1
+    assert not Cache(state.cache_dir, state).is_clean("a = '%s' % b\n")
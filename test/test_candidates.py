@@ -1,8 +1,12 @@
+import ast
 from functools import partial
 
 from flynt.candidates.ast_percent_candidates import percent_candidates
+from flynt.candidates.collect import CandidatePool, collect_candidates
 from flynt.code_editor import fstring_candidates
 from flynt.state import State
+from flynt.static_join.candidates import join_candidates
+from flynt.string_concat.candidates import concat_candidates
 
 percent_candidates = partial(percent_candidates, state=State())
 fstring_candidates = partial(fstring_candidates, state=State())
@@ -176,3 +180,44 @@ def test_tuple_percent():
     code = """print("%s %s " % (var+var, abc))"""
     candidates = fstring_candidates(code)
     assert len(list(candidates)) == 1
+
+
+mixed_code = """
+a = "%s" % ("x" + str(b))
+c = "{}".format(", ".join(["a", d])) + e
+f = "-".join(["%d" % g, "h" + i])
+"""
+
+
+def test_collect_matches_separate_finders():
+    state = State()
+    found = collect_candidates(
+        ast.parse(mixed_code), ["percent", "call", "concat", "join"]
+    )
+
+    def spans(chunks):
+        return [(c.start_line, c.start_idx, c.end_line, c.end_idx) for c in chunks]
+
+    fstring = sorted(
+        found["percent"] + found["call"], key=lambda c: (c.start_line, c.start_idx)
+    )
+    assert spans(fstring) == spans(fstring_candidates(mixed_code))
+    assert spans(found["concat"]) == spans(concat_candidates(mixed_code, state))
+    assert spans(found["join"]) == spans(join_candidates(mixed_code, state))
+
+
+def test_pool_parses_only_changed_code():
+    state = State(transform_concat=True, transform_join=True)
+    tree = ast.parse(mixed_code)
+    pool = CandidatePool(tree, mixed_code, state)
+
+    assert len(pool.take(mixed_code, "percent", "call")) == 3
+    assert len(pool.take(mixed_code, "concat")) == 2
+    assert pool.tree is tree
+
+    changed = mixed_code.replace("e\n", "e2\n")
+    assert len(pool.take(changed, "join")) == 2
+    assert pool.tree is not tree
+    assert pool.parse(changed) is pool.tree
+    assert (state.percent_candidates, state.call_candidates) == (2, 1)
+    assert (state.concat_candidates, state.join_candidates) == (2, 2)
@@ -1,11 +1,18 @@
+import gc
+import logging
+import tracemalloc
+import weakref
+
 import pytest
 
 
+from flynt.api import fstringify_code
 from flynt.candidates.ast_percent_candidates import percent_candidates
 from flynt.candidates.ast_call_candidates import call_candidates
 from flynt.code_editor import CodeEditor
 from flynt.state import State
 from flynt.transform.transform import transform_chunk
+from flynt.utils.comments import CommentIndex, header_skips_file, skips_file
 from flynt.utils.utils import contains_comment
 
 s0 = """'%s' % (
@@ -87,3 +94,114 @@ def test_unicode_escape_mixed_preserved():
     out, count = editor.edit()
     assert out == "print(f\"Feels like: {data['main']['feels_like']}\\u00B0F°\")"
     assert count == 1
+
+
+def test_byte_to_char_idx(state: State):
+    code = "a = 'x'\nb = 'äß€😀' + '%s' % c\n"
+    editor = CodeEditor(code, None, lambda *args: [], transform_chunk, state)
+    line = code.split("\n")[1]
+    line_bytes = line.encode("utf-8")
+    for char_idx in range(len(line) + 1):
+        byte_idx = len(line[:char_idx].encode("utf-8"))
+        assert editor._byte_to_char_idx(1, byte_idx) == char_idx
+    assert editor._byte_to_char_idx(0, 4) == 4
+    assert editor._byte_to_char_idx(1, len(line_bytes)) == len(line)
+
+
+def test_editor_not_retained(state: State):
+    code = "a = '%s' % b\nc = '{}'.format(d)\n"
+    editor = CodeEditor(code, None, percent_candidates, transform_chunk, state)
+    editor.edit()
+    ref = weakref.ref(editor)
+    del editor
+    gc.collect()
+    assert ref() is None
+
+
+def test_memory_flat_over_many_files(caplog):
+    """Processing many different sources must not accumulate memory."""
+    # captured log records would grow memory by themselves
+    caplog.set_level(logging.CRITICAL, logger="flynt")
+
+    def process(start):
+        # names would be interned by the compiler for good, so vary strings
+        for i in range(start, start + 300):
+            code = f"a = '{i}: %s' % b\nc = '{i}: {{}}'.format(d)\ne = '{i}' + f\n"
+            fstringify_code(code, State(transform_concat=True))
+
+    # fill the bounded caches of the interpreter and imported modules
+    for start in range(0, 900, 300):
+        process(start)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        process(900)
+        gc.collect()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert after - before < 100_000
+
+
+def test_comment_index():
+    code = (
+        "a = ('%s' %  # c\n     b)\nc = '#%s' % d  # e\nf = '%s' % g  # noqa: flynt\n"
+    )
+    index = CommentIndex(code.split("\n"))
+    assert index.may_have_comment(0, 5, 1, 7)
+    assert index.may_have_comment(2, 4, 2, 13)  # only a `#` in a string
+    assert not index.may_have_comment(2, 9, 2, 13)
+    assert not index.skipped(0, 2)
+    assert index.skipped(2, 3)
+
+
+def test_comments_in_chunks():
+    code = (
+        "a = ('%s' %  # c\n     b)\n"
+        "c = '#%s' % d  # e\n"
+        "f = '%s' % g  # noqa: flynt\n"
+        "h = '{}'.format(\n    i,\n)  # flynt: skip\n"
+    )
+    expected = (
+        "a = ('%s' %  # c\n     b)\n"
+        "c = f'#{d}'  # e\n"
+        "f = '%s' % g  # noqa: flynt\n"
+        "h = '{}'.format(\n    i,\n)  # flynt: skip\n"
+    )
+    assert fstringify_code(code, State(len_limit=None)).content == expected
+
+
+def test_off_region():
+    code = (
+        "a = '%s' % b\n"
+        "# flynt: off\n"
+        "c = '%s' % d\n"
+        "e = '{}'.format(\n    f,\n)\n"
+        "# flynt: on\n"
+        "g = '%s' % h\n"
+    )
+    result = fstringify_code(code, State(len_limit=None)).content
+    assert result == code.replace("'%s' % b", "f'{b}'").replace("'%s' % h", "f'{h}'")
+
+
+def test_unterminated_off_region():
+    code = "a = '%s' % b  # flynt: off\nc = '%s' % d\n"
+    assert fstringify_code(code, State()).content == code
+
+
+@pytest.mark.parametrize(
+    "header, skipped",
+    [
+        ("# flynt: skip-file\n", True),
+        ("#!/usr/bin/env python\n\n#flynt:skip-file\n", True),
+        ('"""Docstring."""\n# flynt: skip-file\n', False),
+        ("# flynt: skip\n", False),
+    ],
+)
+def test_skip_file(header, skipped):
+    code = header + "a = '%s' % b\n"
+    assert skips_file(code) is skipped
+    assert header_skips_file(code.encode()) is skipped
+    result = fstringify_code(code, State())
+    assert (result.content == code) is skipped
@@ -0,0 +1,105 @@
+import difflib
+import os
+import random
+
+import pytest
+
+from flynt.api import fstringify_code
+from flynt.diff import _block_opcodes, _popular, unified_diff
+from flynt.state import State
+
+samples = os.path.join(os.path.dirname(__file__), "integration", "samples_in")
+
+
+def check_diff(code: str, state: State, n: int = 3) -> None:
+    result = fstringify_code(code, state)
+    assert result is not None
+    assert result.n_changes
+    a, b = code.split("\n"), result.content.split("\n")
+    expected = "\n".join(difflib.unified_diff(a, b, fromfile="file.py", n=n))
+    assert "\n".join(unified_diff(a, b, result.edits, fromfile="file.py", n=n)) == (
+        expected
+    )
+
+
+@pytest.mark.parametrize("sample", sorted(os.listdir(samples)))
+@pytest.mark.parametrize("n", [0, 1, 3])
+def test_same_as_difflib_on_samples(sample, n):
+    with open(os.path.join(samples, sample), encoding="utf-8") as f:
+        code = f.read()
+    state = State(transform_concat=True, transform_join=True, aggressive=1)
+    result = fstringify_code(code, state)
+    if result is None or not result.n_changes:
+        pytest.skip("nothing to convert")
+    check_diff(code, state, n)
+
+
+def test_multiline_edit():
+    code = 'x = "{}, {}".format(\n    a,\n    b,\n)\nprint(x)\n'
+    check_diff(code, State())
+
+
+def test_edits_on_one_line():
+    code = "\n".join(["import os", "", "x = '%s' % a + '{}'.format(b)", "y = 1"])
+    check_diff(code, State())
+
+
+@pytest.mark.parametrize("n", [0, 3])
+def test_popular_lines_between_edits(n):
+    # blank lines are frequent enough to be ignored by difflib's matching
+    lines = []
+    for i in range(150):
+        lines += [f"a_{i} = {i}", ""]
+    for i in (0, 10, 11, 12, 149):
+        lines[2 * i] = f"a_{i} = '%s' % b"
+    lines[21] = "else_ = 1"
+    check_diff("\n".join(lines), State(), n)
+
+
+def test_popular_lines_at_ends():
+    lines = [""] * 3 + [f"a_{i} = {i}" for i in range(200)] + [""] * 3
+    lines[3] = "a = '%s' % b"
+    lines[-4] = "c = '%s' % d"
+    check_diff("\n".join(lines), State())
+
+
+def test_converted_line_like_unchanged_one():
+    code = (
+        "x = f'{a}'\nz = (f'{a}')\nprint(f\"{b}\")\nx = \"%s\" % a\n"
+        'print("{}".format(b))\nprint(f"{b}")\nx = "%s" % a\n'
+    )
+    check_diff(code, State())
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_same_as_difflib_on_random_code(seed):
+    rng = random.Random(seed)
+    lines = [
+        "x = '%s' % a",
+        "x = f'{a}'",
+        'print("{}".format(b))',
+        'print(f"{b}")',
+        "y = 1",
+        "pass",
+        "",
+        "c = (\n    '{}'.format(d)\n)",
+    ]
+    for _ in range(50):
+        n_lines = rng.choice([5, 30, 250])
+        code = "\n".join(rng.choice(lines) for _ in range(n_lines)) + "\n"
+        state = State(quiet=True)
+        result = fstringify_code(code, state)
+        if result is not None and result.n_changes:
+            check_diff(code, state, n=rng.choice([0, 3]))
+
+
+def test_matching_popular_lines_like_difflib():
+    rng = random.Random(0)
+    for _ in range(200):
+        a = [rng.choice(["", "", "a", "b", str(rng.randrange(50))]) for _ in range(250)]
+        b = list(a)
+        for _ in range(10):
+            b[rng.randrange(len(b))] = rng.choice(["", "c", str(rng.randrange(60))])
+        assert list(_block_opcodes(a, b, _popular(b))) == (
+            difflib.SequenceMatcher(None, a, b).get_opcodes()
+        )
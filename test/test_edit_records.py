@@ -0,0 +1,96 @@
+import sys
+
+import pytest
+
+from flynt.api import fstringify_code
+from flynt.edits import Edit, compose
+from flynt.state import State
+
+
+def apply_edits(code, edits):
+    offsets = [0]
+    for line in code.split("\n"):
+        offsets.append(offsets[-1] + len(line) + 1)
+    parts = []
+    pos = 0
+    for edit in edits:
+        start = offsets[edit.start_line - 1] + edit.start_col
+        end = offsets[edit.end_line - 1] + edit.end_col
+        assert code[start:end] == edit.original
+        parts += [code[pos:start], edit.replacement]
+        pos = end
+    return "".join(parts) + code[pos:]
+
+
+def test_edit_records():
+    code = "a = 'é%s' % b\nc = '{}'.format(\n    d,\n)\n"
+    result = fstringify_code(code, State())
+    assert result.edits == (
+        Edit("percent", 1, 4, 1, 13, "'é%s' % b", "f'é{b}'"),
+        Edit("format", 2, 4, 4, 1, "'{}'.format(\n    d,\n)", "f'{d}'"),
+    )
+    assert apply_edits(code, result.edits) == result.content
+
+
+def test_redundant_parens_in_edit():
+    code = "print(('%s' % a))\n"
+    result = fstringify_code(code, State())
+    (edit,) = result.edits
+    assert edit.original == "('%s' % a)"
+    assert apply_edits(code, result.edits) == result.content
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "x = 'a %s' % b + 'c'\ny = 'q' + z\n",
+        "x = '%s' % a + str(b)\nq = ''.join(['a', b])\n",
+        "x = '{}'.format(a)\ny = '-'.join(['a', b]); z = 'k' + str(w)\n",
+    ],
+)
+def test_edits_compose_across_stages(code):
+    state = State(transform_concat=True, transform_join=True)
+    result = fstringify_code(code, state)
+    assert result.content != code
+    assert apply_edits(code, result.edits) == result.content
+    assert {edit.kind for edit in result.edits} <= {
+        "percent",
+        "format",
+        "concat",
+        "join",
+    }
+
+
+def test_compose_splices_edits_inside_replacements():
+    code = "x = '%s %s' % (a + 'x', b + 'y')\n"
+    first = [Edit("percent", 1, 4, 1, 32, code[4:32], "f'{a + 'x'} {b + 'y'}'")]
+    between = apply_edits(code, first)
+    second = [
+        Edit("concat", 1, 7, 1, 14, "a + 'x'", "f'{a}x'"),
+        Edit("concat", 1, 17, 1, 24, "b + 'y'", "f'{b}y'"),
+    ]
+    assert between[7:14] == "a + 'x'" and between[17:24] == "b + 'y'"
+
+    (edit,) = compose(code, first, second)
+    assert edit.original == "'%s %s' % (a + 'x', b + 'y')"
+    assert edit.replacement == "f'{f'{a}x'} {f'{b}y'}'"
+    assert apply_edits(code, [edit]) == apply_edits(between, second)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 12), reason="requires python3.12 or higher")
+@pytest.mark.parametrize(
+    "code",
+    [
+        "x = '%s' % (a + 'x')\n",
+        "x = '{} {}'.format(a, ', '.join(['a', b]))\n",
+    ],
+)
+def test_edits_compose_nested_in_fstring(code):
+    state = State(transform_concat=True, transform_join=True)
+    result = fstringify_code(code, state)
+    assert result.content != code
+    assert apply_edits(code, result.edits) == result.content
+
+
+def test_no_edits_without_changes():
+    assert fstringify_code("a = 1\n", State()).edits == ()
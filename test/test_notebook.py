@@ -0,0 +1,156 @@
+import difflib
+import json
+
+import pytest
+
+from flynt.diff import unified_diff
+from flynt.edits import Edit
+from flynt.notebook import (
+    code_cells,
+    join_cells,
+    module_line_ranges,
+    replace_sources,
+    source_edits,
+    split_module,
+)
+
+NOTEBOOK = {
+    "cells": [
+        {"cell_type": "markdown", "metadata": {}, "source": ["# '{}'.format(x)\n"]},
+        {
+            "cell_type": "code",
+            "execution_count": 1,
+            "metadata": {},
+            "outputs": [
+                {
+                    "output_type": "display_data",
+                    "data": {
+                        "image/png": 'iVBORw0KGgo\\u00e9"',
+                        "text/plain": ["é", "end\\"],
+                    },
+                    "metadata": {},
+                }
+            ],
+            "source": ["a = 1\n", "print('{}'.format(a))"],
+        },
+        {"cell_type": "code", "metadata": {}, "outputs": [], "source": "b = 'é'\n"},
+    ],
+    "metadata": {"language_info": {"name": "python"}},
+    "nbformat": 4,
+    "nbformat_minor": 5,
+}
+
+
+@pytest.mark.parametrize("indent", [None, 1, 2])
+def test_code_cells(indent):
+    raw = json.dumps(NOTEBOOK, indent=indent, ensure_ascii=False)
+    cells = code_cells(raw)
+    assert [cell.source for cell in cells] == [
+        "a = 1\nprint('{}'.format(a))",
+        "b = 'é'\n",
+    ]
+    for cell in cells:
+        assert json.loads(raw[cell.start : cell.end]) in (
+            NOTEBOOK["cells"][1]["source"],
+            NOTEBOOK["cells"][2]["source"],
+        )
+
+
+@pytest.mark.parametrize("indent", [None, 1, 2])
+def test_replace_sources_keeps_layout(indent):
+    raw = json.dumps(NOTEBOOK, indent=indent, ensure_ascii=False)
+    cells = code_cells(raw)
+    new_raw = replace_sources(raw, cells, ["a = 1\nprint(f'{a}')", "b = 'é'\nc = 2\n"])
+
+    expected = json.loads(json.dumps(NOTEBOOK))
+    expected["cells"][1]["source"] = ["a = 1\n", "print(f'{a}')"]
+    expected["cells"][2]["source"] = "b = 'é'\nc = 2\n"
+    assert new_raw == json.dumps(expected, indent=indent, ensure_ascii=False)
+
+
+@pytest.mark.parametrize("indent", [None, 1])
+def test_source_edits_diff(indent):
+    raw = json.dumps(NOTEBOOK, indent=indent, ensure_ascii=False)
+    cells = code_cells(raw)
+    sources = ["a = 1\nprint(f'{a}')", "b = 'é'\nc = 2\n"]
+    new_raw = replace_sources(raw, cells, sources)
+    a, b = raw.split("\n"), new_raw.split("\n")
+    edits = source_edits(raw, cells, sources)
+    assert list(unified_diff(a, b, edits)) == list(difflib.unified_diff(a, b))
+
+
+def test_replace_sources_keeps_outputs_as_they_are():
+    raw = (
+        '{"cells": [{"cell_type": "code", "outputs": [{"data": "\\u00e9 \\/"}],'
+        ' "source": ["x = 1"]}], "nbformat": 4}'
+    )
+    new_raw = replace_sources(raw, code_cells(raw), ["x = 2"])
+    assert new_raw == raw.replace("x = 1", "x = 2")
+
+
+def test_code_cells_literals():
+    raw = (
+        '{"cells": [{"cell_type": "code", "execution_count": null, "n": -1.5e3,'
+        ' "flags": [true, false], "source": ["x = 1\\n", "y = \\"\\u00e9\\""]}],'
+        ' "nbformat": 4}'
+    )
+    assert [cell.source for cell in code_cells(raw)] == ['x = 1\ny = "é"']
+
+
+def test_replace_sources_unchanged():
+    raw = json.dumps(NOTEBOOK, indent=1)
+    cells = code_cells(raw)
+    assert replace_sources(raw, cells, [cell.source for cell in cells]) == raw
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        "",
+        "[]",
+        '{"cells": [{"source": 1, "cell_type": "code"}]}',
+        '{"cells": []} x',
+        '{"cells": [], "nbformat": +1}',
+        '{"cells": [{"cell_type": "code", "source": "\\x"}]}',
+    ],
+)
+def test_code_cells_invalid(raw):
+    with pytest.raises(json.JSONDecodeError):
+        code_cells(raw)
+
+
+def test_split_module():
+    sources = ["a = '%s' % b", "\n\nc = '{}'.format(d)\n"]
+    module, first_lines = join_cells(sources)
+    assert module == "a = '%s' % b\n\n\nc = '{}'.format(d)\n"
+    assert first_lines == [1, 2]
+    edits = [
+        Edit("percent", 1, 4, 1, 12, "'%s' % b", "f'{b}'"),
+        Edit("format", 4, 4, 4, 18, "'{}'.format(d)", "f'{d}'"),
+    ]
+    assert split_module(sources, first_lines, edits) == [
+        "a = f'{b}'",
+        "\n\nc = f'{d}'\n",
+    ]
+
+
+def test_module_line_ranges():
+    raw = json.dumps(NOTEBOOK, indent=1, ensure_ascii=False)
+    lines = raw.split("\n")
+    print_line = next(i for i, line in enumerate(lines) if '"print(' in line) + 1
+    b_line = next(i for i, line in enumerate(lines) if '"b = ' in line) + 1
+    cells = code_cells(raw)
+    _, first_lines = join_cells([cell.source for cell in cells])
+    assert first_lines == [1, 3]
+
+    assert module_line_ranges(raw, cells, first_lines, [(1, 5)]) == []
+    # one line of the first cell; the second cell's source is a string
+    assert module_line_ranges(raw, cells, first_lines, [(print_line, b_line)]) == [
+        (2, 2),
+        (3, 3),
+    ]
+    assert module_line_ranges(raw, cells, first_lines, [(print_line - 1, 1000)]) == [
+        (1, 1),
+        (2, 2),
+        (3, 3),
+    ]
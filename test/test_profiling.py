@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from flynt import profiling
+from flynt.api import fstringify_code, fstringify_files
+from flynt.profiling import Profile
+from flynt.state import State
+
+
+def test_phases_recorded():
+    state = State(transform_concat=True, profile=Profile())
+    fstringify_code("a = '%s' % b\nc = 'x' + d\n", state, filename="a.py")
+
+    phases = state.profile.phases
+    for name in ("parse", "candidates", "transform", "unparse", "verify"):
+        assert phases[name] > 0
+    assert set(state.profile.kinds) == {"fstring", "concat"}
+    assert set(state.profile.files) == {"a.py"}
+    assert sum(state.profile.files["a.py"].values()) == pytest.approx(
+        sum(phases.values())
+    )
+
+
+def test_nested_phases_are_exclusive():
+    profile = Profile()
+    with profiling.processing(profile, "f"):
+        with profiling.phase("transform", kind="fstring"):
+            with profiling.phase("unparse"):
+                pass
+    assert set(profile.phases) == {"transform", "unparse"}
+    assert profile.kinds["fstring"] >= sum(profile.phases.values())
+
+
+def test_inactive_without_profile():
+    state = State()
+    fstringify_code("a = '%s' % b\n", state)
+    assert profiling._active is None
+
+
+def test_profile_merged_from_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr("flynt.api.WORKER_BATCH_SIZE", 1)
+    files = []
+    for idx in range(3):
+        path = tmp_path / f"m{idx}.py"
+        path.write_text(f"a = '%s' % b{idx}\n")
+        files.append(str(path))
+    output = tmp_path / "profile.json"
+    state = State(
+        quiet=True,
+        dry_run=True,
+        jobs=2,
+        profile=Profile(),
+        profile_output=str(output),
+    )
+    fstringify_files(files, state)
+
+    assert set(state.profile.files) == set(files)
+    report = json.loads(output.read_text())
+    assert report["files"] == 3
+    assert report["phases"]["read"] > 0
+    assert len(report["slowest_files"]) == 3
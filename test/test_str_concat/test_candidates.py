@@ -4,8 +4,13 @@ import sys
 
 import pytest
 
+from flynt.api import fstringify_code
 from flynt.state import State
-from flynt.string_concat.candidates import ConcatHound, concat_candidates
+from flynt.string_concat.candidates import (
+    ConcatHound,
+    concat_candidates,
+    is_string_concat,
+)
 
 
 @pytest.fixture()
@@ -54,3 +59,35 @@ def test_find_victims_parens(state: State):
 
     v1 = lst[0]
     assert str(v1) == """'blah' + (thing - 1)"""
+
+
+def addition_chain(terms):
+    chain = terms[0]
+    for term in terms[1:]:
+        chain = ast.BinOp(left=chain, op=ast.Add(), right=term)
+    return chain
+
+
+def test_is_string_concat_deep_chain():
+    names = [ast.Name(id=f"c{i}", ctx=ast.Load()) for i in range(20_000)]
+    assert not is_string_concat(addition_chain(names))
+    assert is_string_concat(addition_chain([ast.Constant("<td>"), *names]))
+    assert is_string_concat(addition_chain([*names, ast.Constant("<td>")]))
+
+
+def test_find_victims_deep_chain():
+    loc = {"lineno": 1, "col_offset": 0, "end_lineno": 1, "end_col_offset": 0}
+    names = [ast.Name(id=f"c{i}", ctx=ast.Load(), **loc) for i in range(20_000)]
+    inner = ast.BinOp(ast.Constant("x", **loc), ast.Add(), names[0], **loc)
+    chain = addition_chain([ast.Call(ast.Name("f", ast.Load()), [inner], [], **loc)])
+    for term in names[1:]:
+        chain = ast.BinOp(left=chain, op=ast.Add(), right=term, **loc)
+
+    ch = ConcatHound()
+    ch.visit(chain)
+    assert [victim.node for victim in ch.victims] == [inner]
+
+
+def test_too_deep_to_parse():
+    code = "html = " + " + ".join(f"'<td>' + c{i}" for i in range(10_000)) + "\n"
+    assert fstringify_code(code, State(transform_concat=True)) is None
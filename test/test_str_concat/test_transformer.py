@@ -169,3 +169,10 @@ def test_noexc():
     new, changed = transform_concat_from_str(noexc_in)
     assert not changed
     assert new == ""
+
+
+def test_unpack_deep_chain():
+    node = ast.Name(id="c0", ctx=ast.Load())
+    for i in range(1, 20_000):
+        node = ast.BinOp(left=node, op=ast.Add(), right=ast.Name(id=f"c{i}"))
+    assert [term.id for term in unpack_binop(node)] == [f"c{i}" for i in range(20_000)]
@@ -244,3 +244,23 @@ def test_skip_variable_format(state: State):
     new, changed = transform_chunk_from_str(code, state)
 
     assert not changed
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "'%s %s' % [a, b]",
+        "'%s' % a",
+        "'%(x)s' % {'x': a}",
+        "'{}'.format(d['{}'.format(k)])",
+        "'{} {}'.format(f'{a}', [f'{b}' for b in c])",
+    ],
+)
+def test_tree_not_modified(code):
+    tree = ast.parse(code)
+    before = ast.dump(tree, include_attributes=True)
+
+    new, changed = transform_chunk(tree, State(aggressive=1))
+
+    assert changed
+    assert ast.dump(tree, include_attributes=True) == before
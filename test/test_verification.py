@@ -0,0 +1,128 @@
+import ast
+
+import pytest
+
+from flynt import api, code_editor
+from flynt.api import fstringify_code
+from flynt.edits import Edit
+from flynt.state import State
+from flynt.transform.transform import transform_chunk
+from flynt.verification import drop_faulty_edits, find_divergence
+
+code = "a = '%s' % x\nb = '%s' % bad\nc = '{}'.format(y)\n"
+
+
+@pytest.fixture()
+def faulty_transform(monkeypatch):
+    """Make the conversion of expressions using ``bad`` go wrong."""
+
+    def transform(node, state, quote_type):
+        new_code, changed = transform_chunk(node, state, quote_type)
+        if changed and "bad" in new_code:
+            return replacement, True
+        return new_code, changed
+
+    replacement = "f'{bad'"
+    monkeypatch.setattr(code_editor, "transform_chunk", transform)
+
+    def set_replacement(new_replacement):
+        nonlocal replacement
+        replacement = new_replacement
+
+    return set_replacement
+
+
+@pytest.mark.parametrize("verification", ["per-file", "strict"])
+def test_faulty_edit_dropped(faulty_transform, verification):
+    state = State(verification=verification)
+    result = fstringify_code(code, state)
+    assert result.content == "a = f'{x}'\nb = '%s' % bad\nc = f'{y}'\n"
+    assert result.n_changes == 2
+    assert [edit.start_line for edit in result.edits] == [1, 3]
+    assert state.percent_transforms == 1
+    assert state.call_transforms == 1
+    assert state.invalid_conversions == 1
+
+
+def test_faulty_file_skipped_per_candidate(faulty_transform):
+    assert fstringify_code(code, State()) is None
+
+
+def test_strict_drops_changed_structure(faulty_transform):
+    faulty_transform("f'{bad}' + x")
+    assert fstringify_code(code, State(verification="per-file")).n_changes == 3
+    result = fstringify_code(code, State(verification="strict"))
+    assert result.content == "a = f'{x}'\nb = '%s' % bad\nc = f'{y}'\n"
+
+
+def test_faulty_edit_in_earlier_stage(faulty_transform):
+    state = State(verification="per-file", transform_concat=True)
+    result = fstringify_code(code + "d = 'q' + z\n", state)
+    assert result.content.endswith("b = '%s' % bad\nc = f'{y}'\nd = f\"q{z}\"\n")
+    assert state.concat_changes == 1
+
+
+def test_bisection_isolates_faulty_edits():
+    source = "".join(f"x{i} = 0\n" for i in range(64))
+    edits = [Edit("percent", i + 1, 5, i + 1, 6, "0", "1") for i in range(64)]
+    edits[10] = Edit("percent", 11, 5, 11, 6, "0", "(")
+    edits[40] = Edit("percent", 41, 5, 41, 6, "0", ")")
+    checks = []
+
+    def is_valid(code):
+        checks.append(code)
+        try:
+            ast.parse(code)
+        except SyntaxError:
+            return False
+        return True
+
+    kept, dropped = drop_faulty_edits(source, edits, is_valid)
+    assert dropped == [edits[10], edits[40]]
+    assert kept == [e for i, e in enumerate(edits) if i not in (10, 40)]
+    assert len(checks) < 30
+
+
+def test_find_divergence():
+    source = "a = '%s' % b\nc = d + 1\n"
+    before = ast.parse(source)
+    assert find_divergence(source, before, ast.parse("a = f'{b}'\nc = d + 1\n")) is None
+    assert find_divergence(source, before, ast.parse("a = f'{b}'\nc = d + 2\n"))
+    assert find_divergence(source, before, ast.parse("a = f'{b}'\nc = d\n"))
+    assert find_divergence(source, before, ast.parse("a = f'{e}'\nc = d + 1\n"))
+
+
+def test_divergence_names_edit():
+    source = "a = '%s' % b\nc = '%s' % d\n"
+    edits = [
+        Edit("percent", 1, 4, 1, 12, "'%s' % b", "f'{b}'"),
+        Edit("percent", 2, 4, 2, 12, "'%s' % d", "f'{d}' + x"),
+    ]
+    after = ast.parse("a = f'{b}'\nc = f'{d}' + x\n")
+    divergence = find_divergence(source, ast.parse(source), after, edits)
+    assert divergence.line == 2
+    assert divergence.edit == edits[1]
+    assert "f'{d}' + x" in str(divergence)
+
+
+def test_divergence_deep_nesting():
+    def chain(last):
+        # deeper than ast.parse could build
+        node = ast.Name("a", ast.Load(), lineno=1, col_offset=0)
+        for _ in range(10_000):
+            node = ast.BinOp(node, ast.Add(), ast.Name("a", ast.Load()))
+        return ast.BinOp(node, ast.Add(), ast.Name(last, ast.Load()))
+
+    divergence = find_divergence("", chain("a"), chain("b"))
+    assert "'a' became 'b'" in divergence.reason
+
+
+def test_strict_drops_only_diverging_edit(faulty_transform, monkeypatch):
+    checked = []
+    monkeypatch.setattr(api, "drop_faulty_edits", lambda *args: checked.append(args))
+    faulty_transform("f'{bad}' + x")
+    state = State(verification="strict")
+    result = fstringify_code(code, state)
+    assert result.n_changes == 2
+    assert state.invalid_conversions == 1
+    assert not checked  # no bisection needed
@@ -0,0 +1,110 @@
+import logging
+import os
+import stat
+
+import pytest
+
+from flynt import writer
+from flynt.state import State
+
+
+def test_write_atomic(tmp_path):
+    path = tmp_path / "a.py"
+    path.write_text("old")
+    path.chmod(0o751)
+    link = tmp_path / "link.py"
+    link.symlink_to(path)
+
+    writer.write_atomic(str(link), b"new")
+
+    assert path.read_text() == "new"
+    assert stat.S_IMODE(path.stat().st_mode) == 0o751
+    assert link.is_symlink()
+    assert sorted(os.listdir(tmp_path)) == ["a.py", "link.py"]
+
+
+def test_write_atomic_interrupted(tmp_path, monkeypatch):
+    path = tmp_path / "a.py"
+    path.write_text("old")
+
+    def interrupted(*args):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(os, "replace", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        writer.write_atomic(str(path), b"new")
+    assert path.read_text() == "old"
+    assert os.listdir(tmp_path) == ["a.py"]
+
+
+@pytest.mark.parametrize("fsync", [False, True])
+def test_writing(tmp_path, fsync):
+    paths = [tmp_path / f"{i}.py" for i in range(20)]
+    for path in paths:
+        path.write_text("old")
+
+    with writer.writing(State(fsync=fsync)):
+        for path in paths:
+            writer.write(str(path), b"new")
+        if fsync:
+            assert all(path.read_text() == "old" for path in paths)
+
+    assert all(path.read_text() == "new" for path in paths)
+    assert len(os.listdir(tmp_path)) == len(paths)
+
+
+def test_writing_failure_reported(tmp_path, caplog):
+    caplog.set_level(logging.ERROR, logger="flynt")
+    missing = str(tmp_path / "missing" / "a.py")
+    path = tmp_path / "b.py"
+    path.write_text("old")
+
+    with pytest.raises(writer.WriteError) as excinfo:
+        with writer.writing(State()):
+            writer.write(missing, b"new")
+            writer.write(str(path), b"new")
+
+    assert excinfo.value.paths == [missing]
+    assert f"Can't write {missing}" in str(excinfo.value)
+    assert "Can't write" in caplog.text
+    assert path.read_text() == "new"
+
+
+def test_writing_fsync_rename_failure(tmp_path, monkeypatch):
+    paths = [tmp_path / f"{i}.py" for i in range(3)]
+    for path in paths:
+        path.write_text("old")
+    replace = os.replace
+
+    def failing_replace(src, dst):
+        if dst == str(paths[1]):
+            raise PermissionError("denied")
+        replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", failing_replace)
+    with pytest.raises(writer.WriteError) as excinfo:
+        with writer.writing(State(fsync=True)):
+            for path in paths:
+                writer.write(str(path), b"new")
+
+    assert excinfo.value.paths == [str(paths[1])]
+    assert [path.read_text() for path in paths] == ["new", "old", "new"]
+    assert len(os.listdir(tmp_path)) == len(paths)
+
+
+def test_writing_fsync_interrupted(tmp_path, monkeypatch):
+    paths = [tmp_path / f"{i}.py" for i in range(3)]
+    for path in paths:
+        path.write_text("old")
+
+    def interrupted(*args):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(os, "replace", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        with writer.writing(State(fsync=True)):
+            for path in paths:
+                writer.write(str(path), b"new")
+
+    assert all(path.read_text() == "old" for path in paths)
+    assert len(os.listdir(tmp_path)) == len(paths)